@@ -1,15 +1,22 @@
-import subprocess
-import unittest
 import os
-import io
 import tempfile
-import shutil
-from contextlib import redirect_stdout
 from datetime import datetime, timezone
 from flask import current_app
 
 # Import SQLAlchemy models and database instance
-from models.models import db, Submission, Assignment, Test, Result, SubmissionStatus, GradeStatus
+from models.models import (
+    db, Submission, Result, TestCaseResult, SubmissionStatus, GradeStatus, ProgrammingLanguage
+)
+from cache import assignment_cache, test_cache
+from events import status_broker
+from grading.executor import get_executor
+from grading.io_tests import REPLAY_HARNESS, run_io_tests
+from grading.languages import DEFAULT_COMPILE_TIMEOUT, UnsupportedLanguageError, build, failed_build, runner_for
+from grading.orchestrator import get_orchestrator, python_command
+from grading.sandbox import get_sandbox_pool
+from grading.scratch import scratch_directory
+from grading.harness import failed_test_run
+from grading.analytics import snapshot_result, snapshot_test_cases, update_assignment_stats, update_test_case_stats
 
 
 class AutoMarker:
@@ -17,49 +24,59 @@ class AutoMarker:
         """Initialize the AutoMarker with SQLAlchemy database session."""
         pass  # No need to store anything - we'll use the Flask app context and db session
 
+    def publish_status(self, submission):
+        """Notify status subscribers of a committed submission status change."""
+        status_broker.publish(
+            submission.submission_id,
+            submission.status,
+            result_id=submission.result_id
+        )
+
     def get_assignment_from_submission(self, submission_id):
-        """Get assignment details from submission ID using SQLAlchemy."""
+        """Get cached assignment metadata (title, scoring fields, test id) for a submission."""
         submission = db.session.get(Submission, submission_id)
         if not submission:
             raise ValueError(f"Submission {submission_id} not found")
-        return submission.assignment
+        assignment = assignment_cache.get(submission.assignment_id)
+        if not assignment:
+            raise ValueError(f"Assignment {submission.assignment_id} not found")
+        return assignment
 
-    def get_test_file_from_assignment(self, assignment):
-        """Get test file content from assignment using SQLAlchemy."""
-        if not assignment.test or not assignment.test.test_file:
+    def get_test_artifact_from_assignment(self, assignment):
+        """Get the current revision of an assignment's test from the shared test artifact cache."""
+        artifact = test_cache.artifact(assignment.test_id)
+        if artifact is None:
             raise ValueError(f"No test file found for assignment {assignment.assignment_id}")
-        return assignment.test.test_file
+        return artifact
+
+    def get_test_file_from_assignment(self, assignment):
+        """Get the test file for an assignment from the shared test artifact cache."""
+        return self.get_test_artifact_from_assignment(assignment).source
 
-    def save_submission_file_to_temp(self, submission):
-        """Save submission file BLOB to a temporary file and return the path."""
+    def save_submission_file_to_temp(self, submission, directory=None, filename=None):
+        """
+        Save submission file BLOB to a temporary file and return the path.
+
+        With ``directory`` and ``filename`` (a sandbox and its language runner's
+        source name) the file is saved under that exact name.
+        """
         if not submission.submission_file:
             raise ValueError(f"No submission file found for submission {submission.submission_id}")
         
-        # Create temporary file with proper extension
-        file_extension = '.py'  # Default to Python, could be enhanced based on file_type
-        temp_fd, temp_path = tempfile.mkstemp(suffix=file_extension, prefix='submission_')
-        
-        try:
-            with os.fdopen(temp_fd, 'wb') as temp_file:
+        if directory and filename:
+            temp_path = os.path.join(directory, filename)
+            with open(temp_path, 'wb') as temp_file:
                 temp_file.write(submission.submission_file)
             return temp_path
-        except Exception as e:
-            os.close(temp_fd)  # Make sure to close if writing fails
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            raise e
-
-    def save_test_file_to_temp(self, test_file_blob):
-        """Save test file BLOB to a temporary file and return the path."""
-        if not test_file_blob:
-            raise ValueError("No test file content provided")
         
-        # Create temporary file with .py extension for test files
-        temp_fd, temp_path = tempfile.mkstemp(suffix='_test.py', prefix='test_')
+        # Create temporary file with proper extension
+        file_extension = submission.file_type.value if submission.file_type else '.py'
+        temp_fd, temp_path = tempfile.mkstemp(suffix=file_extension, prefix='submission_',
+                                              dir=directory or scratch_directory())
         
         try:
             with os.fdopen(temp_fd, 'wb') as temp_file:
-                temp_file.write(test_file_blob)
+                temp_file.write(submission.submission_file)
             return temp_path
         except Exception as e:
             os.close(temp_fd)  # Make sure to close if writing fails
@@ -67,86 +84,69 @@ class AutoMarker:
                 os.remove(temp_path)
             raise e
 
-    def run_student_code(self, file_path, test_input="", timeout=10):
-        """Run the student's code with the given input and capture the output."""
-        try:
-            # Use python3 on Unix-like systems, python on Windows
-            python_cmd = 'python' if os.name == 'nt' else 'python3'
-            
-            result = subprocess.run(
-                [python_cmd, file_path],
-                input=test_input,
-                text=True,
-                capture_output=True,
-                timeout=timeout,
-                cwd=os.path.dirname(file_path)  # Set working directory to file location
-            )
-            return result.stdout.strip(), result.stderr.strip() if result.stderr else None
-        except subprocess.TimeoutExpired:
-            return None, "Execution timed out"
-        except Exception as e:
-            return None, str(e)
+    def student_command(self, file_path, harness=None):
+        """Command line that runs a student's program, optionally under a Python harness script."""
+        return python_command(harness) + [file_path] if harness else python_command(file_path)
 
-    def run_unit_tests(self, test_file_path, student_file_path=None):
-        """Run the unit tests in the specified test file and return results."""
+    def run_io_tests(self, artifact, student_file_path, sandbox=None, command=None):
+        """
+        Feed each input case of a native I/O test to the student's program and compare its output.
+
+        ``command`` runs a built (non-Python) program; without it the file is run
+        with Python, and may be replayed in a single process.
+        """
         try:
-            # Get the directory and filename
-            test_dir = os.path.dirname(test_file_path)
-            test_filename = os.path.basename(test_file_path)
-            
-            # If student file path is provided, modify the test file to include it
-            if student_file_path:
-                # Read the test file content
-                with open(test_file_path, 'r') as f:
-                    test_content = f.read()
-                
-                # Replace the student_file placeholder with actual path
-                test_content = test_content.replace(
-                    "self.student_file = None",
-                    f"self.student_file = r'{student_file_path}'"
-                )
-                
-                # Write the modified content back
-                with open(test_file_path, 'w') as f:
-                    f.write(test_content)
-            
-            # Load the test suite
-            loader = unittest.TestLoader()
-            suite = loader.discover(test_dir, pattern=test_filename)
-            
-            # Capture test results
-            results = io.StringIO()
-            with redirect_stdout(results):
-                runner = unittest.TextTestRunner(stream=results, verbosity=2)
-                test_results = runner.run(suite)
+            return run_io_tests(
+                command or self.student_command(student_file_path),
+                artifact.input_data,
+                artifact.expected_output,
+                io_options=artifact.io_options,
+                timeout=artifact.timeout_seconds,
+                cwd=os.path.dirname(student_file_path),
+                replay_command=None if command else self.student_command(student_file_path, harness=REPLAY_HARNESS),
+                sandbox=sandbox
+            )
+        except ValueError as e:
+            # Malformed cases or options are the test's fault, reported like a broken test file
+            return failed_test_run(e)
 
-            return {
-                "total": test_results.testsRun,
-                "failures": len(test_results.failures),
-                "errors": len(test_results.errors),
-                "passed": test_results.testsRun - len(test_results.failures) - len(test_results.errors),
-                "results": results.getvalue(),
-                "failure_details": [str(failure) for failure in test_results.failures],
-                "error_details": [str(error) for error in test_results.errors]
-            }
-        except Exception as e:
-            return {
-                "total": 0,
-                "failures": 1,
-                "errors": 0,
-                "passed": 0,
-                "results": f"Failed to run tests: {str(e)}",
-                "failure_details": [str(e)],
-                "error_details": []
-            }
+    def run_student_code(self, file_path, test_input="", timeout=None, sandbox=None, artifact=None):
+        """
+        Run the student's code with the given input and capture the output.
+        
+        Runs on the shared asyncio orchestrator, so waiting on the program does not
+        tie up a thread per execution. ``timeout`` defaults to the ``timeout_seconds``
+        of the test ``artifact``.
+        """
+        if timeout is None and artifact is not None:
+            timeout = artifact.timeout_seconds
+        result = get_orchestrator().run(
+            self.student_command(file_path),
+            input=test_input,
+            timeout=timeout,
+            cwd=os.path.dirname(file_path),  # Set working directory to file location
+            sandbox=sandbox
+        )
+        if result.error:
+            return None, result.error
+        if result.timed_out:
+            return None, "Execution timed out"
+        if result.output_limit_exceeded:
+            return None, f"Output limit exceeded: stopped after {result.stdout_bytes + result.stderr_bytes} bytes"
+        return result.stdout.strip(), result.stderr.strip() if result.stderr else None
 
     def create_or_update_result(self, submission, test_results, score, feedback):
         """Create or update the Result record for a submission."""
         try:
+            max_score = submission.assignment.max_score if submission.assignment else None
+            percentage = score / max_score * 100 if max_score else 0.0
+
             # Check if result already exists
             if submission.result:
                 result = submission.result
+                previous_contribution = snapshot_result(submission, result)
             else:
+                previous_contribution = None
                 result = Result()
                 db.session.add(result)
             
@@ -155,7 +155,7 @@ class AutoMarker:
             result.expected_output = "Unit tests executed"  # Could be enhanced with specific expected outputs
             result.passed = test_results["passed"] == test_results["total"]
             result.score = score
-            result.percentage = score
+            result.percentage = percentage
             result.test_cases_passed = test_results["passed"]
             result.test_cases_total = test_results["total"]
             result.feedback = feedback[:2000]  # Limit length
@@ -164,10 +164,20 @@ class AutoMarker:
             result.graded_at = datetime.now(timezone.utc)
             result.graded_by = 'AUTOMARKER'
             
+            # Structured per-test records replace any from a previous run
+            test_cases = test_results.get("test_cases", [])
+            update_test_case_stats(submission.assignment_id, snapshot_test_cases(submission.result), test_cases)
+            result.test_cases = [TestCaseResult(**record) for record in test_cases]
+            result.execution_time = sum(record["duration"] for record in test_cases) if test_cases else None
+            result.compile_time = test_results.get("compile_time")
+            
             # Handle errors
             if test_results["errors"] > 0:
                 result.error_message = "; ".join(test_results["error_details"][:3])  # Limit errors shown
             
+            update_assignment_stats(submission.assignment_id, previous_contribution,
+                                    snapshot_result(submission, result))
+            
             # Link result to submission if new
             if not submission.result:
                 submission.result = result
@@ -185,7 +195,7 @@ class AutoMarker:
         This replaces the old mark_submission methods.
         """
         submission_temp_path = None
-        test_temp_path = None
+        sandbox = None
         
         try:
             # Get submission with all related data
@@ -196,21 +206,44 @@ class AutoMarker:
             # Update submission status
             submission.status = SubmissionStatus.GRADING
             db.session.commit()
+            self.publish_status(submission)
             
-            # Get assignment and test file
+            # Get assignment and the test revision, compiled once and shared by every submission
             assignment = self.get_assignment_from_submission(submission_id)
-            test_file_blob = self.get_test_file_from_assignment(assignment)
-            
-            # Save files to temporary locations
-            submission_temp_path = self.save_submission_file_to_temp(submission)
-            test_temp_path = self.save_test_file_to_temp(test_file_blob)
+            artifact = self.get_test_artifact_from_assignment(assignment)
             
+            # Save the submission into a sandbox from the pool; student programs run isolated in it
+            sandbox = get_sandbox_pool().checkout()
             current_app.logger.info(f"Running automarker for submission {submission_id}")
-            current_app.logger.info(f"Submission file: {submission_temp_path}")
-            current_app.logger.info(f"Test file: {test_temp_path}")
+            current_app.logger.info(f"Test: {artifact.test_id} v{artifact.version} ({artifact.sha256[:12]})")
             
-            # Run the unit tests with student file path
-            test_results = self.run_unit_tests(test_temp_path, submission_temp_path)
+            meta = test_cache.get(artifact.test_id)
+            try:
+                runner = runner_for(meta.programming_language if meta else None, submission.file_type)
+            except UnsupportedLanguageError as e:
+                # The test asks for a language this marker cannot run: the test's fault, like a broken test file
+                runner, test_results = None, failed_test_run(e)
+            
+            if runner is not None:
+                submission_temp_path = self.save_submission_file_to_temp(submission, sandbox.workdir,
+                                                                         runner.source_name)
+                current_app.logger.info(f"Submission file: {submission_temp_path} ({runner.language.value})")
+                
+                # Compiled languages are built once, before any test runs
+                program = build(runner, submission.submission_file, sandbox.workdir, sandbox,
+                                timeout=current_app.config.get('GRADING_COMPILE_TIMEOUT', DEFAULT_COMPILE_TIMEOUT))
+                # Python keeps the platform's interpreter name and the single-process replay harness
+                command = None if runner.language is ProgrammingLanguage.PYTHON else program.command
+                if program.error:
+                    test_results = failed_build(program)
+                elif artifact.is_io_test:
+                    # Input/expected output cases run the student's program directly
+                    test_results = self.run_io_tests(artifact, submission_temp_path, sandbox, command)
+                else:
+                    # Run the unit tests with student file path in a grading executor process
+                    test_results = get_executor().run(artifact, submission_temp_path, sandbox=sandbox,
+                                                      command=command)
+                test_results["compile_time"] = program.compile_time
             
             # Calculate base score
             if test_results["total"] > 0:
@@ -288,6 +321,7 @@ class AutoMarker:
             
             # Commit all changes
             db.session.commit()
+            self.publish_status(submission)
             
             current_app.logger.info(f"Automarker completed for submission {submission_id}. Score: {score:.2f}")
             
@@ -308,6 +342,8 @@ class AutoMarker:
         except Exception as e:
             # Update submission status to indicate grading failed
             try:
+                # A failed flush or commit leaves the session unusable until rolled back
+                db.session.rollback()
                 submission = db.session.get(Submission, submission_id)
                 if submission:
                     submission.status = SubmissionStatus.ERROR
@@ -333,6 +369,7 @@ class AutoMarker:
                         submission.result = result
                     
                     db.session.commit()
+                    self.publish_status(submission)
             except Exception as inner_e:
                 current_app.logger.error(f"Failed to update submission status after error: {str(inner_e)}")
                 db.session.rollback()
@@ -354,9 +391,5 @@ class AutoMarker:
                     os.remove(submission_temp_path)
                 except Exception as e:
                     current_app.logger.warning(f"Failed to remove temp submission file: {str(e)}")
-            
-            if test_temp_path and os.path.exists(test_temp_path):
-                try:
-                    os.remove(test_temp_path)
-                except Exception as e:
-                    current_app.logger.warning(f"Failed to remove temp test file: {str(e)}")
+            if sandbox is not None:
+                get_sandbox_pool().release(sandbox)
@@ -1,9 +1,13 @@
 from .submissions import submissions_blueprint
+from .analytics import analytics_blueprint
+from .modules import modules_blueprint
 
 # Register all blueprints here
 def register_blueprints(app):
     """Register all application blueprints"""
     app.register_blueprint(submissions_blueprint, url_prefix="/api")
+    app.register_blueprint(analytics_blueprint, url_prefix="/api")
+    app.register_blueprint(modules_blueprint, url_prefix="/api")
     
     # Future blueprints will be added here:
     # app.register_blueprint(auth_blueprint, url_prefix="/api/auth")
@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+from flask import request, Blueprint, current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+# Add the root directory of the project to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from models.models import db, Assignment, AssignmentStats, Result, Submission, TestCaseStats
+from .submissions import error_response, success_response
+
+analytics_blueprint = Blueprint("analytics", __name__)
+
+def assignment_exists(assignment_id):
+    """Existence check without loading the assignment's text columns"""
+    return db.session.query(Assignment.assignment_id).filter_by(assignment_id=assignment_id).first() is not None
+
+# Endpoint: GET /api/assignments/{assignment_id}/stats
+@analytics_blueprint.route("/assignments/<int:assignment_id>/stats", methods=["GET"])
+def get_assignment_stats(assignment_id):
+    """
+    Score distribution for an assignment (mean, standard deviation, pass rate and a
+    10-band histogram), read from precomputed aggregates rather than scanning results
+    """
+    try:
+        if not assignment_exists(assignment_id):
+            return error_response("Assignment not found", 404)
+        
+        stats = db.session.get(AssignmentStats, assignment_id) or AssignmentStats(
+            assignment_id=assignment_id, graded_count=0, score_sum=0.0, score_sq_sum=0.0,
+            percentage_sum=0.0, pass_count=0, late_count=0
+        )
+        return success_response(stats.to_dict())
+        
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error in get_assignment_stats: {e}")
+        return error_response("Database error occurred", 500)
+
+# Endpoint: GET /api/assignments/{assignment_id}/tests/stats
+@analytics_blueprint.route("/assignments/<int:assignment_id>/tests/stats", methods=["GET"])
+def get_test_case_stats(assignment_id):
+    """
+    Per-test failure rate and duration for an assignment, read from precomputed aggregates
+    Query params:
+    - sort: failure_rate (default), avg_duration or name
+    """
+    try:
+        if not assignment_exists(assignment_id):
+            return error_response("Assignment not found", 404)
+        
+        sort = request.args.get('sort', 'failure_rate')
+        if sort not in ('failure_rate', 'avg_duration', 'name'):
+            return error_response("Invalid sort. Valid options: ['failure_rate', 'avg_duration', 'name']")
+        
+        stats = [s.to_dict() for s in TestCaseStats.query.filter_by(assignment_id=assignment_id)
+                 if s.runs > 0]
+        stats.sort(key=lambda s: s[sort], reverse=sort != 'name')
+        
+        return success_response({"assignment_id": assignment_id, "tests": stats})
+        
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error in get_test_case_stats: {e}")
+        return error_response("Database error occurred", 500)
+
+# Endpoint: GET /api/assignments/{assignment_id}/slowest-submissions
+@analytics_blueprint.route("/assignments/<int:assignment_id>/slowest-submissions", methods=["GET"])
+def get_slowest_submissions(assignment_id):
+    """
+    Submissions whose test runs took longest
+    Query params:
+    - limit: Number of submissions (default: 10, max: 100)
+    """
+    try:
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        if not assignment_exists(assignment_id):
+            return error_response("Assignment not found", 404)
+        
+        rows = db.session.query(
+            Submission.submission_id, Submission.student_id, Submission.attempt_number,
+            Result.execution_time, Result.test_cases_passed, Result.test_cases_total
+        ).join(
+            Result, Result.result_id == Submission.result_id
+        ).filter(
+            Submission.assignment_id == assignment_id,
+            Result.execution_time.isnot(None)
+        ).order_by(Result.execution_time.desc()).limit(limit).all()
+        
+        return success_response({
+            "assignment_id": assignment_id,
+            "submissions": [{
+                "submission_id": row.submission_id,
+                "student_id": row.student_id,
+                "attempt_number": row.attempt_number,
+                "execution_time": row.execution_time,
+                "test_cases_passed": row.test_cases_passed,
+                "test_cases_total": row.test_cases_total
+            } for row in rows]
+        })
+        
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error in get_slowest_submissions: {e}")
+        return error_response("Database error occurred", 500)
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+from flask import request, Blueprint, Response, current_app, stream_with_context
+from sqlalchemy.exc import SQLAlchemyError
+
+# Add the root directory of the project to the Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from models.models import db, Module
+from exports import stream_gradebook_columnar, stream_gradebook_csv
+from .submissions import error_response
+
+modules_blueprint = Blueprint("modules", __name__)
+
+GRADEBOOK_FORMATS = {
+    "csv": (stream_gradebook_csv, "text/csv", "csv"),
+    "columnar": (stream_gradebook_columnar, "application/octet-stream", "cscf"),
+}
+
+# Endpoint: GET /api/modules/{module_id}/gradebook
+@modules_blueprint.route("/modules/<int:module_id>/gradebook", methods=["GET"])
+def export_gradebook(module_id):
+    """
+    Stream the module gradebook: one row per enrolled student, one column per module
+    assignment (best graded percentage) and the weighted total using module_assignments.weight
+    Query params:
+    - format: csv (default) or columnar
+    """
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in GRADEBOOK_FORMATS:
+            return error_response(f"Invalid format. Valid options: {list(GRADEBOOK_FORMATS)}")
+        
+        module = db.session.get(Module, module_id)
+        if not module:
+            return error_response("Module not found", 404)
+        
+        generate, mimetype, extension = GRADEBOOK_FORMATS[export_format]
+        return Response(
+            stream_with_context(generate(module_id)),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f'attachment; filename="{module.code}_gradebook.{extension}"'}
+        )
+        
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error in export_gradebook: {e}")
+        return error_response("Database error occurred", 500)
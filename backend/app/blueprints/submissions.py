@@ -1,18 +1,31 @@
 import sys
+import json
+import time
 from pathlib import Path
-from flask import request, Blueprint, jsonify, current_app
+from flask import request, Blueprint, jsonify, current_app, Response, stream_with_context
 from datetime import datetime, timezone
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import func, insert, literal, or_, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import undefer
 
 # Add the root directory of the project to the Python path
 project_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(project_root))
 
 from models.models import (
-    db, Student, Teacher, Module, Assignment, Submission, Result, Test,
-    SubmissionStatus, ProgrammingLanguage, TestType, GradeStatus, SubmissionFileType
+    db, Student, Assignment, Submission, Result, SubmissionStatus, GradeStatus, SubmissionFileType
 )
-from automarker import AutoMarker
+from events import status_broker, TERMINAL_STATUSES
+from bulk_import import BulkImportError, import_submissions, lateness
+from cache import assignment_cache, cache_stats, test_cache
+from models.compression import compression_ratios
+from utils.metrics import metrics
+from grading import JobPriority, enqueue_grading, pending_grading, run_grading, submit_jobs
+from grading.compiled import compiled_tests
+from grading.build_cache import build_cache_stats
+from grading.executor import executor_stats
+from grading.orchestrator import orchestrator_stats
+from grading.sandbox import sandbox_stats
 
 submissions_blueprint = Blueprint("submissions", __name__)
 
@@ -32,6 +45,23 @@ def validate_required_fields(data, required_fields):
         return error_response(f"Missing required fields: {', '.join(missing_fields)}")
     return None
 
+def wants_background():
+    """True when the client asked for grading to be queued (?async=true)"""
+    return request.args.get('async', 'false').lower() in ('1', 'true', 'yes')
+
+def queued_response(submission, queued):
+    """Standardized 202 response for a submission queued for background grading"""
+    return jsonify({
+        "message": "Submission queued for grading" if queued else "Submission already queued for grading",
+        "data": {
+            "submission_id": submission.submission_id,
+            "status": submission.status.value,
+            "queued": queued,
+            "status_url": f"/api/submissions/{submission.submission_id}/status",
+            "events_url": f"/api/submissions/{submission.submission_id}/events"
+        }
+    }), 202
+
 # Endpoint: GET /api/submissions
 @submissions_blueprint.route("/submissions", methods=["GET"])
 def get_submissions():
@@ -111,6 +141,43 @@ def get_submissions():
         current_app.logger.error(f"Unexpected error in get_submissions: {e}")
         return error_response("An unexpected error occurred", 500)
 
+def insert_next_attempt(values, retries=3):
+    """
+    Insert a submission as the student's next attempt in a single statement.
+
+    ``INSERT ... SELECT`` numbers the attempt one past the highest existing number
+    (not the count, which collides with an existing number when attempts have a
+    gap) and only produces a row if the student exists and ``max_attempts`` (a
+    count of attempts) is not reached, so validation and insert are one round
+    trip. Two concurrent submits that pick the same attempt number collide on
+    ``uq_submissions_attempt`` and the loser retries with a fresh number.
+    Returns the new (uncommitted) Submission, or None if nothing was inserted.
+    """
+    student_id, assignment_id = values['student_id'], values['assignment_id']
+    same_pair = (Submission.student_id == student_id, Submission.assignment_id == assignment_id)
+    previous_attempts = select(func.count()).where(*same_pair).scalar_subquery()
+    last_attempt = select(func.coalesce(func.max(Submission.attempt_number), 0)).where(*same_pair).scalar_subquery()
+    table = Submission.__table__
+    columns = list(values) + ['attempt_number']
+    rows = select(
+        *[literal(value, type_=table.c[name].type) for name, value in values.items()],
+        last_attempt + 1
+    ).select_from(Student).join(
+        Assignment, Assignment.assignment_id == assignment_id
+    ).where(
+        Student.student_id == student_id,
+        or_(Assignment.max_attempts.is_(None), previous_attempts < Assignment.max_attempts)
+    )
+    statement = insert(Submission).from_select(columns, rows).returning(Submission)
+    
+    for attempt in range(retries):
+        try:
+            with db.session.begin_nested():
+                return db.session.scalars(statement).first()
+        except IntegrityError:
+            if attempt == retries - 1:
+                raise
+
 # Endpoint: POST /api/submissions
 @submissions_blueprint.route("/submissions", methods=["POST"])
 def create_submission():
@@ -129,69 +196,55 @@ def create_submission():
         if validation_error:
             return validation_error
         
-        # Validate student exists
-        student = Student.query.get(data['student_id'])
-        if not student:
-            return error_response("Student not found", 404)
-            
-        # Validate assignment exists
-        assignment = Assignment.query.get(data['assignment_id'])
+        student_id, assignment_id = data['student_id'], data['assignment_id']
+        
+        # Assignment metadata comes from the in-process cache; the student is checked by the insert itself
+        assignment = assignment_cache.get(assignment_id)
         if not assignment:
             return error_response("Assignment not found", 404)
         
-        # Check assignment due date
         current_time = datetime.now(timezone.utc)
-        if assignment.due_date:
-            # Convert assignment due_date to timezone-aware for comparison
-            assignment_due_date_utc = assignment.due_date.replace(tzinfo=timezone.utc) if assignment.due_date.tzinfo is None else assignment.due_date
-            is_late = current_time > assignment_due_date_utc
-            days_late = (current_time - assignment_due_date_utc).days if is_late else 0
-        else:
-            is_late = False
-            days_late = 0
-        
-        # Check if student has reached max attempts
-        existing_attempts = Submission.query.filter_by(
-            student_id=data['student_id'],
-            assignment_id=data['assignment_id']
-        ).count()
-        
-        if existing_attempts >= assignment.max_attempts:
-            return error_response(f"Maximum attempts ({assignment.max_attempts}) reached")
+        is_late, days_late = lateness(assignment.due_date, current_time)
         
         # Validate file type if provided
         file_type = data.get('file_type')
         if file_type and file_type not in [ft.value for ft in SubmissionFileType]:
             return error_response(f"Invalid file type. Valid options: {[ft.value for ft in SubmissionFileType]}")
         
-        # Create new submission
-        submission = Submission(
-            student_id=data['student_id'],
-            assignment_id=data['assignment_id'],
-            file_name=data.get('file_name'),
-            file_type=SubmissionFileType(file_type) if file_type else SubmissionFileType.PYTHON_FILE,
-            attempt_number=existing_attempts + 1,
-            submission_date=current_time,
-            is_late=is_late,
-            days_late=days_late,
-            status=SubmissionStatus.SUBMITTED,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent')
-        )
+        values = {
+            'student_id': student_id,
+            'assignment_id': assignment_id,
+            'file_name': data.get('file_name'),
+            'file_type': SubmissionFileType(file_type) if file_type else SubmissionFileType.PYTHON_FILE,
+            'submission_date': current_time,
+            'is_late': is_late,
+            'days_late': days_late,
+            'status': SubmissionStatus.SUBMITTED,
+            'ip_address': request.remote_addr,
+            'user_agent': request.headers.get('User-Agent')
+        }
         
         # Handle file content (if provided)
         if 'file_content' in data:
             file_content_bytes = data['file_content'].encode('utf-8')
-            submission.submission_file = file_content_bytes
-            submission.file_size = len(file_content_bytes)
+            values['submission_file'] = file_content_bytes
+            values['file_size'] = len(file_content_bytes)
+        
+        submission = insert_next_attempt(values)
+        if submission is None:
+            # Slow path, only to explain why nothing was inserted
+            if db.session.get(Student, student_id) is None:
+                return error_response("Student not found", 404)
+            return error_response(f"Maximum attempts ({assignment.max_attempts}) reached")
         
-        db.session.add(submission)
+        # Serialise from the RETURNING row before commit expires it
+        submission_data = submission.to_dict()
         db.session.commit()
         
-        current_app.logger.info(f"Submission created: ID {submission.submission_id} by student {data['student_id']}")
+        current_app.logger.info(f"Submission created: ID {submission_data['submission_id']} by student {student_id}")
         
         return success_response(
-            submission.to_dict(), 
+            submission_data, 
             "Submission created successfully"
         )
         
@@ -234,6 +287,7 @@ def get_submission(submission_id):
         
         if submission.result:
             submission_data['result'] = submission.result.to_dict()
+            submission_data['result']['test_cases'] = [tc.to_dict() for tc in submission.result.test_cases]
         
         return success_response(submission_data)
         
@@ -244,6 +298,134 @@ def get_submission(submission_id):
         current_app.logger.error(f"Unexpected error in get_submission: {e}")
         return error_response("An unexpected error occurred", 500)
 
+def get_submission_status(submission_id):
+    """Read only the status column (no BLOBs) and release the DB connection."""
+    status = db.session.query(Submission.status).filter_by(submission_id=submission_id).scalar()
+    # Do not hold a pooled connection while the client waits
+    db.session.close()
+    return status
+
+def recheck_interval():
+    """
+    Seconds a status waiter listens to the broker before re-reading the database.
+
+    Transitions committed by other processes (grading workers, other API
+    workers) are never published to this process's broker.
+    """
+    return current_app.config.get('STATUS_RECHECK_SECONDS', 5)
+
+# Endpoint: GET /api/submissions/{submission_id}/status
+@submissions_blueprint.route("/submissions/<int:submission_id>/status", methods=["GET"])
+def wait_for_submission_status(submission_id):
+    """
+    Long-poll for a status change
+    Query params:
+    - since: Status the client already knows; the request waits while it is unchanged
+    - wait: Seconds to wait for a change (default: 0, max: 60)
+    """
+    try:
+        since = request.args.get('since')
+        wait = min(max(request.args.get('wait', 0, type=float), 0), 60)
+        
+        recheck = recheck_interval()
+        with status_broker.subscribe(submission_id) as subscription:
+            status = get_submission_status(submission_id)
+            if status is None:
+                return error_response("Submission not found", 404)
+            
+            current = status.value
+            # Wait for a published transition to a different status, or find it in the database
+            deadline = time.monotonic() + wait
+            while current == since:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                event = subscription.wait(min(recheck, remaining))
+                if event is not None:
+                    current = event['status']
+                else:
+                    status = get_submission_status(submission_id)
+                    current = status.value if status else current
+        
+        return jsonify({
+            "submission_id": submission_id,
+            "status": current,
+            "changed": since is not None and current != since,
+            "terminal": SubmissionStatus(current) in TERMINAL_STATUSES
+        }), 200
+        
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error in wait_for_submission_status: {e}")
+        return error_response("Database error occurred", 500)
+
+# Endpoint: GET /api/submissions/{submission_id}/events
+@submissions_blueprint.route("/submissions/<int:submission_id>/events", methods=["GET"])
+def stream_submission_events(submission_id):
+    """
+    Server-Sent Events stream of status transitions
+    Sends the current status first, then one `status` event per transition until the
+    submission reaches a terminal status or `timeout` seconds (default: 300) pass.
+    """
+    timeout = min(max(request.args.get('timeout', 300, type=float), 1), 900)
+    keepalive = current_app.config.get('SSE_KEEPALIVE_SECONDS', 15)
+    recheck = recheck_interval()
+    
+    subscription = status_broker.subscribe(submission_id)
+    try:
+        status = get_submission_status(submission_id)
+    except SQLAlchemyError as e:
+        subscription.close()
+        current_app.logger.error(f"Database error in stream_submission_events: {e}")
+        return error_response("Database error occurred", 500)
+    if status is None:
+        subscription.close()
+        return error_response("Submission not found", 404)
+    
+    def format_event(payload):
+        return f"event: status\ndata: {json.dumps(payload)}\n\n"
+    
+    def generate():
+        try:
+            current = status.value
+            yield format_event({"submission_id": submission_id, "status": current})
+            if status in TERMINAL_STATUSES:
+                return
+            
+            deadline = time.monotonic() + timeout
+            last_write = time.monotonic()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                event = subscription.wait(min(recheck, remaining))
+                if event is None:
+                    try:
+                        latest = get_submission_status(submission_id)
+                    except SQLAlchemyError as e:
+                        current_app.logger.error(f"Database error in stream_submission_events: {e}")
+                        latest = None
+                    if latest is not None and latest.value != current:
+                        event = {"submission_id": submission_id, "status": latest.value}
+                if event is None:
+                    if time.monotonic() - last_write >= keepalive:
+                        # Comment line keeps proxies from closing an idle connection
+                        yield ": keepalive\n\n"
+                        last_write = time.monotonic()
+                    continue
+                current = event['status']
+                yield format_event(event)
+                last_write = time.monotonic()
+                if SubmissionStatus(current) in TERMINAL_STATUSES:
+                    return
+        finally:
+            subscription.close()
+    
+    # The stream re-reads the status, so it keeps the request's app context
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 # Endpoint: GET /api/results
 @submissions_blueprint.route("/results", methods=["GET"])
 def get_results():
@@ -265,8 +447,8 @@ def get_results():
         if page < 1 or per_page < 1:
             return error_response("Page and per_page must be positive integers")
         
-        # Build query
-        query = Result.query
+        # Build query; the listing returns the deferred output and feedback of every row
+        query = Result.query.options(undefer(Result.actual_output), undefer(Result.feedback))
         
         if submission_id:
             # Find the result_id for the given submission_id first
@@ -356,42 +538,30 @@ def grade_submission(submission_id):
         if not submission.submission_file:
             return error_response("No code file found in submission")
         
-        # Get associated assignment and test
-        assignment = Assignment.query.get(submission.assignment_id)
+        # Get associated assignment and test from the metadata caches
+        assignment = assignment_cache.get(submission.assignment_id)
         if not assignment:
             return error_response("Assignment not found", 404)
         
-        test = assignment.test
-        if not test:
+        if assignment.test_id is None or not test_cache.get(assignment.test_id):
             return error_response("No test found for this assignment", 404)
         
         # Check if already graded
         if submission.result and submission.result.grade_status == GradeStatus.GRADED:
             return error_response("Submission already graded. Use PUT to re-grade.")
         
-        # Check if submission has required files
-        if not submission.submission_file:
-            return error_response("No submission file found to grade")
-        
-        # Get associated assignment and test
-        assignment = submission.assignment
-        if not assignment:
-            return error_response("Assignment not found", 404)
-        
-        if not assignment.test or not assignment.test.test_file:
+        if not test_cache.artifact(assignment.test_id):
             return error_response("No test file found for this assignment", 404)
         
-        # Update submission status to grading
-        submission.status = SubmissionStatus.GRADING
-        db.session.commit()
-        
-        # Initialize AutoMarker and run grading
-        automarker = AutoMarker()
+        # Queue for a background worker when requested
+        if wants_background():
+            queued = enqueue_grading(submission, JobPriority.INTERACTIVE)
+            return queued_response(submission, queued)
         
         current_app.logger.info(f"Starting automated grading for submission {submission_id}")
         
-        # Run the automarker (this now handles everything internally)
-        grading_result = automarker.mark_submission(submission_id)
+        # Run the automarker; concurrent requests for this submission share one run
+        grading_result = run_grading(submission_id)
         
         if grading_result.get('success', False):
             current_app.logger.info(f"Submission {submission_id} graded successfully. Score: {grading_result.get('score', 0)}")
@@ -410,7 +580,8 @@ def grade_submission(submission_id):
                     "tests_passed": grading_result.get('tests_passed', 0),
                     "tests_failed": grading_result.get('tests_failed', 0),
                     "tests_errors": grading_result.get('tests_errors', 0),
-                    "status": grading_result.get('status', 'unknown')
+                    "status": grading_result.get('status', 'unknown'),
+                    "coalesced": grading_result.get('coalesced', False)
                 }
             }, "Submission graded successfully")
         else:
@@ -445,18 +616,13 @@ def regrade_submission(submission_id):
         
         current_app.logger.info(f"Re-grading submission {submission_id}")
         
-        # Delete existing result if present
-        if submission.result:
-            db.session.delete(submission.result)
-            submission.result_id = None
-        
-        # Reset submission status
-        submission.status = SubmissionStatus.SUBMITTED
-        db.session.commit()
+        # Queue for a background worker when requested
+        if wants_background():
+            queued = enqueue_grading(submission, JobPriority.REGRADE, regrade=True)
+            return queued_response(submission, queued)
         
-        # Initialize AutoMarker and run grading
-        automarker = AutoMarker()
-        grading_result = automarker.mark_submission(submission_id)
+        # Delete the existing result and re-run the automarker under the grading lease
+        grading_result = run_grading(submission_id, regrade=True)
         
         if grading_result.get('success', False):
             current_app.logger.info(f"Submission {submission_id} re-graded successfully. Score: {grading_result.get('score', 0)}")
@@ -475,7 +641,8 @@ def regrade_submission(submission_id):
                     "tests_passed": grading_result.get('tests_passed', 0),
                     "tests_failed": grading_result.get('tests_failed', 0),
                     "tests_errors": grading_result.get('tests_errors', 0),
-                    "status": grading_result.get('status', 'unknown')
+                    "status": grading_result.get('status', 'unknown'),
+                    "coalesced": grading_result.get('coalesced', False)
                 }
             }, "Submission re-graded successfully")
         else:
@@ -496,6 +663,116 @@ def regrade_submission(submission_id):
         current_app.logger.error(f"Unexpected error in regrade_submission: {e}")
         return error_response("Re-grading failed", 500)
 
+# Endpoint: POST /api/assignments/{assignment_id}/regrade
+@submissions_blueprint.route("/assignments/<int:assignment_id>/regrade", methods=["POST"])
+def bulk_regrade_assignment(assignment_id):
+    """
+    Queue every submission of an assignment for re-grading
+    Runs in the bulk priority class so interactive grading is not starved.
+    """
+    try:
+        assignment = Assignment.query.get(assignment_id)
+        if not assignment:
+            return error_response("Assignment not found", 404)
+        
+        submissions = db.session.query(
+            Submission.submission_id, Submission.student_id, Submission.assignment_id
+        ).filter(
+            Submission.assignment_id == assignment_id,
+            Submission.submission_file.isnot(None)
+        ).all()
+        
+        # One UPDATE for the whole batch instead of a commit per submission
+        Submission.query.filter(
+            Submission.submission_id.in_([s.submission_id for s in submissions]),
+            Submission.status != SubmissionStatus.GRADING
+        ).update({Submission.status: SubmissionStatus.PROCESSING}, synchronize_session=False)
+        db.session.commit()
+        
+        for row in submissions:
+            status_broker.publish(row.submission_id, SubmissionStatus.PROCESSING)
+        queued = submit_jobs(submissions, JobPriority.BULK, regrade=True)
+        
+        current_app.logger.info(f"Bulk regrade of assignment {assignment_id}: {queued} queued")
+        
+        return jsonify({
+            "message": "Bulk regrade queued",
+            "data": {
+                "assignment_id": assignment_id,
+                "queued": queued,
+                "already_queued": len(submissions) - queued,
+                "pending": pending_grading()
+            }
+        }), 202
+        
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Database error in bulk_regrade_assignment: {e}")
+        return error_response("Database error occurred", 500)
+
+# Endpoint: POST /api/assignments/{assignment_id}/submissions/import
+@submissions_blueprint.route("/assignments/<int:assignment_id>/submissions/import", methods=["POST"])
+def import_assignment_submissions(assignment_id):
+    """
+    Import a ZIP archive of <student_number>/<file> entries as submissions
+    Form fields: archive (file, required), submitted_at (ISO 8601, optional; defaults to now)
+    Query params:
+    - grade: true to queue every imported submission for background grading
+    """
+    try:
+        if not db.session.get(Assignment, assignment_id):
+            return error_response("Assignment not found", 404)
+        
+        archive = request.files.get('archive')
+        if archive is None:
+            return error_response("Missing required file: archive")
+        
+        submitted_at = None
+        if request.form.get('submitted_at'):
+            try:
+                submitted_at = datetime.fromisoformat(request.form['submitted_at'])
+            except ValueError:
+                return error_response("Invalid submitted_at. Expected ISO 8601 format")
+            if submitted_at.tzinfo is None:
+                submitted_at = submitted_at.replace(tzinfo=timezone.utc)
+        
+        enqueue = request.args.get('grade', 'false').lower() in ('1', 'true', 'yes')
+        report = import_submissions(
+            archive.stream, assignment_id,
+            submitted_at=submitted_at,
+            enqueue=enqueue,
+            ip_address=request.remote_addr,
+            user_agent=request.headers.get('User-Agent')
+        )
+        
+        current_app.logger.info(f"Imported {len(report.imported)} submissions for assignment {assignment_id} "
+                                f"({len(report.skipped)} skipped)")
+        
+        data = report.to_dict()
+        data["queued_for_grading"] = enqueue
+        return success_response(data, "Submissions imported successfully")
+        
+    except BulkImportError as e:
+        return error_response(str(e))
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Database error in import_assignment_submissions: {e}")
+        return error_response("Database error occurred", 500)
+
+# Endpoint: GET /api/metrics
+@submissions_blueprint.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Process-local counters, including raw/stored bytes and ratio per compressed column"""
+    return jsonify({
+        "counters": metrics.snapshot(),
+        "compression_ratio": compression_ratios(),
+        "caches": {**cache_stats(), "compiled_tests": compiled_tests.stats(), "builds": build_cache_stats()},
+        "executor": executor_stats(),
+        "subprocesses": orchestrator_stats(),
+        "sandboxes": sandbox_stats(),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }), 200
+
 # Health check endpoint
 @submissions_blueprint.route("/health", methods=["GET"])
 def health_check():
@@ -0,0 +1,201 @@
+"""
+Bulk import of a class's submissions from a ZIP archive
+
+The archive holds one directory per student, named by student number::
+
+    s1234567/solution.py
+    s7654321/solution.py
+
+Rather than one ``POST /api/submissions`` per file (each loading the student and
+assignment, counting attempts and committing on its own), the import resolves
+every student number in one query, counts existing attempts per student in one
+grouped query, computes lateness once for the import time and inserts the
+submissions in batched transactions. Entries are read from the archive one at a
+time, so at most one batch of file contents is held in memory.
+"""
+
+import posixpath
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+
+from grading import JobPriority, submit_jobs
+from models.models import db, Assignment, Student, Submission, SubmissionFileType, SubmissionStatus
+
+DEFAULT_BATCH_SIZE = 200
+MAX_IMPORT_FILE_SIZE = 5 * 1024 * 1024  # Per file, uncompressed
+
+FILE_TYPES = {file_type.value: file_type for file_type in SubmissionFileType}
+
+
+class BulkImportError(ValueError):
+    """Raised when an archive cannot be imported at all (as opposed to skipped entries)."""
+
+
+@dataclass
+class ImportReport:
+    assignment_id: int
+    imported: List[dict] = field(default_factory=list)  # submission_id, student_id, student_number, file_name
+    skipped: List[dict] = field(default_factory=list)   # entry, reason
+
+    def to_dict(self):
+        return {
+            "assignment_id": self.assignment_id,
+            "imported_count": len(self.imported),
+            "skipped_count": len(self.skipped),
+            "imported": self.imported,
+            "skipped": self.skipped
+        }
+
+
+def archive_entries(archive: zipfile.ZipFile) -> Iterator[Tuple[zipfile.ZipInfo, Optional[str], Optional[str]]]:
+    """
+    Yield ``(info, student_number, file_name)`` for every file entry, in archive order.
+
+    Entries that are not exactly ``<student_number>/<file>`` yield ``None`` for both
+    names. Directories and archiver metadata (``__MACOSX``, dot files) are ignored.
+    """
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        parts = [part for part in posixpath.normpath(info.filename).split("/") if part]
+        if parts[0] == "__MACOSX" or parts[-1].startswith("."):
+            continue
+        if len(parts) != 2 or parts[0] in ("..", "."):
+            yield info, None, None
+        else:
+            yield info, parts[0], parts[1]
+
+
+def lateness(due_date: Optional[datetime], submitted_at: datetime) -> Tuple[bool, int]:
+    """``(is_late, days_late)`` for a submission made at ``submitted_at`` (as in create_submission)."""
+    if not due_date:
+        return False, 0
+    due = due_date.replace(tzinfo=timezone.utc) if due_date.tzinfo is None else due_date
+    if submitted_at <= due:
+        return False, 0
+    return True, (submitted_at - due).days
+
+
+def import_submissions(source, assignment_id: int, submitted_at: Optional[datetime] = None,
+                       enqueue: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+                       ip_address: Optional[str] = None, user_agent: Optional[str] = None) -> ImportReport:
+    """
+    Import every ``<student_number>/<file>`` entry of a ZIP archive as a submission.
+
+    ``source`` is a path or seekable binary file object. Each file becomes the
+    student's next attempt; entries for unknown students, unsupported file types,
+    oversized files or students past ``max_attempts`` are skipped and reported.
+    With ``enqueue`` the new submissions are created as PROCESSING and queued for
+    background grading in the bulk priority class.
+    """
+    assignment = db.session.get(Assignment, assignment_id)
+    if assignment is None:
+        raise BulkImportError("Assignment not found")
+    submitted_at = submitted_at or datetime.now(timezone.utc)
+    is_late, days_late = lateness(assignment.due_date, submitted_at)
+    max_attempts = assignment.max_attempts
+    report = ImportReport(assignment_id)
+
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile as e:
+        raise BulkImportError(f"Not a valid ZIP archive: {e}")
+
+    with archive:
+        entries = list(archive_entries(archive))
+        student_numbers = {number for _, number, _ in entries if number}
+
+        # One query for all students, one for all of their existing attempts
+        students = dict(db.session.execute(
+            select(Student.student_number, Student.student_id)
+            .where(Student.student_number.in_(student_numbers))
+        ).all()) if student_numbers else {}
+        # Attempts are counted against max_attempts but numbered past the highest
+        # existing attempt, which may exceed the count once attempts are deleted
+        attempts, last_attempt = {}, {}
+        if students:
+            for student_id, count, last in db.session.execute(
+                select(Submission.student_id, func.count(), func.max(Submission.attempt_number))
+                .where(Submission.assignment_id == assignment_id,
+                       Submission.student_id.in_(students.values()))
+                .group_by(Submission.student_id)
+            ):
+                attempts[student_id], last_attempt[student_id] = count, last or 0
+
+        batch, batch_entries = [], []
+        for info, student_number, file_name in entries:
+            reason = None
+            student_id = students.get(student_number)
+            file_type = FILE_TYPES.get(posixpath.splitext(file_name or "")[1].lower())
+            if student_number is None:
+                reason = "Expected <student_number>/<file>"
+            elif student_id is None:
+                reason = f"Unknown student number {student_number}"
+            elif file_type is None:
+                reason = "Unsupported file type"
+            elif info.file_size > MAX_IMPORT_FILE_SIZE:
+                reason = f"File larger than {MAX_IMPORT_FILE_SIZE} bytes"
+            elif max_attempts is not None and attempts.get(student_id, 0) >= max_attempts:
+                reason = f"Maximum attempts ({max_attempts}) reached"
+            if reason:
+                report.skipped.append({"entry": info.filename, "reason": reason})
+                continue
+
+            attempts[student_id] = attempts.get(student_id, 0) + 1
+            last_attempt[student_id] = last_attempt.get(student_id, 0) + 1
+            content = archive.read(info)
+            batch.append({
+                "student_id": student_id,
+                "assignment_id": assignment_id,
+                "submission_file": content,
+                "file_name": file_name,
+                "file_type": file_type,
+                "file_size": len(content),
+                "attempt_number": last_attempt[student_id],
+                "submission_date": submitted_at,
+                "is_late": is_late,
+                "days_late": days_late,
+                "status": SubmissionStatus.PROCESSING if enqueue else SubmissionStatus.SUBMITTED,
+                "ip_address": ip_address,
+                "user_agent": user_agent
+            })
+            batch_entries.append({"student_id": student_id, "student_number": student_number,
+                                  "file_name": file_name})
+            if len(batch) >= batch_size:
+                _insert_batch(batch, batch_entries, report, assignment_id, enqueue)
+                batch, batch_entries = [], []
+        _insert_batch(batch, batch_entries, report, assignment_id, enqueue)
+
+    return report
+
+
+def _insert_batch(batch, batch_entries, report, assignment_id, enqueue):
+    """Insert one batch of submissions in its own transaction, then queue them if requested."""
+    if not batch:
+        return
+    try:
+        # (student, attempt) identifies each row, so RETURNING order does not matter and
+        # the rows can go out as a single multi-row INSERT
+        returned = db.session.execute(
+            insert(Submission).returning(
+                Submission.submission_id, Submission.student_id, Submission.attempt_number
+            ),
+            batch
+        ).all()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    ids = {(row.student_id, row.attempt_number): row.submission_id for row in returned}
+    jobs = []
+    for entry, row in zip(batch_entries, batch):
+        submission_id = ids[(row["student_id"], row["attempt_number"])]
+        report.imported.append(dict(entry, submission_id=submission_id))
+        jobs.append((submission_id, entry["student_id"], assignment_id))
+    if enqueue:
+        submit_jobs(jobs, JobPriority.BULK)
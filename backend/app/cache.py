@@ -0,0 +1,270 @@
+"""
+In-process read-through caches for assignment and test metadata
+
+Submitting and grading need the same few assignments and their test files over
+and over while hundreds of students work on them. These caches keep:
+
+- assignment metadata (due date, attempt limit, scoring fields, test id), loaded
+  with a narrow column query without the description/rubric text;
+- test metadata (version, ``updated_at``, language, timeout);
+- test artifacts (the decompressed test file and its SHA-256, plus the I/O
+  cases and comparison options of native I/O tests), keyed by
+  ``(test_id, version, updated_at)`` so an edited test can never be served from
+  an entry built for its previous revision.
+
+Entries are dropped when an ``Assignment`` or ``Test`` is updated or deleted
+through the ORM in this process (at flush and again at commit); the TTL bounds
+staleness for changes made by other processes or raw SQL. ``max_attempts`` is
+re-checked in SQL when inserting, so a stale entry can never let a student
+exceed it.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Hashable, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from models.models import db, Assignment, ProgrammingLanguage, Test, TestType
+
+DEFAULT_TTL = 30.0
+
+
+class LRUCache:
+    """Thread-safe LRU cache with per-entry TTL and hit/miss/eviction counters."""
+
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], object]):
+        """Read-through lookup; a ``None`` result from ``loader`` is not cached."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def invalidate(self, key: Hashable = None) -> None:
+        """Drop one entry, or everything when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+@dataclass(frozen=True)
+class AssignmentMeta:
+    assignment_id: int
+    title: str
+    due_date: Optional[datetime]
+    max_attempts: Optional[int]
+    max_score: Optional[float]
+    pass_threshold: Optional[float]
+    test_id: Optional[int]
+
+
+@dataclass(frozen=True)
+class TestMeta:
+    __test__ = False  # Not a pytest test class
+
+    test_id: int
+    version: Optional[str]
+    updated_at: Optional[datetime]
+    timeout_seconds: Optional[int]
+    programming_language: Optional[ProgrammingLanguage]
+    test_type: Optional[TestType]
+
+    @property
+    def revision(self):
+        return (self.test_id, self.version, self.updated_at)
+
+
+@dataclass(frozen=True)
+class TestArtifact:
+    """A test revision's file, decompressed once and shared by every grading run."""
+    __test__ = False
+
+    test_id: int
+    version: Optional[str]
+    updated_at: Optional[datetime]
+    source: bytes
+    sha256: str
+    input_data: Optional[str] = None
+    expected_output: Optional[str] = None
+    io_options: Optional[str] = None
+    timeout_seconds: Optional[int] = None  # Per program run
+
+    @property
+    def is_io_test(self) -> bool:
+        """Graded natively from input/expected output rather than by running a unittest file."""
+        return self.io_options is not None or not self.source
+
+
+class AssignmentMetadataCache:
+
+    def __init__(self, maxsize: int = 256, ttl: float = DEFAULT_TTL):
+        self.entries = LRUCache(maxsize, ttl)
+
+    def get(self, assignment_id: int) -> Optional[AssignmentMeta]:
+        """Cached metadata for an assignment, or None if it does not exist (misses are not cached)."""
+        return self.entries.get_or_load(assignment_id, lambda: self._load(assignment_id))
+
+    @staticmethod
+    def _load(assignment_id):
+        row = db.session.execute(
+            select(Assignment.assignment_id, Assignment.title, Assignment.due_date, Assignment.max_attempts,
+                   Assignment.max_score, Assignment.pass_threshold, Assignment.test_id)
+            .where(Assignment.assignment_id == assignment_id)
+        ).first()
+        return AssignmentMeta(*row) if row else None
+
+    def invalidate(self, assignment_id: Optional[int] = None) -> None:
+        self.entries.invalidate(assignment_id)
+
+    def stats(self) -> dict:
+        return self.entries.stats()
+
+
+class TestCache:
+    """Test metadata by ``test_id`` and test artifacts by ``(test_id, version, updated_at)``."""
+    __test__ = False
+
+    def __init__(self, maxsize: int = 64, ttl: float = DEFAULT_TTL, artifact_ttl: Optional[float] = None):
+        self.metadata = LRUCache(maxsize, ttl)
+        # Artifacts are immutable per revision, so they only leave by LRU or invalidation
+        self.artifacts = LRUCache(maxsize, artifact_ttl)
+
+    def get(self, test_id: int) -> Optional[TestMeta]:
+        return self.metadata.get_or_load(test_id, lambda: self._load(test_id))
+
+    @staticmethod
+    def _load(test_id):
+        row = db.session.execute(
+            select(Test.test_id, Test.version, Test.updated_at, Test.timeout_seconds,
+                   Test.programming_language, Test.test_type)
+            .where(Test.test_id == test_id)
+        ).first()
+        return TestMeta(*row) if row else None
+
+    def artifact(self, test_id: Optional[int]) -> Optional[TestArtifact]:
+        """The current revision's test, or None if the test does not exist or has nothing to run."""
+        meta = self.get(test_id) if test_id is not None else None
+        if meta is None:
+            return None
+        return self.artifacts.get_or_load(meta.revision, lambda: self._load_artifact(meta))
+
+    @staticmethod
+    def _load_artifact(meta):
+        row = db.session.execute(
+            select(Test.test_file, Test.input_data, Test.expected_output, Test.io_options)
+            .where(Test.test_id == meta.test_id)
+        ).first()
+        if row is None:
+            return None
+        source, input_data, expected_output, io_options = row
+        if not source and io_options is None and not expected_output:
+            return None
+        source = source or b""
+        return TestArtifact(meta.test_id, meta.version, meta.updated_at, source,
+                            hashlib.sha256(source).hexdigest(), input_data, expected_output, io_options,
+                            meta.timeout_seconds)
+
+    def invalidate(self, test_id: Optional[int] = None) -> None:
+        self.metadata.invalidate(test_id)
+        if test_id is None:
+            self.artifacts.invalidate()
+        else:
+            self.artifacts.invalidate_where(lambda revision: revision[0] == test_id)
+
+    def stats(self) -> dict:
+        return {"metadata": self.metadata.stats(), "artifacts": self.artifacts.stats()}
+
+
+# Process-wide caches used by the submissions blueprint and the automarker
+assignment_cache = AssignmentMetadataCache()
+test_cache = TestCache()
+
+
+def cache_stats() -> dict:
+    return {"assignments": assignment_cache.stats(), "tests": test_cache.stats()}
+
+
+def invalidate_all() -> None:
+    assignment_cache.invalidate()
+    test_cache.invalidate()
+
+
+_CACHES = {Assignment: (assignment_cache, "assignment_id"), Test: (test_cache, "test_id")}
+
+
+def _invalidate_target(mapper, connection, target):
+    # Dropped at flush and again at commit, so a reload in between cannot keep the old values
+    cache, key_name = _CACHES[mapper.class_]
+    key = getattr(target, key_name)
+    cache.invalidate(key)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_cache_keys", set()).add((mapper.class_, key))
+
+
+for _model in _CACHES:
+    event.listen(_model, "after_update", _invalidate_target)
+    event.listen(_model, "after_delete", _invalidate_target)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for model, key in session.info.pop("changed_cache_keys", ()):
+        _CACHES[model][0].invalidate(key)
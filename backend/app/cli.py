@@ -0,0 +1,119 @@
+"""
+Flask CLI commands for the CSRS Automated Assessment System
+
+Usage (from backend/app):
+    flask --app app init-db     # create or upgrade the schema (runs pending migrations)
+    flask --app app db-status   # show the current schema version and pending migrations
+    flask --app app seed-db     # add sample data to an empty database
+    flask --app app import-submissions ASSIGNMENT_ID ARCHIVE.zip [--grade]
+    flask --app app recover-grading  # requeue jobs of dead workers, remove their scratch files
+    flask --app app grading-worker [--threads N] [--burst]
+"""
+
+import os
+import signal
+from datetime import timezone
+
+import click
+from flask import current_app
+from sqlalchemy.engine import make_url
+
+from models.models import db
+from migrations import current_version, pending_migrations, upgrade
+from seed import seed_sample_data
+from bulk_import import BulkImportError, import_submissions
+from grading import run_grading
+from grading.jobs import DEFAULT_MAX_ATTEMPTS, DEFAULT_SCRATCH_MAX_AGE, recover_jobs, sweep_scratch
+from grading.worker import GradingWorker
+
+
+def ensure_sqlite_directory(database_uri: str) -> None:
+    """Create the parent directory of a file-based SQLite database if needed."""
+    url = make_url(database_uri)
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:':
+        directory = os.path.dirname(os.path.abspath(url.database))
+        os.makedirs(directory, exist_ok=True)
+
+
+def init_database(log=None) -> list:
+    """Bring the configured database up to the latest schema migration."""
+    ensure_sqlite_directory(current_app.config['SQLALCHEMY_DATABASE_URI'])
+    return upgrade(db.engine, log=log)
+
+
+def register_commands(app):
+    """Register all CLI commands on the application"""
+
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create or upgrade the database schema."""
+        applied = init_database(log=click.echo)
+        click.echo(f"✅ Database schema at version {current_version(db.engine)} "
+                   f"({len(applied)} migration(s) applied)")
+
+    @app.cli.command("db-status")
+    def db_status_command():
+        """Show the schema version and any pending migrations."""
+        click.echo(f"Current schema version: {current_version(db.engine)}")
+        for migration in pending_migrations(db.engine):
+            click.echo(f"  pending: {migration.version:04d}_{migration.name}")
+
+    @app.cli.command("seed-db")
+    def seed_db_command():
+        """Add sample data if the database is empty."""
+        init_database()
+        if seed_sample_data():
+            click.echo("✅ Sample data created successfully!")
+        else:
+            click.echo("Database already contains data, skipping sample data.")
+
+    @app.cli.command("import-submissions")
+    @click.argument("assignment_id", type=int)
+    @click.argument("archive", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--submitted-at", type=click.DateTime(), default=None,
+                  help="Submission time (UTC) used for lateness; defaults to now.")
+    @click.option("--grade", is_flag=True, help="Grade each imported submission before exiting.")
+    def import_submissions_command(assignment_id, archive, submitted_at, grade):
+        """Import a ZIP of <student_number>/<file> entries as submissions."""
+        if submitted_at is not None:
+            submitted_at = submitted_at.replace(tzinfo=timezone.utc)
+        try:
+            report = import_submissions(archive, assignment_id, submitted_at=submitted_at)
+        except BulkImportError as e:
+            raise click.ClickException(str(e))
+
+        for skipped in report.skipped:
+            click.echo(f"  skipped {skipped['entry']}: {skipped['reason']}")
+        click.echo(f"✅ Imported {len(report.imported)} submission(s), skipped {len(report.skipped)}")
+
+        if grade:
+            # A CLI process exits when done, so grade in the foreground instead of queueing
+            for entry in report.imported:
+                result = run_grading(entry["submission_id"])
+                click.echo(f"  graded {entry['student_number']}/{entry['file_name']}: "
+                           f"{result.get('status', result.get('error', 'unknown'))}")
+
+    @app.cli.command("recover-grading")
+    def recover_grading_command():
+        """Requeue grading jobs abandoned by dead workers and sweep their scratch space."""
+        recovery = recover_jobs(db.engine, current_app.config.get('GRADING_JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS))
+        swept = sweep_scratch(max_age=current_app.config.get('GRADING_SCRATCH_MAX_AGE_SECONDS',
+                                                             DEFAULT_SCRATCH_MAX_AGE))
+        click.echo(f"✅ {len(recovery.requeued)} job(s) requeued, {len(recovery.adopted)} stuck submission(s) "
+                   f"queued, {len(recovery.failed)} failed after repeated crashes; "
+                   f"{len(recovery.queued)} waiting for a worker; {swept} scratch entries removed")
+
+    @app.cli.command("grading-worker")
+    @click.option("--threads", type=int, default=None,
+                  help="Jobs graded at once (default: GRADING_WORKERS, or 2).")
+    @click.option("--burst", is_flag=True, help="Exit once the queue is empty instead of waiting for jobs.")
+    def grading_worker_command(threads, burst):
+        """Grade queued jobs from the database until stopped (set GRADING_QUEUE=database on the API)."""
+        worker = GradingWorker(current_app._get_current_object(),
+                               threads=threads or current_app.config.get('GRADING_WORKERS', 2))
+        # Finish the jobs in progress, then exit; anything left is requeued by the next recovery
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: worker.stop())
+        click.echo(f"Grading worker started with {worker.threads} thread(s)")
+        graded = worker.run(burst=burst)
+        click.echo(f"✅ Grading worker stopped after {graded} job(s)")
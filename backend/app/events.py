@@ -0,0 +1,119 @@
+"""
+In-process pub/sub for submission status transitions
+
+The automarker publishes every ``SubmissionStatus`` change here after it is
+committed. Long-poll and Server-Sent Events endpoints subscribe instead of
+re-querying the database: all clients waiting on the same submission share a
+single channel (one condition variable), so a deadline rush of watchers costs
+one wake-up per transition rather than one query per client per poll.
+
+Only clients connected to the same process are notified. Transitions committed
+elsewhere, such as by a standalone grading worker, are never published here, so
+waiting clients also re-read the status from the database every
+``STATUS_RECHECK_SECONDS``.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from models.models import SubmissionStatus
+
+# Statuses after which a submission will not change again without a regrade
+TERMINAL_STATUSES = frozenset({
+    SubmissionStatus.GRADED,
+    SubmissionStatus.PASSED,
+    SubmissionStatus.PARTIAL,
+    SubmissionStatus.FAILED,
+    SubmissionStatus.ERROR,
+})
+
+
+class _Channel:
+    """Latest event for one submission plus the waiters sharing it."""
+
+    def __init__(self, lock):
+        self.condition = threading.Condition(lock)
+        self.sequence = 0
+        self.event = None
+        self.subscribers = 0
+
+
+class Subscription:
+    """A client's view of a channel; remembers which events it has already seen."""
+
+    def __init__(self, broker, submission_id, channel):
+        self._broker = broker
+        self.submission_id = submission_id
+        self._channel = channel
+        self._seen = channel.sequence
+
+    def wait(self, timeout: float) -> Optional[dict]:
+        """Block until an event newer than the last one seen arrives, or ``timeout`` expires."""
+        deadline = time.monotonic() + timeout
+        channel = self._channel
+        with channel.condition:
+            while channel.sequence == self._seen:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                channel.condition.wait(remaining)
+            self._seen = channel.sequence
+            return channel.event
+
+    def close(self):
+        self._broker._unsubscribe(self.submission_id, self._channel)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class StatusBroker:
+    """Fan-out of status events keyed by submission id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def subscribe(self, submission_id: int) -> Subscription:
+        """
+        Register interest in a submission.
+
+        Subscribe *before* reading the current status from the database so that a
+        transition committed in between is not missed.
+        """
+        with self._lock:
+            channel = self._channels.get(submission_id)
+            if channel is None:
+                channel = self._channels[submission_id] = _Channel(self._lock)
+            channel.subscribers += 1
+            return Subscription(self, submission_id, channel)
+
+    def _unsubscribe(self, submission_id, channel):
+        with self._lock:
+            channel.subscribers -= 1
+            if channel.subscribers <= 0 and self._channels.get(submission_id) is channel:
+                del self._channels[submission_id]
+
+    def publish(self, submission_id: int, status: SubmissionStatus, **data) -> None:
+        """Wake every subscriber of ``submission_id``; a no-op when nobody is listening."""
+        event = dict(data, submission_id=submission_id, status=status.value)
+        with self._lock:
+            channel = self._channels.get(submission_id)
+            if channel is None:
+                return
+            channel.sequence += 1
+            channel.event = event
+            channel.condition.notify_all()
+
+    def subscriber_count(self, submission_id: int) -> int:
+        with self._lock:
+            channel = self._channels.get(submission_id)
+            return channel.subscribers if channel else 0
+
+
+# Process-wide broker used by the automarker and the submissions blueprint
+status_broker = StatusBroker()
@@ -0,0 +1,2 @@
+from .columnar import ColumnarFormatError, ColumnarWriter, read_columnar
+from .gradebook import gradebook_assignments, gradebook_rows, stream_gradebook_columnar, stream_gradebook_csv
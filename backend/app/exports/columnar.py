@@ -0,0 +1,135 @@
+"""
+Compact columnar binary format for tabular exports
+
+Layout (all integers little-endian)::
+
+    b"CSCF" | u8 version | u32 metadata length | metadata (UTF-8 JSON)
+    row group*:  u32 row count | column*
+    u32 0                                        (end of file)
+
+Columns are written in the order declared in the metadata's ``columns`` list,
+each as a contiguous block:
+
+- ``i32``: ``count`` signed 32-bit integers
+- ``f32``: ``count`` 32-bit floats, NaN for missing values
+- ``str``: ``count + 1`` u32 offsets followed by the concatenated UTF-8 data
+
+Writers only buffer one row group, so a file of any size is produced in
+constant memory and can be streamed as it is written.
+"""
+
+import json
+import math
+import struct
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+MAGIC = b"CSCF"
+VERSION = 1
+COLUMN_TYPES = ("i32", "f32", "str")
+DEFAULT_ROW_GROUP_SIZE = 1024
+
+
+class ColumnarFormatError(ValueError):
+    """Raised when reading data that is not a valid columnar file."""
+
+
+def _encode_column(column_type: str, values: Sequence) -> bytes:
+    count = len(values)
+    if column_type == "i32":
+        return struct.pack(f"<{count}i", *values)
+    if column_type == "f32":
+        return struct.pack(f"<{count}f", *(math.nan if v is None else v for v in values))
+
+    encoded = [("" if v is None else str(v)).encode("utf-8") for v in values]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    return struct.pack(f"<{count + 1}I", *offsets) + b"".join(encoded)
+
+
+class ColumnarWriter:
+    """
+    Incrementally encode rows into the columnar format.
+
+    ``columns`` is a list of ``(name, type)`` pairs; ``metadata`` is any extra
+    JSON-serialisable information stored in the header.
+    """
+
+    def __init__(self, columns: Sequence[Tuple[str, str]], metadata: dict = None,
+                 row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+        for name, column_type in columns:
+            if column_type not in COLUMN_TYPES:
+                raise ValueError(f"Unsupported column type for {name!r}: {column_type}")
+        self.columns = list(columns)
+        self.metadata = dict(metadata or {}, columns=[list(c) for c in self.columns])
+        self.row_group_size = row_group_size
+        self._rows = []
+
+    def header(self) -> bytes:
+        meta = json.dumps(self.metadata, separators=(",", ":")).encode("utf-8")
+        return MAGIC + struct.pack("<BI", VERSION, len(meta)) + meta
+
+    def add(self, row: Sequence) -> bytes:
+        """Buffer a row; returns an encoded row group once the buffer is full, else ``b""``."""
+        self._rows.append(row)
+        if len(self._rows) >= self.row_group_size:
+            return self.flush()
+        return b""
+
+    def flush(self) -> bytes:
+        """Encode and clear any buffered rows as one row group."""
+        if not self._rows:
+            return b""
+        rows, self._rows = self._rows, []
+        parts = [struct.pack("<I", len(rows))]
+        for index, (_, column_type) in enumerate(self.columns):
+            parts.append(_encode_column(column_type, [row[index] for row in rows]))
+        return b"".join(parts)
+
+    def footer(self) -> bytes:
+        return self.flush() + struct.pack("<I", 0)
+
+    def stream(self, rows: Iterable[Sequence]) -> Iterator[bytes]:
+        """Encode an iterable of rows, yielding the file chunk by chunk."""
+        yield self.header()
+        for row in rows:
+            chunk = self.add(row)
+            if chunk:
+                yield chunk
+        yield self.footer()
+
+
+def _read(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ColumnarFormatError("Unexpected end of columnar data")
+    return data
+
+
+def read_columnar(stream) -> Tuple[dict, List[tuple]]:
+    """Decode a columnar file from a binary stream into ``(metadata, rows)``."""
+    if _read(stream, 4) != MAGIC:
+        raise ColumnarFormatError("Not a columnar export (bad magic number)")
+    version, meta_length = struct.unpack("<BI", _read(stream, 5))
+    if version != VERSION:
+        raise ColumnarFormatError(f"Unsupported columnar format version: {version}")
+    metadata = json.loads(_read(stream, meta_length).decode("utf-8"))
+
+    rows = []
+    while True:
+        (count,) = struct.unpack("<I", _read(stream, 4))
+        if count == 0:
+            return metadata, rows
+        columns = []
+        for _, column_type in metadata["columns"]:
+            if column_type == "str":
+                offsets = struct.unpack(f"<{count + 1}I", _read(stream, 4 * (count + 1)))
+                blob = _read(stream, offsets[-1])
+                columns.append([blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(count)])
+            else:
+                code = "i" if column_type == "i32" else "f"
+                values = struct.unpack(f"<{count}{code}", _read(stream, 4 * count))
+                if column_type == "f32":
+                    values = [None if math.isnan(v) else v for v in values]
+                columns.append(values)
+        rows.extend(zip(*columns))
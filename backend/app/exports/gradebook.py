@@ -0,0 +1,130 @@
+"""
+Streaming gradebook export for a module
+
+Marks for every enrolled student × module assignment come from one set-based
+query (enrollments × module assignments, left-joined to each student's best
+graded percentage) read with ``yield_per``, grouped into one row per student
+as they arrive. Nothing is held in memory beyond the current student and
+output buffer, so an export costs the same memory for any cohort size.
+"""
+
+import csv
+import io
+import itertools
+from typing import Iterator, List, Optional
+
+from sqlalchemy import and_, func, select
+
+from models.models import (
+    db, Assignment, GradeStatus, Module, Result, Student, Submission,
+    module_assignments, student_enrollments
+)
+from .columnar import ColumnarWriter
+
+STREAM_BATCH_SIZE = 500
+CSV_FLUSH_ROWS = 200
+
+
+def gradebook_assignments(module_id: int) -> List[dict]:
+    """The module's assignments (the gradebook columns) with their weights, in id order."""
+    rows = db.session.execute(
+        select(Assignment.assignment_id, Assignment.title, module_assignments.c.weight)
+        .join(module_assignments, module_assignments.c.assignment_id == Assignment.assignment_id)
+        .where(module_assignments.c.module_id == module_id)
+        .order_by(Assignment.assignment_id)
+    )
+    return [
+        {"assignment_id": row.assignment_id, "title": row.title,
+         "weight": row.weight if row.weight is not None else 1.0}
+        for row in rows
+    ]
+
+
+def weighted_total(percentages: List[Optional[float]], weights: List[float]) -> Optional[float]:
+    """Weighted mean of the marks; assignments without a graded result count as zero."""
+    total_weight = sum(weights)
+    if not total_weight:
+        return None
+    return sum((p or 0.0) * w for p, w in zip(percentages, weights)) / total_weight
+
+
+def gradebook_rows(module_id: int, assignments: List[dict]) -> Iterator[tuple]:
+    """
+    Yield ``(student_id, student_number, first_name, surname, *percentages, weighted_total)``
+    per enrolled student, ordered by student id. A student's mark for an assignment is
+    their best graded attempt, or None if nothing has been graded.
+    """
+    ma, se = module_assignments, student_enrollments
+    module_assignment_ids = select(ma.c.assignment_id).where(ma.c.module_id == module_id)
+    best = (
+        select(Submission.student_id, Submission.assignment_id,
+               func.max(Result.percentage).label("percentage"))
+        .join(Result, Result.result_id == Submission.result_id)
+        .where(Result.grade_status == GradeStatus.GRADED,
+               Submission.assignment_id.in_(module_assignment_ids))
+        .group_by(Submission.student_id, Submission.assignment_id)
+        .subquery()
+    )
+    statement = (
+        select(Student.student_id, Student.student_number, Student.first_name, Student.surname,
+               ma.c.assignment_id, best.c.percentage)
+        .select_from(se)
+        .join(Student, Student.student_id == se.c.student_id)
+        .join(ma, ma.c.module_id == se.c.module_id)
+        .outerjoin(best, and_(best.c.student_id == se.c.student_id,
+                              best.c.assignment_id == ma.c.assignment_id))
+        .where(se.c.module_id == module_id)
+        .order_by(Student.student_id, ma.c.assignment_id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+
+    position = {a["assignment_id"]: i for i, a in enumerate(assignments)}
+    weights = [a["weight"] for a in assignments]
+    rows = db.session.execute(statement)
+    for _, student_rows in itertools.groupby(rows, key=lambda row: row.student_id):
+        percentages = [None] * len(assignments)
+        for row in student_rows:
+            if row.assignment_id in position:
+                percentages[position[row.assignment_id]] = row.percentage
+        yield (row.student_id, row.student_number, row.first_name, row.surname,
+               *percentages, weighted_total(percentages, weights))
+
+
+def _column_names(assignments):
+    return (["student_id", "student_number", "first_name", "surname"]
+            + [f"{a['title']} (weight {a['weight']:g})" for a in assignments]
+            + ["weighted_total"])
+
+
+def _csv_value(value):
+    return f"{value:.2f}" if isinstance(value, float) else value
+
+
+def stream_gradebook_csv(module_id: int) -> Iterator[str]:
+    """Yield the module gradebook as CSV text in chunks of ``CSV_FLUSH_ROWS`` students."""
+    assignments = gradebook_assignments(module_id)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(_column_names(assignments))
+    for count, row in enumerate(gradebook_rows(module_id, assignments), start=1):
+        writer.writerow([_csv_value(value) for value in row])
+        if count % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_gradebook_columnar(module_id: int) -> Iterator[bytes]:
+    """Yield the module gradebook in the compact columnar format (see ``exports.columnar``)."""
+    assignments = gradebook_assignments(module_id)
+    module = db.session.get(Module, module_id)
+    columns = ([("student_id", "i32"), ("student_number", "str"), ("first_name", "str"), ("surname", "str")]
+               + [(f"assignment_{a['assignment_id']}", "f32") for a in assignments]
+               + [("weighted_total", "f32")])
+    writer = ColumnarWriter(columns, metadata={
+        "module_id": module_id,
+        "module_code": module.code if module else None,
+        "assignments": assignments
+    })
+    return writer.stream(gradebook_rows(module_id, assignments))
@@ -0,0 +1,4 @@
+from .scheduler import GradingScheduler, JobPriority, QueuedJob
+from .service import (
+    enqueue_grading, get_scheduler, pending_grading, reset_for_regrade, resume_grading, run_grading, submit_jobs
+)
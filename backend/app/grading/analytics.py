@@ -0,0 +1,140 @@
+"""
+Incremental maintenance of precomputed grading aggregates
+
+Aggregates are adjusted with relative ``UPDATE ... SET x = x + :delta``
+statements inside the same transaction that writes the result, so they stay
+consistent with the results table and concurrent graders never overwrite each
+other's counts. When a result is replaced or deleted, its old contribution is
+subtracted first.
+"""
+
+from sqlalchemy import case, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from cache import assignment_cache
+from models.models import db, AssignmentScoreBucket, AssignmentStats, GradeStatus, TestCaseStats, TestOutcome
+
+_test_case_stats = TestCaseStats.__table__
+_assignment_stats = AssignmentStats.__table__
+_score_buckets = AssignmentScoreBucket.__table__
+
+
+def _increment(table, keys, deltas, extra_values=None, initial_values=None):
+    """
+    Add ``deltas`` to the counters of the row identified by ``keys``, creating it if needed.
+
+    ``extra_values`` are non-additive column expressions applied on update (e.g. a
+    running max) and ``initial_values`` their values for a newly inserted row.
+    """
+    columns = table.c
+    values = {name: columns[name] + delta for name, delta in deltas.items()}
+    values.update(extra_values or {})
+    condition = [columns[name] == value for name, value in keys.items()]
+
+    if db.session.execute(update(table).where(*condition).values(**values)).rowcount:
+        return
+    if any(delta < 0 for delta in deltas.values()):
+        return  # Nothing to retract from
+
+    # First contribution: insert, or fall back to updating if another grader beat us to it
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(table).values(**keys, **deltas, **(initial_values or {})))
+    except IntegrityError:
+        db.session.execute(update(table).where(*condition).values(**values))
+
+
+# Per-test-case statistics
+
+def snapshot_test_cases(result):
+    """Plain records of a stored result's test cases (taken before they are replaced)."""
+    if result is None:
+        return []
+    return [
+        {"name": tc.name, "outcome": tc.outcome, "duration": tc.duration or 0.0}
+        for tc in result.test_cases
+    ]
+
+
+def _apply_test_case(assignment_id, record, sign):
+    outcome = record["outcome"]
+    duration = record.get("duration") or 0.0
+    deltas = {
+        "runs": sign,
+        "passed": sign if outcome == TestOutcome.PASSED else 0,
+        "failed": sign if outcome == TestOutcome.FAILED else 0,
+        "errors": sign if outcome == TestOutcome.ERROR else 0,
+        "total_duration": sign * duration,
+    }
+    # The maximum is only ever raised; retracting a result leaves it as "highest observed"
+    max_column = _test_case_stats.c.max_duration
+    extra = {"max_duration": case((max_column < duration, duration), else_=max_column)} if sign > 0 else None
+    _increment(
+        _test_case_stats,
+        {"assignment_id": assignment_id, "name": record["name"]},
+        deltas,
+        extra_values=extra,
+        initial_values={"max_duration": duration}
+    )
+
+
+def update_test_case_stats(assignment_id, old_records, new_records):
+    """Replace ``old_records``' contribution to the per-test aggregates with ``new_records``'."""
+    for record in old_records:
+        _apply_test_case(assignment_id, record, -1)
+    for record in new_records:
+        _apply_test_case(assignment_id, record, 1)
+
+
+# Assignment-level statistics
+
+def score_bucket(percentage):
+    """Histogram band for a percentage: 0 = [0, 10), ..., 9 = [90, 100]."""
+    return min(max(int((percentage or 0) // 10), 0), 9)
+
+
+def snapshot_result(submission, result):
+    """A graded result's contribution to its assignment's statistics, or None if it has none."""
+    if result is None or result.grade_status != GradeStatus.GRADED:
+        return None
+    assignment = assignment_cache.get(submission.assignment_id)
+    pass_threshold = assignment.pass_threshold if assignment else None
+    return {
+        "score": result.score or 0.0,
+        "percentage": result.percentage or 0.0,
+        "passed": pass_threshold is not None and (result.percentage or 0.0) >= pass_threshold,
+        "late": bool(submission.is_late)
+    }
+
+
+def _apply_result(assignment_id, contribution, sign):
+    score = contribution["score"]
+    _increment(_assignment_stats, {"assignment_id": assignment_id}, {
+        "graded_count": sign,
+        "score_sum": sign * score,
+        "score_sq_sum": sign * score * score,
+        "percentage_sum": sign * contribution["percentage"],
+        "pass_count": sign if contribution["passed"] else 0,
+        "late_count": sign if contribution["late"] else 0,
+    })
+    _increment(
+        _score_buckets,
+        {"assignment_id": assignment_id, "bucket": score_bucket(contribution["percentage"])},
+        {"count": sign}
+    )
+
+
+def update_assignment_stats(assignment_id, old_contribution, new_contribution):
+    """Replace a result's previous contribution to the assignment statistics with its new one."""
+    if old_contribution is not None:
+        _apply_result(assignment_id, old_contribution, -1)
+    if new_contribution is not None:
+        _apply_result(assignment_id, new_contribution, 1)
+
+
+def retract_result(submission):
+    """Subtract a submission's stored result from all aggregates before it is deleted."""
+    if submission.result is None:
+        return
+    update_test_case_stats(submission.assignment_id, snapshot_test_cases(submission.result), [])
+    update_assignment_stats(submission.assignment_id, snapshot_result(submission, submission.result), None)
@@ -0,0 +1,210 @@
+"""
+On-disk, content-addressed cache of compiled submissions
+
+Every grading process on a host (web workers, grading workers) shares one
+directory, so a source compiled by any of them is never compiled again until
+it is evicted. An entry is addressed by the SHA-256 of the language, the
+compile command (flags), the compiler's version string and the source's
+SHA-256; changing any of them is simply a different entry.
+
+Layout under the root::
+
+    ab/abcdef.../manifest.json   {"files": {"main": 493}, "size": 16384}
+    ab/abcdef.../files/main
+    tmp/                         staging and eviction area
+
+- Writers build an entry in ``tmp/`` and ``rename`` it into place. The rename
+  is atomic, so readers see a complete entry or none; when two processes store
+  the same key the loser's rename fails and its copy is dropped.
+- Readers copy files out (never link them), so a program cannot alter the
+  cached build. A read touches the entry's mtime, which orders eviction.
+- After each store, least recently used entries are evicted until the cache is
+  under ``max_bytes``. An evicted entry is first renamed into ``tmp/``, so it
+  disappears atomically too; a reader racing with eviction sees a miss.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import Iterable, Optional
+
+from flask import current_app, has_app_context
+
+from utils.metrics import metrics
+from .scratch import private_directory, scratch_directory
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+MANIFEST = "manifest.json"
+# Staging directories older than this were left by a process that died mid-store
+STALE_STAGING_SECONDS = 3600
+
+
+class BuildCache:
+    """Content-addressed directory of build outputs shared by every grading process on the host."""
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.staging = os.path.join(root, "tmp")
+        # Anything under the root may be run, so only this user may write to it
+        os.makedirs(os.path.dirname(os.path.abspath(root)), exist_ok=True)
+        private_directory(root)
+        os.makedirs(self.staging, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.stores = self.evictions = 0
+
+    @staticmethod
+    def key(language: str, compile_command: Iterable[str], toolchain: str, source: bytes) -> str:
+        identity = [language, list(compile_command), toolchain, hashlib.sha256(source).hexdigest()]
+        return hashlib.sha256(json.dumps(identity).encode()).hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+        metrics.increment(f"builds.cache_{name}")
+
+    def get(self, key: str, workdir: str) -> bool:
+        """Copy a cached build's files into ``workdir``; False on a miss."""
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, MANIFEST)) as f:
+                manifest = json.load(f)
+            for name, mode in manifest["files"].items():
+                target = os.path.join(workdir, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(os.path.join(entry, "files", name), target)
+                os.chmod(target, mode)
+            os.utime(entry)
+        except (OSError, ValueError, KeyError):
+            self._count("misses")
+            return False
+        self._count("hits")
+        return True
+
+    def put(self, key: str, workdir: str, names: Iterable[str]) -> None:
+        """Store the named files of ``workdir`` (paths relative to it) under ``key``."""
+        staging = tempfile.mkdtemp(dir=self.staging)
+        try:
+            files, size = {}, 0
+            for name in names:
+                target = os.path.join(staging, "files", name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(os.path.join(workdir, name), target)
+                files[name] = os.stat(os.path.join(workdir, name)).st_mode & 0o777
+                size += os.path.getsize(target)
+            with open(os.path.join(staging, MANIFEST), "w") as f:
+                json.dump({"files": files, "size": size}, f)
+
+            entry = self._entry(key)
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            os.rename(staging, entry)
+        except OSError:
+            # Another process stored the same build first (or the disk is full): keep theirs
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        self._count("stores")
+        self.evict()
+
+    def _entries(self):
+        """(mtime, size, path) of every complete entry."""
+        entries = []
+        for prefix in os.scandir(self.root):
+            if prefix.name == "tmp" or not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                try:
+                    with open(os.path.join(entry.path, MANIFEST)) as f:
+                        size = json.load(f)["size"]
+                    entries.append((entry.stat().st_mtime, size, entry.path))
+                except (OSError, ValueError, KeyError):
+                    continue
+        return entries
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits in ``max_bytes``."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            doomed = os.path.join(self.staging, f"evicted-{uuid.uuid4().hex}")
+            try:
+                os.rename(path, doomed)
+            except OSError:
+                continue  # Already evicted by another process
+            shutil.rmtree(doomed, ignore_errors=True)
+            total -= size
+            self._count("evictions")
+
+        cutoff = time.time() - STALE_STAGING_SECONDS
+        for leftover in os.scandir(self.staging):
+            try:
+                if leftover.stat().st_mtime < cutoff:
+                    shutil.rmtree(leftover.path, ignore_errors=True)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "root": self.root,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "stores": self.stores,
+                "evictions": self.evictions
+            }
+
+
+_build_cache = None
+_build_cache_lock = threading.Lock()
+
+
+def get_build_cache() -> BuildCache:
+    """
+    Return the process's handle on the shared build cache, creating it on first use.
+
+    Configured from ``GRADING_BUILD_CACHE_DIR`` (default: ``builds`` in the
+    private ``grading.scratch`` directory, hidden from sandboxed programs) and
+    ``GRADING_BUILD_CACHE_MAX_BYTES``. The directory must belong to this user
+    and not be writable by anyone else (``ScratchDirectoryError``).
+    """
+    global _build_cache
+    if _build_cache is None:
+        with _build_cache_lock:
+            if _build_cache is None:
+                config = current_app.config if has_app_context() else {}
+                _build_cache = BuildCache(
+                    config.get('GRADING_BUILD_CACHE_DIR') or scratch_directory("builds"),
+                    config.get('GRADING_BUILD_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+                )
+    return _build_cache
+
+
+def set_build_cache(cache: Optional[BuildCache]):
+    """Replace the process's build cache (benchmarks, tests); returns the previous one."""
+    global _build_cache
+    with _build_cache_lock:
+        previous, _build_cache = _build_cache, cache
+    return previous
+
+
+def build_cache_stats() -> dict:
+    return _build_cache.stats() if _build_cache is not None else {"entries": None}
@@ -0,0 +1,74 @@
+"""
+Per-job stdout capture without process-wide redirection
+
+``contextlib.redirect_stdout`` swaps ``sys.stdout`` for the whole process, so
+two gradings running on different threads write into each other's buffers (and
+whichever finishes first restores the stream under the other). Here
+``sys.stdout`` is replaced once by a routing stream that looks up the current
+job's buffer in a ``ContextVar``: each thread (or asyncio task) that enters
+``capture_stdout()`` gets its own buffer, and everything else still reaches the
+real stdout.
+
+Threads started by test code begin with an empty context, so their output goes
+to the real stdout rather than into any job's feedback.
+"""
+
+import io
+import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+_current_buffer: ContextVar[Optional[io.StringIO]] = ContextVar("grading_stdout", default=None)
+_install_lock = threading.Lock()
+
+
+class RoutingStream:
+    """Text stream that writes to the current context's buffer, or to the stream it wraps."""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def _target(self):
+        buffer = _current_buffer.get()
+        return self.fallback if buffer is None else buffer
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def writelines(self, lines):
+        self._target().writelines(lines)
+
+    def flush(self):
+        self._target().flush()
+
+    def isatty(self):
+        return self._target().isatty()
+
+    def fileno(self):
+        return self._target().fileno()
+
+    def __getattr__(self, name):
+        # encoding, errors, buffer, ... of whichever stream is current
+        return getattr(self._target(), name)
+
+
+def install() -> RoutingStream:
+    """Route ``sys.stdout`` through a ``RoutingStream`` (re-wrapping it if someone replaced it)."""
+    with _install_lock:
+        if not isinstance(sys.stdout, RoutingStream):
+            sys.stdout = RoutingStream(sys.stdout)
+        return sys.stdout
+
+
+@contextmanager
+def capture_stdout() -> Iterator[io.StringIO]:
+    """Collect what the current thread or task prints into a fresh buffer."""
+    install()
+    buffer = io.StringIO()
+    token = _current_buffer.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _current_buffer.reset(token)
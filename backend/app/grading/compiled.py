@@ -0,0 +1,107 @@
+"""
+Compiled test modules, cached per test revision
+
+Teacher test files used to be written to a temp file, rewritten to point at the
+student's file and then imported (parsed and compiled) by ``unittest`` for every
+single grading run. Here a test file is compiled once per
+``(test_id, version, sha256)`` and every run executes the cached code object in
+a fresh module namespace.
+
+Because the code object is shared by all students, the student's file cannot be
+spliced into the source any more. Instead the conventional
+``self.student_file = None`` assignment in the test is rewritten at compile time
+to read the module global ``STUDENT_FILE_GLOBAL``, which each run sets.
+
+Each run also gets a ``run_student(input="", timeout=None)`` global. It runs the
+student's program, as built by its language runner (see ``grading.languages``),
+on the subprocess orchestrator and returns its ``ProcessResult``. The program
+runs in the submission's sandbox if it has one, and the timeout defaults to the
+test's ``timeout_seconds``. Unlike ``subprocess.run(..., capture_output=True)``,
+the orchestrator streams output with head/tail caps, so a runaway program is
+killed instead of filling the grading process's memory.
+"""
+
+import ast
+import linecache
+import os
+import types
+from typing import List, Optional
+
+from cache import LRUCache
+from .orchestrator import get_orchestrator, python_command
+
+STUDENT_FILE_GLOBAL = "__student_file__"
+RUN_STUDENT_GLOBAL = "run_student"
+
+
+class _InjectStudentFile(ast.NodeTransformer):
+    """``self.student_file = None`` -> ``self.student_file = __student_file__``"""
+
+    def visit_Assign(self, node):
+        target = node.targets[0] if len(node.targets) == 1 else None
+        if (isinstance(target, ast.Attribute) and target.attr == "student_file"
+                and isinstance(target.value, ast.Name) and target.value.id == "self"
+                and isinstance(node.value, ast.Constant) and node.value.value is None):
+            node.value = ast.copy_location(ast.Name(id=STUDENT_FILE_GLOBAL, ctx=ast.Load()), node.value)
+        return node
+
+
+def compile_test_source(source, filename: str) -> types.CodeType:
+    """Parse and compile a test file, wiring ``self.student_file`` to the injected global."""
+    if isinstance(source, bytes):
+        source = source.decode("utf-8")
+    tree = _InjectStudentFile().visit(ast.parse(source, filename))
+    code = compile(ast.fix_missing_locations(tree), filename, "exec", dont_inherit=True)
+    # Let tracebacks from the compiled module show the test's source lines
+    lines = source.splitlines(keepends=True)
+    linecache.cache[filename] = (len(source), None, lines, filename)
+    return code
+
+
+def load_test_module(code: types.CodeType, student_file: Optional[str], name: str = "submission_tests",
+                     sandbox=None, command: Optional[List[str]] = None, timeout: Optional[float] = None):
+    """
+    Execute compiled test code in a new, unregistered module bound to one student's file.
+
+    ``timeout`` (the test's ``timeout_seconds``) applies to ``run_student`` calls that do not set their own.
+    """
+    module = types.ModuleType(name)
+    module.__file__ = code.co_filename
+    setattr(module, STUDENT_FILE_GLOBAL, student_file)
+    setattr(module, RUN_STUDENT_GLOBAL, _student_runner(student_file, sandbox, command, timeout))
+    exec(code, module.__dict__)
+    return module
+
+
+def _student_runner(student_file, sandbox, command, default_timeout):
+    def run_student(input: str = "", timeout: Optional[float] = None):
+        """Run the student's program with ``input`` on stdin; returns a ``ProcessResult``."""
+        if student_file is None:
+            raise RuntimeError("No student file to run")
+        return get_orchestrator().run(command or python_command(student_file), input=input,
+                                      timeout=default_timeout if timeout is None else timeout,
+                                      cwd=os.path.dirname(student_file), sandbox=sandbox)
+    return run_student
+
+
+class CompiledTestCache:
+    """Code objects keyed by test revision; the SHA-256 guards against edits that keep the version."""
+
+    def __init__(self, maxsize: int = 64):
+        self.entries = LRUCache(maxsize, ttl=None)
+
+    def get(self, artifact) -> types.CodeType:
+        """Compiled code for a ``cache.TestArtifact``, compiling it on first use."""
+        key = (artifact.test_id, artifact.version, artifact.sha256)
+        filename = f"<test {artifact.test_id} v{artifact.version} {artifact.sha256[:12]}>"
+        return self.entries.get_or_load(key, lambda: compile_test_source(artifact.source, filename))
+
+    def invalidate(self) -> None:
+        self.entries.invalidate()
+
+    def stats(self) -> dict:
+        return self.entries.stats()
+
+
+# Process-wide cache used by the automarker
+compiled_tests = CompiledTestCache()
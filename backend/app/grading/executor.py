@@ -0,0 +1,226 @@
+"""
+Grading executors: where teacher test code actually runs
+
+Test files are arbitrary Python. Running them inside a web worker blocks it,
+redirects its stdout and lets a misbehaving test leak memory, threads or module
+state into the server. ``GradingExecutor`` instead keeps a small pool of
+dedicated processes (started with ``spawn``, so they share nothing with the
+web process but the code on disk). Each job is sent over a ``Pipe`` as a
+``(TestArtifact, student_file_path, Sandbox, run command)`` tuple and answered with the same
+structured result dict the automarker has always used.
+
+- A process that does not answer within the timeout is killed and replaced;
+  the job is reported as a failed test run.
+- A process that dies mid-job (segfault, ``os._exit``) is replaced the same way.
+- Processes are recycled after ``max_jobs_per_process`` jobs to bound leaks.
+- Each process keeps its own compiled test cache, so a test revision is compiled
+  once per process rather than once per submission.
+
+``InlineExecutor`` runs the same harness in the calling thread; it is selected
+with ``GRADING_EXECUTOR = "inline"`` for debugging.
+
+As with any ``spawn`` pool, a script that grades must keep its top-level code
+under ``if __name__ == "__main__":``, since executor processes import it.
+"""
+
+import atexit
+import multiprocessing
+import queue
+import signal
+import threading
+from typing import Optional
+
+from flask import current_app
+
+from .harness import failed_test_run, run_test_artifact
+
+DEFAULT_PROCESSES = 2
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_MAX_JOBS_PER_PROCESS = 100
+
+
+class ExecutorError(RuntimeError):
+    """A grading process failed to return a result."""
+
+
+def _serve(conn):
+    """Executor process main loop: one job in, one result dict out, until the pipe closes."""
+    # Ctrl+C in a dev server terminal is for the parent; it shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            artifact, student_file_path, sandbox, command = conn.recv()
+        except (EOFError, OSError):
+            break
+        conn.send(run_test_artifact(artifact, student_file_path, sandbox, command))
+
+
+class _ExecutorProcess:
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_conn,), name="grading-executor", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Close the pipe (the process exits on EOF) and kill it if it does not."""
+        self.conn.close()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+class GradingExecutor:
+    """Pool of executor processes; ``run`` blocks the calling thread until its job is done."""
+
+    def __init__(self, processes: int = DEFAULT_PROCESSES, timeout: float = DEFAULT_TIMEOUT,
+                 max_jobs_per_process: int = DEFAULT_MAX_JOBS_PER_PROCESS, start_method: str = "spawn"):
+        self.processes = processes
+        self.timeout = timeout
+        self.max_jobs_per_process = max_jobs_per_process
+        self._context = multiprocessing.get_context(start_method)
+        self._slots = threading.BoundedSemaphore(processes)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._live = set()
+        self._closed = False
+        self.jobs = self.started = self.timeouts = self.crashes = self.recycled = 0
+
+    def run(self, artifact, student_file_path: Optional[str] = None, timeout: Optional[float] = None,
+            sandbox=None, command=None) -> dict:
+        """Run a test artifact against a student's file in an executor process."""
+        timeout = self.timeout if timeout is None else timeout
+        with self._slots:
+            worker = self._checkout()
+            try:
+                worker.conn.send((artifact, student_file_path, sandbox, command))
+                if not worker.conn.poll(timeout):
+                    self._discard(worker, "timeouts")
+                    return failed_test_run(ExecutorError(f"Tests did not finish within {timeout:g} seconds"))
+                result = worker.conn.recv()
+            except (EOFError, OSError):
+                self._discard(worker, "crashes")
+                return failed_test_run(ExecutorError(
+                    f"Grading process exited unexpectedly (exit code {worker.process.exitcode})"
+                ))
+
+            with self._lock:
+                self.jobs += 1
+            worker.jobs += 1
+            if worker.jobs >= self.max_jobs_per_process:
+                self._discard(worker, "recycled")
+            else:
+                self._idle.put(worker)
+            return result
+
+    def _checkout(self) -> _ExecutorProcess:
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker.process.is_alive():
+                return worker
+            self._discard(worker, "crashes")
+
+        with self._lock:
+            if self._closed:
+                raise ExecutorError("Grading executor has been shut down")
+            worker = _ExecutorProcess(self._context)
+            self._live.add(worker)
+            self.started += 1
+        return worker
+
+    def _discard(self, worker: _ExecutorProcess, reason: str) -> None:
+        with self._lock:
+            self._live.discard(worker)
+            setattr(self, reason, getattr(self, reason) + 1)
+        worker.stop(timeout=0 if reason == "timeouts" else 2.0)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers, self._live = list(self._live), set()
+        for worker in workers:
+            worker.stop()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": "process",
+                "processes": self.processes,
+                "live": len(self._live),
+                "jobs": self.jobs,
+                "started": self.started,
+                "timeouts": self.timeouts,
+                "crashes": self.crashes,
+                "recycled": self.recycled
+            }
+
+
+class InlineExecutor:
+    """Runs tests in the calling thread of the web process."""
+
+    def run(self, artifact, student_file_path: Optional[str] = None, timeout: Optional[float] = None,
+            sandbox=None, command=None) -> dict:
+        return run_test_artifact(artifact, student_file_path, sandbox, command)
+
+    def shutdown(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"mode": "inline"}
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the process-wide grading executor, creating it on first use.
+
+    It is shared by every app in the process (executor processes hold no app
+    state), so it is configured from the app that first needs it:
+    ``GRADING_EXECUTOR`` ("process" or "inline"), ``GRADING_EXECUTOR_PROCESSES``
+    (default: ``GRADING_WORKERS``), ``GRADING_EXECUTOR_TIMEOUT`` and
+    ``GRADING_EXECUTOR_MAX_JOBS``.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                config = current_app.config
+                if config.get('GRADING_EXECUTOR', 'process') == 'inline':
+                    _executor = InlineExecutor()
+                else:
+                    _executor = GradingExecutor(
+                        processes=config.get('GRADING_EXECUTOR_PROCESSES', config.get('GRADING_WORKERS', DEFAULT_PROCESSES)),
+                        timeout=config.get('GRADING_EXECUTOR_TIMEOUT', DEFAULT_TIMEOUT),
+                        max_jobs_per_process=config.get('GRADING_EXECUTOR_MAX_JOBS', DEFAULT_MAX_JOBS_PER_PROCESS)
+                    )
+    return _executor
+
+
+def set_executor(executor):
+    """Replace the process-wide executor (benchmarks, tests); returns the previous one, not shut down."""
+    global _executor
+    with _executor_lock:
+        previous, _executor = _executor, executor
+    return previous
+
+
+def executor_stats() -> dict:
+    return _executor.stats() if _executor is not None else {"mode": None}
+
+
+@atexit.register
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
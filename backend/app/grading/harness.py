@@ -0,0 +1,75 @@
+"""
+Runs a compiled test module and summarises it as the automarker's result dict
+
+Nothing here touches the database or the Flask app, so the same code runs in
+the web process (inline executor) and in grading executor processes.
+"""
+
+import unittest
+
+from models.models import TestOutcome
+from .capture import capture_stdout
+from .compiled import compiled_tests, load_test_module
+from .results import StructuredTestResult
+
+
+def run_test_module(code, student_file_path=None, sandbox=None, command=None, timeout=None):
+    """
+    Run a compiled test module (see grading.compiled) against a student's file.
+
+    ``timeout`` is the default time limit of each ``run_student`` call.
+    """
+    try:
+        # A fresh module per run, so no state leaks between students
+        module = load_test_module(code, student_file_path, sandbox=sandbox, command=command, timeout=timeout)
+        suite = unittest.TestLoader().loadTestsFromModule(module)
+
+        # Run with a structured collector: one record per test case
+        test_results = StructuredTestResult()
+        # Printed output is collected per job, so concurrent runs cannot mix it up
+        with capture_stdout() as output:
+            suite.run(test_results)
+
+        summary = test_results.summary()
+        if output.getvalue():
+            summary += "\n\nTest output:\n" + output.getvalue()
+
+        # Counted per test record: unittest lists every failing subTest of a test separately
+        records = test_results.records
+        failures = [r for r in records if r["outcome"] == TestOutcome.FAILED]
+        errors = [r for r in records if r["outcome"] == TestOutcome.ERROR]
+        return {
+            "total": len(records),
+            "failures": len(failures),
+            "errors": len(errors),
+            "passed": len(records) - len(failures) - len(errors),
+            "results": summary,
+            "failure_details": [f"{r['name']}: {r['message']}" for r in failures],
+            "error_details": [f"{r['name']}: {r['message']}" for r in errors],
+            "test_cases": records
+        }
+    except Exception as e:
+        return failed_test_run(e)
+
+
+def run_test_artifact(artifact, student_file_path=None, sandbox=None, command=None):
+    """Compile (or reuse) a test revision from the test cache and run it."""
+    try:
+        code = compiled_tests.get(artifact)
+    except Exception as e:
+        return failed_test_run(e)
+    return run_test_module(code, student_file_path, sandbox, command, timeout=artifact.timeout_seconds)
+
+
+def failed_test_run(error):
+    """Results for a test file that could not be compiled, loaded or run."""
+    return {
+        "total": 0,
+        "failures": 1,
+        "errors": 0,
+        "passed": 0,
+        "results": f"Failed to run tests: {str(error)}",
+        "failure_details": [str(error)],
+        "error_details": [],
+        "test_cases": []
+    }
@@ -0,0 +1,252 @@
+"""
+Native stdin/stdout tests from ``Test.input_data`` / ``Test.expected_output``
+
+Most assignments are "read this input, print that output". Instead of a
+teacher-written unittest file that spawns ``python`` itself (a second
+interpreter plus unittest overhead per case), the marker feeds each input case
+to the student's program directly and compares what it prints with the
+expected output. All cases of a submission are handed to the warm subprocess
+orchestrator at once and run concurrently.
+
+Several cases are written one after another in ``input_data`` and
+``expected_output``, separated by a line containing only ``---``. How outputs
+are compared is configured per test in ``Test.io_options`` (JSON):
+
+- ``whitespace``: ``"exact"``, ``"trailing"`` (default: ignore trailing spaces
+  and trailing blank lines) or ``"collapse"`` (any run of whitespace, including
+  line breaks, is equal);
+- ``case_sensitive``: default true;
+- ``numeric_tolerance``: tokens that are both numbers match if they differ by at
+  most this much (relative or absolute);
+- ``separator``: the case separator line, default ``---``;
+- ``single_process``: replay all cases in one interpreter (see below).
+
+With ``single_process`` a Python program is started once under
+``grading/replay.py``, which re-executes the compiled module per case with
+stdin/stdout rebound, so a submission costs one process spawn instead of one
+per case. The harness resets the interpreter between cases, but not all of
+it (see ``replay.py`` for what can still carry over). Any case that fails,
+errors or is missing in the replay (harness crash, overall timeout, truncated
+results) is re-run in its own process, and that result is used. A case that
+passes in the replay is trusted without a per-process check, so a program that
+only passes because of state an earlier case left behind in what the harness
+does not reset is graded as passing. Use ``single_process`` only for tests
+whose programs are plain stdin-to-stdout scripts.
+"""
+
+import json
+import math
+import os
+from dataclasses import dataclass, fields
+from typing import List, Optional, Tuple
+
+from models.models import TestOutcome
+from utils.metrics import metrics
+from .orchestrator import DEFAULT_TIMEOUT, ProcessResult, ProgramRun, get_orchestrator
+from .results import MAX_MESSAGE_LENGTH, MAX_TRACEBACK_LENGTH, _truncate_tail, summarize
+
+WHITESPACE_MODES = ("exact", "trailing", "collapse")
+REPLAY_HARNESS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replay.py")
+# Start-up allowance on top of the per-case timeouts for a whole replay run
+REPLAY_STARTUP_SECONDS = 5.0
+
+
+@dataclass(frozen=True)
+class IOOptions:
+    whitespace: str = "trailing"
+    case_sensitive: bool = True
+    numeric_tolerance: Optional[float] = None
+    separator: str = "---"
+    single_process: bool = False
+
+    @classmethod
+    def parse(cls, raw) -> "IOOptions":
+        """Options from ``Test.io_options`` (JSON text, a dict, or None for the defaults)."""
+        if raw is None or raw == "":
+            return cls()
+        values = json.loads(raw) if isinstance(raw, str) else dict(raw)
+        unknown = set(values) - {f.name for f in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown I/O test option(s): {', '.join(sorted(unknown))}")
+        options = cls(**values)
+        if options.whitespace not in WHITESPACE_MODES:
+            raise ValueError(f"whitespace must be one of {', '.join(WHITESPACE_MODES)}")
+        return options
+
+
+def split_cases(input_data: str, expected_output: str, separator: str = "---") -> List[Tuple[str, str]]:
+    """Pair up the input and expected output of each case."""
+    inputs = _split(input_data or "", separator)
+    expected = _split(expected_output or "", separator)
+    if len(inputs) != len(expected):
+        raise ValueError(f"I/O test has {len(inputs)} input case(s) but {len(expected)} expected output(s)")
+    # A program reading whole lines needs the last one terminated
+    return [(text if not text or text.endswith("\n") else text + "\n", out) for text, out in zip(inputs, expected)]
+
+
+def _split(text, separator):
+    cases, current = [], []
+    for line in text.replace("\r\n", "\n").split("\n"):
+        if line.strip() == separator:
+            cases.append("\n".join(current))
+            current = []
+        else:
+            current.append(line)
+    cases.append("\n".join(current))
+    return cases
+
+
+def _lines(text, options):
+    text = text.replace("\r\n", "\n")
+    if not options.case_sensitive:
+        text = text.casefold()
+    if options.whitespace == "collapse":
+        return [" ".join(text.split())]
+    if options.whitespace == "exact":
+        return text.split("\n")
+    lines = [line.rstrip() for line in text.split("\n")]
+    while lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def _number(token):
+    try:
+        value = float(token)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _lines_match(actual, expected, tolerance):
+    if actual == expected:
+        return True
+    if tolerance is None:
+        return False
+    actual_tokens, expected_tokens = actual.split(), expected.split()
+    if len(actual_tokens) != len(expected_tokens):
+        return False
+    for got, want in zip(actual_tokens, expected_tokens):
+        if got == want:
+            continue
+        got_number, want_number = _number(got), _number(want)
+        if got_number is None or want_number is None:
+            return False
+        if not math.isclose(got_number, want_number, rel_tol=tolerance, abs_tol=tolerance):
+            return False
+    return True
+
+
+def compare_output(actual: str, expected: str, options: IOOptions = IOOptions()) -> Optional[str]:
+    """None if the outputs match under ``options``, else a short description of the first difference."""
+    actual_lines, expected_lines = _lines(actual, options), _lines(expected, options)
+    for number, (got, want) in enumerate(zip(actual_lines, expected_lines), start=1):
+        if not _lines_match(got, want, options.numeric_tolerance):
+            where = "output" if options.whitespace == "collapse" else f"line {number}"
+            return f"{where}: expected {want!r}, got {got!r}"
+    if len(actual_lines) != len(expected_lines):
+        return f"expected {len(expected_lines)} line(s) of output, got {len(actual_lines)}"
+    return None
+
+
+def _record(number, result, expected, options):
+    record = {
+        "name": f"IOTest.case_{number}",
+        "outcome": TestOutcome.PASSED,
+        "duration": result.duration,
+        "message": None,
+        "traceback": None
+    }
+    if result.error:
+        record.update(outcome=TestOutcome.ERROR, message=f"Could not run program: {result.error}")
+    elif result.timed_out:
+        record.update(outcome=TestOutcome.ERROR, message="Execution timed out")
+    elif result.output_limit_exceeded:
+        record.update(outcome=TestOutcome.ERROR,
+                      message=f"Output limit exceeded: stopped after {result.stdout_bytes + result.stderr_bytes} bytes",
+                      traceback=_truncate_tail(result.stdout, MAX_TRACEBACK_LENGTH) or None)
+    elif result.returncode != 0:
+        record.update(outcome=TestOutcome.ERROR, message=f"Program exited with code {result.returncode}",
+                      traceback=_truncate_tail(result.stderr, MAX_TRACEBACK_LENGTH) or None)
+    else:
+        difference = compare_output(result.stdout, expected, options)
+        if difference:
+            if result.truncated:
+                difference += f" (output truncated, {result.stdout_bytes} bytes printed)"
+            record.update(outcome=TestOutcome.FAILED, message=difference[:MAX_MESSAGE_LENGTH])
+    return record
+
+
+def _replay(replay_command, inputs, timeout, cwd, sandbox):
+    """Run all cases in one harness process; a ProcessResult per case, or None where it has none."""
+    orchestrator = get_orchestrator()
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    job = json.dumps({"cases": inputs, "timeout": timeout, "keep": orchestrator.keep_bytes,
+                      "output_limit": orchestrator.max_output_bytes})
+    # The result stream is kept whole up to the output limit; past it the harness is killed
+    run = orchestrator.run(replay_command, input=job, timeout=timeout * len(inputs) + REPLAY_STARTUP_SECONDS,
+                           cwd=cwd, keep_bytes=orchestrator.max_output_bytes, sandbox=sandbox)
+    metrics.increment("io_tests.process_spawns")
+
+    results = [None] * len(inputs)
+    for line in run.stdout.splitlines():
+        try:
+            case = json.loads(line)
+        except ValueError:
+            break  # Truncated by the output cap
+        results[case["case"]] = ProcessResult(case["returncode"], case["stdout"], case["stderr"], case["duration"],
+                                              timed_out=case["timed_out"], truncated=case["truncated"],
+                                              output_limit_exceeded=case["output_limit_exceeded"])
+    return results
+
+
+def _passes(result, expected, options):
+    return result is not None and result.ok and compare_output(result.stdout, expected, options) is None
+
+
+def run_io_tests(command: List[str], input_data: str, expected_output: str, io_options=None,
+                 timeout: Optional[float] = None, cwd: Optional[str] = None,
+                 replay_command: Optional[List[str]] = None, sandbox=None) -> dict:
+    """
+    Run every I/O case against the student's program and return the automarker's result dict.
+    
+    ``replay_command`` runs the program under the single-process harness; it is
+    used when the test's options ask for ``single_process``. Every run happens
+    in ``sandbox`` when one is given.
+    """
+    options = IOOptions.parse(io_options)
+    cases = split_cases(input_data, expected_output, options.separator)
+    inputs = [case_input for case_input, _ in cases]
+
+    results = [None] * len(cases)
+    if options.single_process and replay_command:
+        results = _replay(replay_command, inputs, timeout, cwd, sandbox)
+        metrics.increment("io_tests.replayed_cases", len(cases))
+
+    # Per-process runs for everything the replay did not pass (or every case without one)
+    rerun = [n for n, (result, (_, expected)) in enumerate(zip(results, cases))
+             if not _passes(result, expected, options)]
+    if rerun:
+        reruns = get_orchestrator().run_many(
+            ProgramRun(command, input=inputs[n], timeout=timeout, cwd=cwd, sandbox=sandbox) for n in rerun
+        )
+        for n, result in zip(rerun, reruns):
+            results[n] = result
+        metrics.increment("io_tests.process_spawns", len(rerun))
+        if options.single_process and replay_command:
+            metrics.increment("io_tests.fallback_cases", len(rerun))
+
+    records = [_record(n, result, expected, options)
+               for n, (result, (_, expected)) in enumerate(zip(results, cases), start=1)]
+    failures = [r for r in records if r["outcome"] == TestOutcome.FAILED]
+    errors = [r for r in records if r["outcome"] == TestOutcome.ERROR]
+    return {
+        "total": len(records),
+        "failures": len(failures),
+        "errors": len(errors),
+        "passed": len(records) - len(failures) - len(errors),
+        "results": summarize(records),
+        "failure_details": [f"{r['name']}: {r['message']}" for r in failures],
+        "error_details": [f"{r['name']}: {r['message']}" for r in errors],
+        "test_cases": records
+    }
@@ -0,0 +1,340 @@
+"""
+Durable grading jobs: the ``grading_jobs`` table behind the in-memory scheduler
+
+Every queued submission has a row, written before the job enters a worker
+queue. A worker claims the row before grading (QUEUED -> RUNNING in one
+conditional UPDATE, so two processes holding the same job never both run it),
+heartbeats while it grades and marks the row DONE or FAILED when it is done.
+
+A worker that dies mid-grade leaves its row RUNNING with a lease that stops
+moving. ``recover_jobs`` puts such rows back in the queue, or fails them (and
+their submission) once they have taken down ``max_attempts`` workers. It also
+adopts submissions left GRADING or PROCESSING with no job and no lease, so a
+crash never leaves a submission stuck. ``sweep_scratch`` removes what dead
+workers left on disk.
+"""
+
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, case, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models.models import GradingJob, GradingJobState, GradingLease, Submission, SubmissionStatus
+from .leases import PROCESS_OWNER, LeaseKeeper, _now
+from .sandbox import sweep_orphaned_pools
+from .scratch import scratch_directory
+from .scheduler import JobPriority
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_SCRATCH_MAX_AGE = 24 * 3600
+# Seconds a queued job waits for each priority class it is promoted by
+DEFAULT_PRIORITY_AGING = 120
+# Submissions per statement when recording a batch of jobs
+BATCH_SIZE = 500
+
+_jobs = GradingJob.__table__
+_leases = GradingLease.__table__
+_submissions = Submission.__table__
+
+QUEUED, RUNNING = GradingJobState.QUEUED, GradingJobState.RUNNING
+DONE, FAILED = GradingJobState.DONE, GradingJobState.FAILED
+
+
+def _is_scratch(name: str) -> bool:
+    """Loose temp files written by ``AutoMarker.save_submission_file_to_temp``."""
+    return name.startswith("submission_")
+
+
+def _job(row) -> Dict:
+    return {"submission_id": row.submission_id, "student_id": row.student_id, "assignment_id": row.assignment_id,
+            "priority": row.priority, "regrade": row.regrade}
+
+
+def record_jobs(engine, jobs: Iterable[Dict]) -> List[int]:
+    """
+    Persist jobs (dicts of submission_id, student_id, assignment_id, priority, regrade) as QUEUED.
+
+    A submission already queued keeps its row, at the more urgent of the two
+    priorities; one that finished, failed or is running is queued again.
+    Returns the submissions that were not queued before.
+    """
+    jobs = list(jobs)
+    queued = []
+    for start in range(0, len(jobs), BATCH_SIZE):
+        batch = {job["submission_id"]: job for job in jobs[start:start + BATCH_SIZE]}
+        try:
+            queued += _record_batch(engine, batch)
+        except IntegrityError:
+            # Another process inserted one of these rows since we looked; now they all exist
+            queued += _record_batch(engine, batch)
+    return queued
+
+
+def _record_batch(engine, batch):
+    now = _now()
+    with engine.begin() as connection:
+        existing = connection.execute(
+            select(_jobs.c.submission_id, _jobs.c.state, _jobs.c.priority, _jobs.c.regrade)
+            .where(_jobs.c.submission_id.in_(list(batch)))
+        ).all()
+
+        # One UPDATE per distinct outcome rather than one per submission
+        upgraded, requeued = {}, {}
+        for row in existing:
+            job = batch[row.submission_id]
+            if row.state is QUEUED:
+                values = (min(row.priority, int(job["priority"])), row.regrade or bool(job["regrade"]))
+                if values != (row.priority, row.regrade):
+                    upgraded.setdefault(values, []).append(row.submission_id)
+            else:
+                requeued.setdefault((int(job["priority"]), bool(job["regrade"])), []).append(row.submission_id)
+
+        for (priority, regrade), ids in upgraded.items():
+            connection.execute(update(_jobs).where(_jobs.c.submission_id.in_(ids))
+                               .values(priority=priority, regrade=regrade))
+        for (priority, regrade), ids in requeued.items():
+            connection.execute(update(_jobs).where(_jobs.c.submission_id.in_(ids)).values(
+                priority=priority, regrade=regrade, state=QUEUED, attempts=0, owner=None, enqueued_at=now,
+                started_at=None, heartbeat_at=None, lease_expires_at=None, finished_at=None, last_error=None
+            ))
+
+        known = {row.submission_id for row in existing}
+        fresh = [{"submission_id": job["submission_id"], "student_id": job["student_id"],
+                  "assignment_id": job["assignment_id"], "priority": int(job["priority"]),
+                  "regrade": bool(job["regrade"]), "state": QUEUED, "attempts": 0, "enqueued_at": now}
+                 for submission_id, job in batch.items() if submission_id not in known]
+        if fresh:
+            connection.execute(insert(_jobs), fresh)
+    return [job["submission_id"] for job in fresh] + [i for ids in requeued.values() for i in ids]
+
+
+def claim_job(engine, job, owner=PROCESS_OWNER, ttl=300) -> bool:
+    """
+    Take a queued job (a ``QueuedJob``) for this worker. Returns False when it
+    is no longer queued: finished, or claimed by another process.
+
+    A job with no row at all (queued before jobs were recorded) is recorded as
+    running, so it is recovered like any other if this worker dies.
+    """
+    now = _now()
+    running = dict(state=RUNNING, owner=owner, started_at=now, heartbeat_at=now,
+                   lease_expires_at=now + timedelta(seconds=ttl), finished_at=None)
+    with engine.begin() as connection:
+        if connection.execute(
+            update(_jobs)
+            .where(_jobs.c.submission_id == job.submission_id, _jobs.c.state == QUEUED)
+            .values(attempts=_jobs.c.attempts + 1, **running)
+        ).rowcount:
+            return True
+        if connection.execute(select(_jobs.c.submission_id).where(_jobs.c.submission_id == job.submission_id)).first():
+            return False
+    try:
+        with engine.begin() as connection:
+            connection.execute(insert(_jobs).values(
+                submission_id=job.submission_id, student_id=job.student_id, assignment_id=job.assignment_id,
+                priority=int(job.priority), regrade=job.regrade, attempts=1, enqueued_at=now, **running
+            ))
+        return True
+    except IntegrityError:
+        return False
+
+
+def claim_next_job(engine, owner=PROCESS_OWNER, ttl=300, aging: float = DEFAULT_PRIORITY_AGING) -> Optional[Dict]:
+    """
+    Take the next queued job for this worker in fair-share order, or return
+    None when nothing is queued.
+
+    The order follows ``GradingScheduler``: by priority class, then round robin
+    across assignments and, within an assignment, across students. With no
+    per-process state to rotate, the round robin picks the assignment, then
+    the student, whose last job started longest ago (never first), so one
+    student's resubmissions or one bulk regrade only get their share of the
+    workers. In place of ``starvation_limit``, a job moves up one priority
+    class for every ``aging`` seconds it has waited, so lower classes are
+    never starved.
+
+    Workers on other hosts claim from the same table at the same time. Where
+    the database supports it the candidate row is locked with ``FOR UPDATE
+    SKIP LOCKED``, so concurrent workers each lock a different row instead of
+    queueing behind one another. SQLite has no row locks: there the pick and
+    the claim are one ``UPDATE ... RETURNING`` statement, which SQLite's write
+    lock makes atomic.
+    """
+    now = _now()
+    running = dict(state=RUNNING, owner=owner, started_at=now, heartbeat_at=now, attempts=_jobs.c.attempts + 1,
+                   lease_expires_at=now + timedelta(seconds=ttl), finished_at=None)
+    columns = (_jobs.c.submission_id, _jobs.c.student_id, _jobs.c.assignment_id, _jobs.c.priority, _jobs.c.regrade)
+    next_job = (select(_jobs.c.submission_id).where(_jobs.c.state == QUEUED)
+                .order_by(*_fair_share_order(now, aging)).limit(1))
+    with engine.begin() as connection:
+        if connection.dialect.name == "sqlite":
+            row = connection.execute(
+                update(_jobs)
+                .where(_jobs.c.submission_id == next_job.scalar_subquery(), _jobs.c.state == QUEUED)
+                .values(**running)
+                .returning(*columns)
+            ).first()
+            return _job(row) if row else None
+
+        submission_id = connection.execute(next_job.with_for_update(skip_locked=True)).scalar()
+        if submission_id is None:
+            return None
+        connection.execute(update(_jobs).where(_jobs.c.submission_id == submission_id).values(**running))
+        return _job(connection.execute(select(*columns).where(_jobs.c.submission_id == submission_id)).first())
+
+
+def _fair_share_order(now, aging):
+    """ORDER BY terms for ``claim_next_job``: aged priority, assignment and student round robin, then age."""
+    promotions = case(*[(_jobs.c.enqueued_at <= now - timedelta(seconds=aging * classes), classes)
+                        for classes in range(len(JobPriority) - 1, 0, -1)], else_=0)
+    priority = case((_jobs.c.priority > promotions, _jobs.c.priority - promotions), else_=0)
+
+    served = _jobs.alias("served")
+    assignment_served = (select(func.max(served.c.started_at))
+                         .where(served.c.assignment_id == _jobs.c.assignment_id).scalar_subquery())
+    student_served = (select(func.max(served.c.started_at))
+                      .where(served.c.assignment_id == _jobs.c.assignment_id,
+                             served.c.student_id == _jobs.c.student_id).scalar_subquery())
+    return (priority, assignment_served.nulls_first(), student_served.nulls_first(),
+            _jobs.c.enqueued_at, _jobs.c.submission_id)
+
+
+def pending_jobs(engine) -> Dict[str, int]:
+    """Queued jobs per priority class, in the shape of ``GradingScheduler.pending``."""
+    counts = {priority.name.lower(): 0 for priority in JobPriority}
+    with engine.connect() as connection:
+        for priority, count in connection.execute(
+            select(_jobs.c.priority, func.count()).where(_jobs.c.state == QUEUED).group_by(_jobs.c.priority)
+        ):
+            counts[JobPriority(priority).name.lower()] = count
+    return counts
+
+
+def renew_job(engine, submission_id, owner=PROCESS_OWNER, ttl=300) -> bool:
+    """Heartbeat: push the lease of a job we are running forward. False if it was taken from us."""
+    now = _now()
+    with engine.begin() as connection:
+        return connection.execute(
+            update(_jobs)
+            .where(_jobs.c.submission_id == submission_id, _jobs.c.owner == owner, _jobs.c.state == RUNNING)
+            .values(heartbeat_at=now, lease_expires_at=now + timedelta(seconds=ttl))
+        ).rowcount == 1
+
+
+def finish_job(engine, submission_id, owner=PROCESS_OWNER, error: Optional[str] = None) -> bool:
+    """Mark a job we ran DONE, or FAILED with ``error``. False if it was requeued or taken meanwhile."""
+    with engine.begin() as connection:
+        return connection.execute(
+            update(_jobs)
+            .where(_jobs.c.submission_id == submission_id, _jobs.c.owner == owner, _jobs.c.state == RUNNING)
+            .values(state=FAILED if error else DONE, finished_at=_now(), lease_expires_at=None,
+                    last_error=error[:2000] if error else None)
+        ).rowcount == 1
+
+
+class JobHeartbeat(LeaseKeeper):
+    """Renews a running job's lease for the duration of a ``with`` block; ``finish_job`` ends it."""
+
+    name = "job"
+
+    def renew(self):
+        return renew_job(self.engine, self.submission_id, self.owner, self.ttl)
+
+    def release(self):
+        pass
+
+
+@dataclass
+class Recovery:
+    requeued: List[int] = field(default_factory=list)  # Abandoned mid-grade, queued again
+    failed: List[int] = field(default_factory=list)    # Abandoned max_attempts times, given up on
+    adopted: List[int] = field(default_factory=list)   # Stuck GRADING/PROCESSING with no job
+    queued: List[Dict] = field(default_factory=list)   # Jobs to put in this worker's queue
+
+
+def recover_jobs(engine, max_attempts: int = DEFAULT_MAX_ATTEMPTS, stale_after: Optional[float] = 0) -> Recovery:
+    """
+    Requeue (or fail) jobs whose worker died, adopt stuck submissions, and
+    list the queued jobs that were enqueued more than ``stale_after`` seconds
+    ago: on startup (0) every queued job, later only those no live worker
+    seems to be getting to. Workers that claim from the table themselves
+    need no list (None).
+    """
+    now = _now()
+    recovery = Recovery()
+    abandoned = and_(_jobs.c.state == RUNNING, or_(_jobs.c.lease_expires_at < now, _jobs.c.lease_expires_at.is_(None)))
+    with engine.begin() as connection:
+        for row in connection.execute(select(_jobs.c.submission_id, _jobs.c.attempts).where(abandoned)):
+            (recovery.failed if row.attempts >= max_attempts else recovery.requeued).append(row.submission_id)
+
+        if recovery.failed:
+            connection.execute(update(_jobs).where(_jobs.c.submission_id.in_(recovery.failed)).values(
+                state=FAILED, finished_at=now, lease_expires_at=None,
+                last_error=f"Worker stopped while grading ({max_attempts} attempts)"
+            ))
+            connection.execute(update(_submissions).where(_submissions.c.submission_id.in_(recovery.failed))
+                               .values(status=SubmissionStatus.ERROR))
+        if recovery.requeued:
+            connection.execute(update(_jobs).where(_jobs.c.submission_id.in_(recovery.requeued)).values(
+                state=QUEUED, owner=None, heartbeat_at=None, lease_expires_at=None
+            ))
+
+        # Graded synchronously (or queued before jobs were recorded) by a worker that is gone
+        orphans = connection.execute(
+            select(_submissions.c.submission_id, _submissions.c.student_id, _submissions.c.assignment_id)
+            .where(_submissions.c.status.in_([SubmissionStatus.GRADING, SubmissionStatus.PROCESSING]))
+            .where(_submissions.c.submission_id.not_in(
+                select(_jobs.c.submission_id).where(_jobs.c.state.in_([QUEUED, RUNNING]))))
+            .where(_submissions.c.submission_id.not_in(
+                select(_leases.c.submission_id).where(_leases.c.expires_at >= now)))
+        ).all()
+
+    if orphans:
+        # Behind new submits, so a class's worth of stuck submissions does not delay them
+        record_jobs(engine, [{"submission_id": row.submission_id, "student_id": row.student_id,
+                              "assignment_id": row.assignment_id, "priority": JobPriority.REGRADE,
+                              "regrade": False} for row in orphans])
+        recovery.adopted = [row.submission_id for row in orphans]
+
+    if stale_after is None:
+        return recovery
+    with engine.connect() as connection:
+        recovery.queued = [_job(row) for row in connection.execute(
+            select(_jobs)
+            .where(_jobs.c.state == QUEUED)
+            .where(or_(_jobs.c.enqueued_at <= now - timedelta(seconds=stale_after),
+                       _jobs.c.submission_id.in_(recovery.adopted)))
+            .order_by(_jobs.c.priority, _jobs.c.enqueued_at)
+        )]
+    return recovery
+
+
+def sweep_scratch(directory: Optional[str] = None, max_age: float = DEFAULT_SCRATCH_MAX_AGE) -> int:
+    """
+    Remove scratch space dead workers left behind in ``directory`` (the
+    private ``grading.scratch`` directory, never the shared temp directory):
+    sandbox pools of exited processes, and automarker temp files older than
+    ``max_age`` seconds. Returns how many entries were removed.
+    """
+    directory = directory or scratch_directory()
+    removed = sweep_orphaned_pools(directory)
+    cutoff = time.time() - max_age
+    for entry in os.scandir(directory):
+        if not _is_scratch(entry.name):
+            continue
+        try:
+            if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+            removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,189 @@
+"""
+Language runners: how a submission in each programming language is built and run
+
+``Test.programming_language`` picks the runner (``Submission.file_type`` fills
+in for tests without one). A runner names the file the submission is saved as
+in its sandbox, an optional compile command and the command that runs the
+program; ``{source}`` and ``{workdir}`` in either are replaced with absolute
+paths.
+
+Compiled languages are built once per submission, before any test case runs,
+in the submission's sandbox. What the compiler leaves behind (the runner's
+``outputs``) is stored in the on-disk build cache shared by every grading
+process on the host (see ``grading.build_cache``), keyed by language, compile
+command, compiler version and the source's SHA-256, so a regrade or a
+resubmission of the same file skips the compiler altogether, whichever worker
+compiled it first. Compile time is reported separately from the run time
+of the test cases (``Result.compile_time`` vs ``Result.execution_time``).
+
+A build that fails is graded as a single ``Build.compile`` error carrying the
+compiler's output, so the student sees why nothing ran.
+"""
+
+import glob
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from models.models import ProgrammingLanguage, SubmissionFileType, TestOutcome
+from utils.metrics import metrics
+from .build_cache import get_build_cache
+from .orchestrator import get_orchestrator, python_command
+from .results import MAX_TRACEBACK_LENGTH, _truncate_tail, summarize
+
+DEFAULT_COMPILE_TIMEOUT = 60.0
+VERSION_TIMEOUT = 10.0
+
+
+class UnsupportedLanguageError(ValueError):
+    """No runner is registered for a test's programming language."""
+
+
+@dataclass(frozen=True)
+class LanguageRunner:
+    language: ProgrammingLanguage
+    source_name: str
+    run: Tuple[str, ...]
+    compile: Optional[Tuple[str, ...]] = None
+    outputs: Tuple[str, ...] = ()  # Glob patterns, relative to the working directory
+    file_types: Tuple[SubmissionFileType, ...] = ()
+    version: Optional[Tuple[str, ...]] = None  # Prints the toolchain version; default: compiler --version
+
+    @property
+    def compiled(self) -> bool:
+        return self.compile is not None
+
+    def source_path(self, workdir: str) -> str:
+        return os.path.join(workdir, self.source_name)
+
+    def run_command(self, workdir: str) -> List[str]:
+        return self._format(self.run, workdir)
+
+    def compile_command(self, workdir: str) -> List[str]:
+        return self._format(self.compile, workdir)
+
+    def version_command(self) -> List[str]:
+        return list(self.version or (self.compile[0], "--version"))
+
+    def _format(self, template, workdir):
+        return [arg.format(source=self.source_path(workdir), workdir=workdir) for arg in template]
+
+
+RUNNERS: Dict[ProgrammingLanguage, LanguageRunner] = {runner.language: runner for runner in (
+    LanguageRunner(ProgrammingLanguage.PYTHON, "main.py", tuple(python_command("{source}")),
+                   file_types=(SubmissionFileType.PYTHON_FILE,)),
+    LanguageRunner(ProgrammingLanguage.C, "main.c", ("{workdir}/main",),
+                   compile=("gcc", "-O2", "-std=c11", "-o", "main", "{source}", "-lm"), outputs=("main",),
+                   file_types=(SubmissionFileType.C_FILE,)),
+    LanguageRunner(ProgrammingLanguage.CPP, "main.cpp", ("{workdir}/main",),
+                   compile=("g++", "-O2", "-std=c++17", "-o", "main", "{source}"), outputs=("main",),
+                   file_types=(SubmissionFileType.CPP_FILE,)),
+    LanguageRunner(ProgrammingLanguage.JAVA, "Main.java", ("java", "-cp", "{workdir}", "Main"),
+                   compile=("javac", "-encoding", "UTF-8", "-d", ".", "{source}"), outputs=("*.class",),
+                   file_types=(SubmissionFileType.JAVA_FILE,), version=("javac", "-version")),
+    LanguageRunner(ProgrammingLanguage.GO, "main.go", ("{workdir}/main",),
+                   compile=("go", "build", "-o", "main", "{source}"), outputs=("main",), version=("go", "version")),
+    LanguageRunner(ProgrammingLanguage.RUST, "main.rs", ("{workdir}/main",),
+                   compile=("rustc", "-O", "-o", "main", "{source}"), outputs=("main",)),
+    LanguageRunner(ProgrammingLanguage.JAVASCRIPT, "main.js", ("node", "{source}"),
+                   file_types=(SubmissionFileType.JAVASCRIPT_FILE,)),
+    LanguageRunner(ProgrammingLanguage.PHP, "main.php", ("php", "{source}")),
+    LanguageRunner(ProgrammingLanguage.RUBY, "main.rb", ("ruby", "{source}")),
+)}
+
+FILE_TYPE_LANGUAGES = {file_type: runner.language for runner in RUNNERS.values() for file_type in runner.file_types}
+
+
+def runner_for(language: Optional[ProgrammingLanguage],
+               file_type: Optional[SubmissionFileType] = None) -> LanguageRunner:
+    """The runner for a test's language, falling back to the submission's file type, then Python."""
+    language = language or FILE_TYPE_LANGUAGES.get(file_type) or ProgrammingLanguage.PYTHON
+    try:
+        return RUNNERS[language]
+    except KeyError:
+        raise UnsupportedLanguageError(f"No runner for {language.value} submissions") from None
+
+
+@dataclass
+class Build:
+    """A submission ready to run (or the reason it is not)."""
+    command: List[str]
+    compile_time: Optional[float] = None  # Seconds spent compiling; None when nothing needed compiling
+    cached: bool = False
+    error: Optional[str] = None  # Compiler output of a failed build
+
+
+_toolchain_versions: Dict[ProgrammingLanguage, str] = {}
+_toolchain_lock = threading.Lock()
+
+
+def toolchain_version(runner: LanguageRunner) -> str:
+    """
+    The compiler's version string, part of every build cache key so that
+    upgrading a toolchain never serves binaries built by the old one. Asked
+    once per process; a compiler that cannot be asked is "unknown" (and will
+    fail to compile anyway).
+    """
+    version = _toolchain_versions.get(runner.language)
+    if version is None:
+        result = get_orchestrator().run(runner.version_command(), timeout=VERSION_TIMEOUT)
+        version = (result.stdout + result.stderr).strip() if result.ok else "unknown"
+        with _toolchain_lock:
+            version = _toolchain_versions.setdefault(runner.language, version)
+    return version
+
+
+def _outputs(runner, workdir):
+    """What the compiler left in ``workdir``, as paths relative to it."""
+    return sorted({os.path.relpath(path, workdir)
+                   for pattern in runner.outputs for path in glob.glob(os.path.join(workdir, pattern))})
+
+
+def build(runner: LanguageRunner, source: bytes, workdir: str, sandbox=None,
+          timeout: float = DEFAULT_COMPILE_TIMEOUT) -> Build:
+    """
+    Make the submission saved in ``workdir`` runnable: compile it, or install the
+    cached outputs of an earlier compile of the same source.
+    """
+    command = runner.run_command(workdir)
+    if not runner.compiled:
+        return Build(command)
+
+    cache = get_build_cache()
+    key = cache.key(runner.language.value, runner.compile, toolchain_version(runner), source)
+    if cache.get(key, workdir):
+        return Build(command, compile_time=0.0, cached=True)
+
+    result = get_orchestrator().run(runner.compile_command(workdir), timeout=timeout, cwd=workdir, sandbox=sandbox)
+    metrics.increment("builds.compiles")
+    if result.error:
+        return Build(command, compile_time=result.duration, error=f"Compiler could not be started: {result.error}")
+    if not result.ok:
+        reason = "timed out" if result.timed_out else f"exited with code {result.returncode}"
+        output = (result.stderr + result.stdout).strip()
+        return Build(command, compile_time=result.duration, error=f"Compiler {reason}\n{output}".strip())
+
+    cache.put(key, workdir, _outputs(runner, workdir))
+    return Build(command, compile_time=result.duration)
+
+
+def failed_build(build_result: Build) -> dict:
+    """Results for a submission that did not compile: one error record with the compiler output."""
+    record = {
+        "name": "Build.compile",
+        "outcome": TestOutcome.ERROR,
+        "duration": 0.0,  # Nothing ran; the build's time is the result's compile_time
+        "message": "Compilation failed",
+        "traceback": _truncate_tail(build_result.error or "", MAX_TRACEBACK_LENGTH) or None
+    }
+    return {
+        "total": 1,
+        "failures": 0,
+        "errors": 1,
+        "passed": 0,
+        "results": summarize([record]),
+        "failure_details": [],
+        "error_details": [f"Build.compile: Compilation failed\n{build_result.error or ''}".strip()],
+        "test_cases": [record]
+    }
@@ -0,0 +1,118 @@
+"""
+Database leases that make grading a submission exclusive across processes
+
+A lease is a row in ``grading_leases`` keyed by submission id. Taking it is a
+single INSERT (or an UPDATE of an expired row), so the primary key decides the
+winner even when several worker processes race. Holders renew the lease while
+they grade; if a holder dies, the lease simply expires and can be taken over.
+"""
+
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models.models import GradingLease
+
+# Identifies this process in lease rows
+PROCESS_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_leases = GradingLease.__table__
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def acquire_lease(engine, submission_id, owner=PROCESS_OWNER, ttl=300):
+    """Try to take the lease for ``submission_id``. Returns True on success."""
+    now = _now()
+    expires_at = now + timedelta(seconds=ttl)
+    with engine.begin() as connection:
+        # Take over an expired lease (or refresh our own)
+        taken = connection.execute(
+            update(_leases)
+            .where(_leases.c.submission_id == submission_id)
+            .where(or_(_leases.c.expires_at < now, _leases.c.owner == owner))
+            .values(owner=owner, acquired_at=now, expires_at=expires_at)
+        ).rowcount
+    if taken:
+        return True
+    
+    try:
+        with engine.begin() as connection:
+            connection.execute(insert(_leases).values(
+                submission_id=submission_id, owner=owner, acquired_at=now, expires_at=expires_at
+            ))
+        return True
+    except IntegrityError:
+        return False
+
+
+def renew_lease(engine, submission_id, owner=PROCESS_OWNER, ttl=300):
+    """Extend a lease we hold. Returns False if it was lost to another owner."""
+    with engine.begin() as connection:
+        return connection.execute(
+            update(_leases)
+            .where(_leases.c.submission_id == submission_id, _leases.c.owner == owner)
+            .values(expires_at=_now() + timedelta(seconds=ttl))
+        ).rowcount == 1
+
+
+def release_lease(engine, submission_id, owner=PROCESS_OWNER):
+    with engine.begin() as connection:
+        connection.execute(
+            delete(_leases).where(_leases.c.submission_id == submission_id, _leases.c.owner == owner)
+        )
+
+
+def lease_is_active(engine, submission_id):
+    """True while some owner holds an unexpired lease on the submission."""
+    with engine.connect() as connection:
+        expires_at = connection.execute(
+            select(_leases.c.expires_at).where(_leases.c.submission_id == submission_id)
+        ).scalar()
+    if expires_at is None:
+        return False
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at >= _now()
+
+
+class LeaseKeeper:
+    """Holds a lease for the duration of a ``with`` block, renewing it in the background."""
+    
+    def __init__(self, engine, submission_id, owner=PROCESS_OWNER, ttl=300):
+        self.engine = engine
+        self.submission_id = submission_id
+        self.owner = owner
+        self.ttl = ttl
+        self._stop = threading.Event()
+        self._thread = None
+    
+    name = "lease"
+    
+    def renew(self):
+        return renew_lease(self.engine, self.submission_id, self.owner, self.ttl)
+    
+    def release(self):
+        release_lease(self.engine, self.submission_id, self.owner)
+    
+    def _renew(self):
+        while not self._stop.wait(self.ttl / 3):
+            if not self.renew():
+                return
+    
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._renew, name=f"{self.name}-{self.submission_id}", daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.release()
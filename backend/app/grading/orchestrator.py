@@ -0,0 +1,317 @@
+"""
+asyncio orchestration of student-program subprocesses
+
+Running a student's program is almost entirely waiting on a child process, so a
+thread blocked in ``subprocess.run`` per execution wastes grading workers.
+``SubprocessOrchestrator`` runs one event loop on a background thread and
+drives every execution with ``asyncio.create_subprocess_exec``; hundreds can be
+in flight from a single process while callers (scheduler threads, executor
+processes) block only on their own result.
+
+- A semaphore bounds how many programs run at once (``max_concurrency``).
+- Each execution has its own timeout (normally ``Test.timeout_seconds``); on
+  expiry the program's whole process group is killed.
+- With a ``sandbox`` (see ``grading.sandbox``) the command line is wrapped by
+  the sandbox's backend and runs in its working directory and environment.
+- stdout and stderr are read incrementally as they are produced. Only the first
+  and last ``keep_bytes`` of each stream are kept (``HeadTailBuffer``), and a
+  program that prints more than ``max_output_bytes`` in total is killed on the
+  spot, so a ``while True: print(...)`` submission costs neither memory nor the
+  rest of its timeout.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence
+
+from flask import current_app, has_app_context
+
+from .sandbox import Sandbox
+
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_MAX_OUTPUT_BYTES = 8 * 1024 * 1024
+DEFAULT_KEEP_BYTES = 64 * 1024
+DEFAULT_TIMEOUT = 10.0
+READ_CHUNK = 64 * 1024
+# How long to wait for output still buffered in the pipes once the program has exited
+PIPE_GRACE_SECONDS = 1.0
+
+
+class HeadTailBuffer:
+    """Keeps the first and last ``keep`` bytes written to it and counts the rest."""
+
+    def __init__(self, keep: int):
+        self.keep = keep
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data: bytes) -> None:
+        self.total += len(data)
+        room = self.keep - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            if len(self.tail) > self.keep:
+                del self.tail[:len(self.tail) - self.keep]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self.head) + len(self.tail)
+
+    def getvalue(self) -> bytes:
+        if not self.truncated:
+            return bytes(self.head + self.tail)
+        omitted = self.total - len(self.head) - len(self.tail)
+        return bytes(self.head) + f"\n... [{omitted} bytes omitted] ...\n".encode() + bytes(self.tail)
+
+
+@dataclass
+class ProcessResult:
+    returncode: Optional[int]
+    stdout: str
+    stderr: str
+    duration: float
+    timed_out: bool = False
+    truncated: bool = False
+    error: Optional[str] = None  # The program could not be started
+    output_limit_exceeded: bool = False  # Killed for printing more than max_output_bytes
+    stdout_bytes: int = 0
+    stderr_bytes: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return (self.returncode == 0 and not self.timed_out and not self.output_limit_exceeded
+                and self.error is None)
+
+
+@dataclass
+class ProgramRun:
+    """One execution request for ``run_many``."""
+    argv: Sequence[str]
+    input: Optional[str] = None
+    timeout: Optional[float] = None
+    cwd: Optional[str] = None
+    sandbox: Optional[Sandbox] = None
+
+
+def _kill_group(process):
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class _OutputCapture:
+    """Head/tail buffers for both streams of one program and its shared output budget."""
+
+    def __init__(self, process, keep_bytes, max_output_bytes):
+        self.process = process
+        self.stdout = HeadTailBuffer(keep_bytes)
+        self.stderr = HeadTailBuffer(keep_bytes)
+        self.max_output_bytes = max_output_bytes
+        self.limit_exceeded = asyncio.Event()
+
+    async def read(self, stream, buffer):
+        while True:
+            chunk = await stream.read(READ_CHUNK)
+            if not chunk:
+                return
+            buffer.write(chunk)
+            if self.stdout.total + self.stderr.total > self.max_output_bytes and not self.limit_exceeded.is_set():
+                self.limit_exceeded.set()
+                _kill_group(self.process)
+
+
+class SubprocessOrchestrator:
+    """Event loop on a daemon thread that runs student programs concurrently."""
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_output_bytes: int = DEFAULT_MAX_OUTPUT_BYTES, keep_bytes: int = DEFAULT_KEEP_BYTES):
+        self.max_concurrency = max_concurrency
+        self.max_output_bytes = max_output_bytes
+        self.keep_bytes = keep_bytes
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+        self.running = self.started = self.timeouts = self.truncated = self.output_limit_kills = 0
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def serve():
+                asyncio.set_event_loop(loop)
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=serve, name="grading-orchestrator", daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+
+    def shutdown(self) -> None:
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join()
+            loop.close()
+
+    async def execute(self, argv: Sequence[str], input: Optional[str] = None, timeout: Optional[float] = None,
+                      cwd: Optional[str] = None, keep_bytes: Optional[int] = None,
+                      sandbox: Optional[Sandbox] = None) -> ProcessResult:
+        """
+        Run one program on the orchestrator's loop (await this from the loop thread only).
+
+        ``keep_bytes`` overrides how much of each stream is kept, e.g. to keep a
+        harness's whole result stream up to the output limit. A ``sandbox``
+        isolates the program; ``cwd`` defaults to its working directory.
+        """
+        timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        env = None
+        if sandbox is not None:
+            argv, env, cwd = sandbox.command(argv, timeout), sandbox.env(), cwd or sandbox.workdir
+        async with self._semaphore:
+            started_at = time.perf_counter()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *argv,
+                    stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    cwd=cwd,
+                    env=env,
+                    start_new_session=True  # Own process group, so a timeout kills its children too
+                )
+            except OSError as e:
+                return ProcessResult(None, "", "", 0.0, error=str(e))
+
+            self.running += 1
+            self.started += 1
+            capture = _OutputCapture(process, keep_bytes or self.keep_bytes, self.max_output_bytes)
+            readers = [asyncio.ensure_future(capture.read(process.stdout, capture.stdout)),
+                       asyncio.ensure_future(capture.read(process.stderr, capture.stderr))]
+            timed_out = False
+            try:
+                await asyncio.wait_for(asyncio.gather(self._feed(process, input), process.wait()), timeout)
+            except asyncio.TimeoutError:
+                timed_out = not capture.limit_exceeded.is_set()
+                self.timeouts += timed_out
+                _kill_group(process)
+                await process.wait()
+            finally:
+                self.running -= 1
+
+            # Background children of the program may still hold the pipes open
+            done, pending = await asyncio.wait(readers, timeout=PIPE_GRACE_SECONDS)
+            for reader in pending:
+                reader.cancel()
+
+            limit_exceeded = capture.limit_exceeded.is_set()
+            truncated = capture.stdout.truncated or capture.stderr.truncated or bool(pending)
+            self.truncated += truncated
+            self.output_limit_kills += limit_exceeded
+            return ProcessResult(
+                returncode=process.returncode,
+                stdout=capture.stdout.getvalue().decode("utf-8", errors="replace"),
+                stderr=capture.stderr.getvalue().decode("utf-8", errors="replace"),
+                duration=time.perf_counter() - started_at,
+                timed_out=timed_out,
+                truncated=truncated,
+                output_limit_exceeded=limit_exceeded,
+                stdout_bytes=capture.stdout.total,
+                stderr_bytes=capture.stderr.total
+            )
+
+    @staticmethod
+    async def _feed(process, input):
+        if input is None:
+            return
+        try:
+            process.stdin.write(input.encode())
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The program exited (or closed stdin) without reading all of its input
+        finally:
+            process.stdin.close()
+
+    def run(self, argv: Sequence[str], input: Optional[str] = None, timeout: Optional[float] = None,
+            cwd: Optional[str] = None, keep_bytes: Optional[int] = None,
+            sandbox: Optional[Sandbox] = None) -> ProcessResult:
+        """Run one program and block the calling thread until it finishes."""
+        return self._submit(self.execute(argv, input=input, timeout=timeout, cwd=cwd, keep_bytes=keep_bytes,
+                                         sandbox=sandbox)).result()
+
+    def run_many(self, runs: Iterable[ProgramRun]) -> List[ProcessResult]:
+        """Run programs concurrently (up to ``max_concurrency``) and return results in order."""
+        futures = [self._submit(self.execute(r.argv, input=r.input, timeout=r.timeout, cwd=r.cwd, sandbox=r.sandbox))
+                   for r in runs]
+        return [future.result() for future in futures]
+
+    def _submit(self, coroutine):
+        self.start()
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError("Blocking orchestrator calls cannot be made from its own event loop; await execute()")
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "started": self.started,
+            "timeouts": self.timeouts,
+            "truncated": self.truncated,
+            "output_limit_kills": self.output_limit_kills
+        }
+
+
+_orchestrator = None
+_orchestrator_lock = threading.Lock()
+
+
+def get_orchestrator() -> SubprocessOrchestrator:
+    """
+    Return the process-wide orchestrator, creating it on first use.
+
+    Inside an app context it is sized from ``GRADING_MAX_SUBPROCESSES``,
+    ``GRADING_MAX_OUTPUT_BYTES`` and ``GRADING_OUTPUT_KEEP_BYTES``; executor
+    processes have no app and use the defaults.
+    """
+    global _orchestrator
+    if _orchestrator is None:
+        with _orchestrator_lock:
+            if _orchestrator is None:
+                config = current_app.config if has_app_context() else {}
+                _orchestrator = SubprocessOrchestrator(
+                    max_concurrency=config.get('GRADING_MAX_SUBPROCESSES', DEFAULT_MAX_CONCURRENCY),
+                    max_output_bytes=config.get('GRADING_MAX_OUTPUT_BYTES', DEFAULT_MAX_OUTPUT_BYTES),
+                    keep_bytes=config.get('GRADING_OUTPUT_KEEP_BYTES', DEFAULT_KEEP_BYTES)
+                )
+    return _orchestrator
+
+
+def python_command(file_path: str) -> List[str]:
+    """Command line that runs a Python file."""
+    # Use python3 on Unix-like systems, python on Windows
+    return ['python' if os.name == 'nt' else 'python3', file_path]
+
+
+def orchestrator_stats() -> dict:
+    return _orchestrator.stats() if _orchestrator is not None else {"started": 0}
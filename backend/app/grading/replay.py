@@ -0,0 +1,216 @@
+"""
+Replays many stdin cases against one student program in a single interpreter
+
+Run as ``python replay.py STUDENT_FILE`` with a JSON job on stdin::
+
+    {"cases": ["2 3\\n", "10 -4\\n"], "timeout": 5, "keep": 65536, "output_limit": 8388608}
+
+The student's file is compiled once and executed as ``__main__`` once per case,
+in fresh globals with ``sys.stdin``/``sys.stdout``/``sys.stderr`` rebound to
+in-memory buffers. Each case has its own timeout (SIGALRM). One JSON line per
+case is written, as soon as it finishes, to the harness's original stdout::
+
+    {"case": 0, "returncode": 0, "stdout": "5\\n", "stderr": "", "timed_out": false,
+     "output_limit_exceeded": false, "truncated": false, "duration": 0.001}
+
+As with a separate process, only the first and last ``keep`` characters of each
+stream are kept, and a case that prints more than ``output_limit`` characters
+is stopped.
+
+After each case the interpreter is put back as it was before the first one:
+modules the program imported are dropped, the namespaces of modules that were
+already loaded (``builtins`` and ``sys`` among them) get their original
+attributes back, and ``sys.path``, ``sys.argv``, ``os.environ``, the recursion
+limit, the working directory and the SIGALRM handler are restored. What is not
+reset is state changed *inside* objects those modules hold (an attribute set
+on a standard library class, an item added to a module-level list or dict),
+state kept in C by extension modules, and process-wide state such as threads
+left running, open file descriptors, other signal handlers, ``atexit``
+handlers, the umask and resource limits. A later case can still see those.
+
+File descriptor 1 itself is pointed at /dev/null while student code runs, so
+output that bypasses ``sys.stdout`` is dropped rather than corrupting the
+result stream (the case then fails and the marker re-runs it in its own
+process).
+
+This file runs in the student's interpreter: it must only use the standard
+library and must not import anything from the application.
+"""
+
+import builtins
+import collections
+import io
+import json
+import os
+import signal
+import sys
+import time
+import traceback
+
+
+class _CaseTimeout(BaseException):
+    """Raised in student code when its case runs out of time (not catchable by ``except Exception``)."""
+
+
+class _OutputLimit(BaseException):
+    """Raised in student code when its case prints more than the output limit."""
+
+
+def _on_alarm(signum, frame):
+    raise _CaseTimeout()
+
+
+class CappedOutput(io.TextIOBase):
+    """Text stream keeping the first and last ``keep`` characters; raises past ``limit`` in total."""
+
+    def __init__(self, keep, limit, budget):
+        self.keep, self.limit = keep, limit
+        self.budget = budget  # [characters written], shared by a case's stdout and stderr
+        self.head, self.head_size = [], 0
+        self.tail, self.tail_size = collections.deque(), 0
+        self.total = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        written = len(text)
+        self.total += written
+        self.budget[0] += written
+        room = self.keep - self.head_size
+        if room > 0:
+            self.head.append(text[:room])
+            self.head_size += len(self.head[-1])
+            text = text[room:]
+        if text:
+            self.tail.append(text)
+            self.tail_size += len(text)
+            while self.tail_size - len(self.tail[0]) >= self.keep:
+                self.tail_size -= len(self.tail.popleft())
+        if self.budget[0] > self.limit:
+            raise _OutputLimit()
+        return written
+
+    @property
+    def truncated(self):
+        return self.total > self.head_size + min(self.tail_size, self.keep)
+
+    def getvalue(self):
+        head, tail = "".join(self.head), "".join(self.tail)
+        if self.tail_size > self.keep:
+            tail = tail[-self.keep:]
+        omitted = self.total - len(head) - len(tail)
+        return head + tail if omitted == 0 else f"{head}\n... [{omitted} characters omitted] ...\n{tail}"
+
+
+class InterpreterState:
+    """What a case can change that a new ``python student.py`` process would start without."""
+
+    SYS_LISTS = ("path", "argv", "meta_path", "path_hooks")
+
+    def __init__(self):
+        self.modules = dict(sys.modules)
+        self.namespaces = {name: dict(module.__dict__) for name, module in self.modules.items()
+                           if isinstance(getattr(module, "__dict__", None), dict)}
+        self.sys_lists = {name: list(getattr(sys, name)) for name in self.SYS_LISTS}
+        self.environ = dict(os.environ)
+        self.recursion_limit = sys.getrecursionlimit()
+        self.cwd = os.getcwd()
+
+    def restore(self):
+        # Modules the program imported are imported afresh for the next case, as in a new process
+        for name in set(sys.modules) - set(self.modules):
+            del sys.modules[name]
+        sys.modules.update(self.modules)
+        for name, namespace in self.namespaces.items():
+            current = self.modules[name].__dict__
+            for attribute in set(current) - set(namespace):
+                del current[attribute]
+            current.update(namespace)
+        for name, items in self.sys_lists.items():
+            getattr(sys, name)[:] = items
+        if os.environ != self.environ:
+            os.environ.clear()
+            os.environ.update(self.environ)
+        sys.setrecursionlimit(self.recursion_limit)
+        os.chdir(self.cwd)
+        signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def run_case(code, student_file, case_input, timeout, keep, output_limit):
+    budget = [0]
+    stdin = io.StringIO(case_input)
+    stdout, stderr = CappedOutput(keep, output_limit, budget), CappedOutput(keep, output_limit, budget)
+    namespace = {"__name__": "__main__", "__file__": student_file, "__builtins__": builtins}
+    returncode, timed_out, limit_exceeded = 0, False, False
+
+    sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr
+    started = time.perf_counter()
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        exec(code, namespace)
+    except _CaseTimeout:
+        timed_out, returncode = True, -signal.SIGKILL
+    except _OutputLimit:
+        limit_exceeded, returncode = True, -signal.SIGKILL
+    except SystemExit as e:
+        if e.code is None:
+            returncode = 0
+        elif isinstance(e.code, int):
+            returncode = e.code
+        else:
+            returncode = 1
+            _report(lambda: print(e.code, file=stderr))
+    except BaseException:
+        returncode = 1
+        _report(lambda: traceback.print_exc(file=stderr))
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        duration = time.perf_counter() - started
+        sys.stdin, sys.stdout, sys.stderr = sys.__stdin__, sys.__stdout__, sys.__stderr__
+
+    return {
+        "returncode": returncode,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "timed_out": timed_out,
+        "output_limit_exceeded": limit_exceeded,
+        "truncated": stdout.truncated or stderr.truncated,
+        "duration": duration
+    }
+
+
+def _report(write):
+    """Write an exit message or traceback to the case's stderr, even if that takes it over the limit."""
+    try:
+        write()
+    except _OutputLimit:
+        pass
+
+
+def main():
+    student_file = os.path.abspath(sys.argv[1])
+    job = json.load(sys.stdin)
+    with open(student_file, "rb") as f:
+        code = compile(f.read(), student_file, "exec", dont_inherit=True)
+
+    # Results go to the original stdout; student code writing to fd 1 directly hits /dev/null
+    results = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+
+    # Look like `python student.py`: the student's directory first on sys.path, argv[0] its file
+    sys.path[0] = os.path.dirname(student_file)
+    sys.argv = [student_file]
+    signal.signal(signal.SIGALRM, _on_alarm)
+    state = InterpreterState()
+
+    for number, case_input in enumerate(job["cases"]):
+        result = run_case(code, student_file, case_input, job["timeout"], job["keep"], job["output_limit"])
+        state.restore()
+        results.write(json.dumps(dict(result, case=number)) + "\n")
+        results.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Structured capture of unittest outcomes
+
+``StructuredTestResult`` records one compact dict per test (name, outcome,
+duration, assertion message and a truncated traceback) instead of the verbose
+``TextTestRunner`` transcript, so results can be stored per test case and
+queried without re-running or parsing feedback text.
+"""
+
+import time
+import unittest
+
+from models.models import TestOutcome
+
+MAX_MESSAGE_LENGTH = 500
+MAX_TRACEBACK_LENGTH = 2000
+
+
+def _test_name(test):
+    """Class.method without the (random temp-file) module prefix."""
+    parts = test.id().split('.')
+    return '.'.join(parts[-2:]) if len(parts) >= 2 else test.id()
+
+
+def _truncate_tail(text, limit):
+    """Keep the end of a traceback, where the failing assertion is."""
+    return text if len(text) <= limit else "..." + text[-(limit - 3):]
+
+
+def summarize(records):
+    """Compact, human-readable listing of test case records used in the feedback text."""
+    labels = {
+        TestOutcome.PASSED: "ok",
+        TestOutcome.FAILED: "FAIL",
+        TestOutcome.ERROR: "ERROR",
+        TestOutcome.SKIPPED: "skipped",
+        TestOutcome.EXPECTED_FAILURE: "expected failure",
+        TestOutcome.UNEXPECTED_SUCCESS: "unexpected success",
+    }
+    lines = []
+    for record in records:
+        line = f"{record['name']} ... {labels[record['outcome']]} ({record['duration']:.3f}s)"
+        if record["message"] and record["outcome"] != TestOutcome.PASSED:
+            line += f": {record['message']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class StructuredTestResult(unittest.TestResult):
+    """unittest result collector producing one record per test case."""
+
+    def __init__(self, stream=None, descriptions=None, verbosity=0):
+        super().__init__(stream, descriptions, verbosity)
+        self.records = []
+        self._current = {}
+        self._started = {}
+
+    def _record(self, test):
+        key = id(test)
+        record = self._current.get(key)
+        if record is None:
+            record = {
+                "name": _test_name(test),
+                "outcome": TestOutcome.PASSED,
+                "duration": 0.0,
+                "message": None,
+                "traceback": None
+            }
+            self._current[key] = record
+            self.records.append(record)
+        return record
+
+    def _set_outcome(self, test, outcome, err=None, message=None):
+        record = self._record(test)
+        # Keep the first problem reported for a test (e.g. the first failing subTest)
+        if record["outcome"] in (TestOutcome.FAILED, TestOutcome.ERROR):
+            return
+        record["outcome"] = outcome
+        if err is not None:
+            record["message"] = str(err[1])[:MAX_MESSAGE_LENGTH] or err[0].__name__
+            record["traceback"] = _truncate_tail(self._exc_info_to_string(err, test), MAX_TRACEBACK_LENGTH)
+        elif message is not None:
+            record["message"] = message[:MAX_MESSAGE_LENGTH]
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._record(test)
+        self._started[id(test)] = time.perf_counter()
+
+    def stopTest(self, test):
+        started = self._started.pop(id(test), None)
+        if started is not None:
+            self._record(test)["duration"] = time.perf_counter() - started
+        self._current.pop(id(test), None)
+        super().stopTest(test)
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self._set_outcome(test, TestOutcome.PASSED)
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._set_outcome(test, TestOutcome.FAILED, err)
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        # Errors in setUpClass/setUpModule arrive for a placeholder "test"
+        self._set_outcome(test, TestOutcome.ERROR, err)
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._set_outcome(test, TestOutcome.SKIPPED, message=reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._set_outcome(test, TestOutcome.EXPECTED_FAILURE)
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._set_outcome(test, TestOutcome.UNEXPECTED_SUCCESS)
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            outcome = TestOutcome.FAILED if issubclass(err[0], test.failureException) else TestOutcome.ERROR
+            self._set_outcome(test, outcome, err)
+
+    def summary(self):
+        """Compact, human-readable listing used in the feedback text."""
+        return summarize(self.records)
+
+    def serializable_records(self):
+        return [dict(record, outcome=record["outcome"].value) for record in self.records]
@@ -0,0 +1,405 @@
+"""
+Sandboxes for student programs
+
+Student programs used to run as plain ``python3`` children of the server, with
+its environment (``DATABASE_URL``, secrets), the network, and read access to
+the database file and every other submission in the temp directory. A sandbox
+backend wraps each program's command line before the orchestrator starts it:
+
+- ``subprocess``: no isolation; the program inherits the server's environment.
+  For development only (the default, so a checkout works anywhere).
+- ``rlimit``: resource limits via ``prlimit`` (data segment, CPU seconds,
+  file size, open files) and a cleared environment. Memory is limited with
+  RLIMIT_DATA rather than RLIMIT_AS, which Node and Go trip over at start-up
+  because they reserve large address ranges they never touch.
+- ``namespace``: the ``rlimit`` limits plus ``unshare`` into fresh
+  unprivileged user, mount, network, PID, IPC and UTS namespaces. There is no
+  network, the program is PID 1 of its own PID namespace (and everything it
+  forks dies with it), the root filesystem is read-only, and the hidden paths
+  are covered with empty tmpfs mounts. Only the sandbox's working directory is
+  mounted back, read-write, at its original path, so file paths do not change.
+  The program runs with every capability dropped (``setpriv``), so it cannot
+  undo those mounts.
+- ``bwrap``: the same isolation built by bubblewrap, for hosts where ``bwrap``
+  is installed (e.g. with unprivileged user namespaces disabled but a setuid
+  ``bwrap``). bubblewrap drops capabilities itself.
+
+No backend installs a seccomp filter. A sandboxed program can make any system
+call the kernel allows an unprivileged process, including those reachable only
+inside a user namespace, such as ``io_uring_setup``, ``perf_event_open``,
+``keyctl`` and ``ptrace`` of its own children. The isolation above holds
+against a program that uses them as intended. It does not hold against one
+that exploits a kernel bug through them; that needs a syscall allowlist (for
+example ``bwrap --seccomp``) or a VM boundary, and hosts grading untrusted code
+should keep their kernel patched.
+
+Hidden by default: the system temp directory, the sandbox pool's root and the
+directory of a SQLite database. Application code stays readable (read-only),
+which the replay harness relies on.
+
+``SandboxPool`` pre-creates a fixed set of sandboxes, each with its own working
+directory and a prebuilt command prefix, and hands them out one submission at
+a time; on release the working directory is emptied and the sandbox reused.
+Per run only the kernel namespaces are new, which costs a few milliseconds.
+Default pool roots are created in the private ``grading.scratch`` directory.
+A pool records its process id in its root, so ``sweep_orphaned_pools`` can
+remove the pools of processes that died without closing them.
+
+Teacher unit tests still run in grading executor processes; programs they
+start through ``run_student`` are sandboxed, but a test that imports the
+student's module runs student code in the executor itself.
+"""
+
+import atexit
+import math
+import os
+import queue
+import shlex
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from flask import current_app, has_app_context
+
+from .scratch import scratch_directory
+
+DEFAULT_BACKEND = "subprocess"
+DEFAULT_POOL_SIZE = 16
+POOL_PREFIX = "automarker-sandboxes-"
+OWNER_FILE = ".owner"  # Process id of the pool's process, in the pool's root
+# Environment of sandboxed programs; everything else the server has is dropped
+SANDBOX_ENV = {"HOME": "/tmp", "LANG": "C.UTF-8", "PYTHONDONTWRITEBYTECODE": "1", "PYTHONIOENCODING": "utf-8"}
+# Passed through from the server when set, so compilers and runtimes find their toolchains
+TOOLCHAIN_ENV = ("PATH", "RUSTUP_HOME", "RUSTUP_TOOLCHAIN", "CARGO_HOME", "GOROOT", "JAVA_HOME")
+
+# Drops every capability for good before the program starts: uid 0 of the user
+# namespace gains none back on exec, and no setuid binary can grant any
+_DROP_CAPABILITIES = (
+    "setpriv --no-new-privs --inh-caps=-all --ambient-caps=-all --bounding-set=-all "
+    "--securebits=+noroot,+noroot_locked,+no_setuid_fixup,+no_setuid_fixup_locked,+keep_caps_locked --"
+)
+# Run by ``unshare`` as PID 1 of the new namespaces: $0 is the working directory.
+# The working directory is entered before the tmpfs mounts hide it and then
+# bound back in place from that open directory ("."), and only after that is
+# the root made read-only, so the bind stays writable. The program itself runs
+# without capabilities, so it cannot unmount or remount any of this.
+_NAMESPACE_SCRIPT = (
+    'cd "$0" && '
+    'for hidden in {hidden}; do mount -t tmpfs -o mode=755,size=64m sandbox "$hidden" || exit 125; done && '
+    'mkdir -p "$0" && mount --no-canonicalize --bind . "$0" && '
+    f'mount -o remount,bind,ro / && cd "$0" && exec {_DROP_CAPABILITIES} "$@"'
+)
+
+
+class SandboxError(RuntimeError):
+    """A sandbox backend is unknown or cannot run on this host."""
+
+
+@dataclass(frozen=True)
+class SandboxLimits:
+    memory_bytes: Optional[int] = 512 * 1024 * 1024
+    file_size_bytes: Optional[int] = 16 * 1024 * 1024
+    open_files: Optional[int] = 256
+    # RLIMIT_NPROC counts every process of the (real) user, so it is off by default
+    max_processes: Optional[int] = None
+
+    def prlimit_args(self, timeout: Optional[float]) -> List[str]:
+        args = []
+        if self.memory_bytes:
+            args.append(f"--data={self.memory_bytes}")
+        if self.file_size_bytes:
+            args.append(f"--fsize={self.file_size_bytes}")
+        if self.open_files:
+            args.append(f"--nofile={self.open_files}")
+        if self.max_processes:
+            args.append(f"--nproc={self.max_processes}")
+        if timeout:
+            # CPU time can only run out after the wall-clock timeout; it stops busy children too
+            args.append(f"--cpu={math.ceil(timeout) + 1}")
+        return args
+
+
+class SandboxBackend:
+    """Turns a program's command line into one that runs it isolated in a working directory."""
+
+    name = "subprocess"
+    requires: Sequence[str] = ()
+
+    def __init__(self, limits: SandboxLimits = SandboxLimits(), hidden_paths: Sequence[str] = (),
+                 extra_env: Optional[Dict[str, str]] = None):
+        self.limits = limits
+        self.hidden_paths = _outermost(os.path.abspath(path) for path in hidden_paths)
+        self.extra_env = dict(extra_env or {})
+
+    @classmethod
+    def available(cls) -> bool:
+        return all(shutil.which(tool) for tool in cls.requires)
+
+    def prefix(self, workdir: str) -> List[str]:
+        """Command-line prefix for a sandbox, built once when the sandbox is created."""
+        return []
+
+    def command(self, prefix: List[str], argv: Sequence[str], timeout: Optional[float]) -> List[str]:
+        return list(argv)
+
+    def env(self) -> Optional[Dict[str, str]]:
+        """Environment for sandboxed programs; None inherits the server's."""
+        return None
+
+
+class RlimitBackend(SandboxBackend):
+    name = "rlimit"
+    requires = ("prlimit",)
+
+    def command(self, prefix, argv, timeout):
+        return ["prlimit", *self.limits.prlimit_args(timeout), "--", *prefix, *argv]
+
+    def env(self):
+        inherited = {name: os.environ[name] for name in TOOLCHAIN_ENV if name in os.environ}
+        return {"PATH": os.defpath, **inherited, **SANDBOX_ENV, **self.extra_env}
+
+
+class NamespaceBackend(RlimitBackend):
+    name = "namespace"
+    requires = ("prlimit", "unshare", "mount", "setpriv")
+
+    def prefix(self, workdir):
+        hidden = " ".join(shlex.quote(path) for path in self.hidden_paths if os.path.isdir(path))
+        return [
+            "unshare", "--user", "--map-root-user", "--mount", "--net", "--ipc", "--uts",
+            "--pid", "--fork", "--kill-child", "--mount-proc",
+            "--", "/bin/sh", "-c", _NAMESPACE_SCRIPT.format(hidden=hidden or '""'), workdir
+        ]
+
+
+class BubblewrapBackend(RlimitBackend):
+    name = "bwrap"
+    requires = ("prlimit", "bwrap")
+
+    def prefix(self, workdir):
+        args = ["bwrap", "--unshare-all", "--die-with-parent", "--ro-bind", "/", "/",
+                "--dev", "/dev", "--proc", "/proc"]
+        for path in self.hidden_paths:
+            if os.path.isdir(path):
+                args += ["--tmpfs", path]
+        return args + ["--bind", workdir, workdir, "--chdir", workdir, "--"]
+
+
+BACKENDS = {backend.name: backend for backend in (SandboxBackend, RlimitBackend, NamespaceBackend, BubblewrapBackend)}
+
+
+def _outermost(paths):
+    """Paths not inside another of them (a tmpfs over a parent already hides its children)."""
+    paths = sorted(set(paths))
+    kept = []
+    for path in paths:
+        if not any(path == parent or path.startswith(parent.rstrip("/") + "/") for parent in kept):
+            kept.append(path)
+    return tuple(kept)
+
+
+class Sandbox:
+    """One pooled sandbox: a working directory and the command prefix that isolates it."""
+
+    def __init__(self, backend: SandboxBackend, workdir: str):
+        self.backend = backend
+        self.workdir = workdir
+        self._prefix = backend.prefix(workdir)
+
+    def command(self, argv: Sequence[str], timeout: Optional[float] = None) -> List[str]:
+        return self.backend.command(self._prefix, argv, timeout)
+
+    def env(self) -> Optional[Dict[str, str]]:
+        return self.backend.env()
+
+    def reset(self) -> None:
+        """Empty the working directory for the next submission."""
+        for entry in os.scandir(self.workdir):
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+class SandboxPool:
+    """A fixed set of sandboxes created up front; ``acquire`` blocks until one is free."""
+
+    def __init__(self, backend: SandboxBackend, size: int = DEFAULT_POOL_SIZE, root: Optional[str] = None):
+        if not backend.available():
+            raise SandboxError(f"Sandbox backend {backend.name!r} needs {', '.join(backend.requires)} on PATH")
+        self.backend = backend
+        self.size = size
+        self.root = root or tempfile.mkdtemp(prefix=POOL_PREFIX, dir=scratch_directory())
+        self._free = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.in_use = self.acquired = self.waits = 0
+        self.sandboxes = []
+        with open(os.path.join(self.root, OWNER_FILE), "w") as f:
+            f.write(str(os.getpid()))
+        for slot in range(size):
+            workdir = os.path.join(self.root, f"slot-{slot}")
+            os.makedirs(workdir, mode=0o700, exist_ok=True)
+            self.sandboxes.append(Sandbox(backend, workdir))
+            self.sandboxes[-1].reset()  # A configured root may hold a crashed process's leftovers
+            self._free.put(self.sandboxes[-1])
+
+    def checkout(self) -> Sandbox:
+        try:
+            sandbox = self._free.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self.waits += 1
+            sandbox = self._free.get()
+        with self._lock:
+            self.in_use += 1
+            self.acquired += 1
+        return sandbox
+
+    def release(self, sandbox: Sandbox) -> None:
+        sandbox.reset()
+        with self._lock:
+            self.in_use -= 1
+        self._free.put(sandbox)
+
+    @contextmanager
+    def acquire(self):
+        sandbox = self.checkout()
+        try:
+            yield sandbox
+        finally:
+            self.release(sandbox)
+
+    def close(self) -> None:
+        """Remove the sandboxes' working directories (and the root, if that leaves it empty)."""
+        for sandbox in self.sandboxes:
+            shutil.rmtree(sandbox.workdir, ignore_errors=True)
+        try:
+            os.remove(os.path.join(self.root, OWNER_FILE))
+            os.rmdir(self.root)
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "size": self.size,
+            "in_use": self.in_use,
+            "acquired": self.acquired,
+            "waits": self.waits
+        }
+
+
+def default_hidden_paths(config) -> List[str]:
+    """
+    The temp directory, the directory of a SQLite database, the build cache and
+    ``GRADING_SANDBOX_HIDE_PATHS``.
+    """
+    paths = [tempfile.gettempdir()]
+    if config.get('GRADING_BUILD_CACHE_DIR'):
+        paths.append(os.path.abspath(config['GRADING_BUILD_CACHE_DIR']))
+    uri = config.get('SQLALCHEMY_DATABASE_URI', '')
+    if uri.startswith('sqlite:///') and uri != 'sqlite:///:memory:':
+        paths.append(os.path.dirname(os.path.abspath(uri[len('sqlite:///'):])))
+    return paths + list(config.get('GRADING_SANDBOX_HIDE_PATHS', ()))
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Someone else's process
+    return True
+
+
+def sweep_orphaned_pools(directory: Optional[str] = None, min_age: float = 3600) -> int:
+    """
+    Remove the default pool roots (``automarker-sandboxes-*``) in ``directory``
+    (the ``grading.scratch`` directory) whose process has exited. A root without an owner
+    file is removed once it is ``min_age`` seconds old. Returns how many were removed.
+    """
+    directory = directory or scratch_directory()
+    removed = 0
+    for entry in os.scandir(directory):
+        if not entry.name.startswith(POOL_PREFIX) or not entry.is_dir(follow_symlinks=False):
+            continue
+        try:
+            with open(os.path.join(entry.path, OWNER_FILE)) as f:
+                orphaned = not _process_alive(int(f.read().strip()))
+        except (OSError, ValueError):
+            try:
+                orphaned = time.time() - entry.stat().st_mtime > min_age
+            except OSError:
+                continue
+        if orphaned:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def create_backend(name: str, limits: SandboxLimits = SandboxLimits(), hidden_paths: Sequence[str] = (),
+                   extra_env: Optional[Dict[str, str]] = None):
+    try:
+        return BACKENDS[name](limits, hidden_paths, extra_env)
+    except KeyError:
+        raise SandboxError(f"Unknown sandbox backend {name!r} (expected one of {', '.join(BACKENDS)})") from None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """
+    Return the process-wide sandbox pool, creating it on first use.
+
+    Configured from the app that first needs it: ``GRADING_SANDBOX`` (backend
+    name), ``GRADING_SANDBOX_POOL_SIZE``, ``GRADING_SANDBOX_ROOT``,
+    ``GRADING_SANDBOX_MEMORY_MB``, ``GRADING_SANDBOX_HIDE_PATHS`` and
+    ``GRADING_SANDBOX_ENV`` (extra variables, e.g. ``RUSTUP_HOME``). A backend
+    that cannot run on this host is an error rather than a silent downgrade.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = current_app.config if has_app_context() else {}
+                memory_mb = config.get('GRADING_SANDBOX_MEMORY_MB', SandboxLimits.memory_bytes // (1024 * 1024))
+                root = (config.get('GRADING_SANDBOX_ROOT')
+                        or tempfile.mkdtemp(prefix=POOL_PREFIX, dir=scratch_directory()))
+                # Other submissions' sandboxes are hidden along with the rest
+                backend = create_backend(config.get('GRADING_SANDBOX', DEFAULT_BACKEND),
+                                         SandboxLimits(memory_bytes=memory_mb * 1024 * 1024),
+                                         default_hidden_paths(config) + [root],
+                                         config.get('GRADING_SANDBOX_ENV'))
+                _pool = SandboxPool(backend, config.get('GRADING_SANDBOX_POOL_SIZE', DEFAULT_POOL_SIZE), root)
+    return _pool
+
+
+def set_sandbox_pool(pool):
+    """Replace the process-wide pool (benchmarks, tests); returns the previous one, not closed."""
+    global _pool
+    with _pool_lock:
+        previous, _pool = _pool, pool
+    return previous
+
+
+def sandbox_stats() -> dict:
+    return _pool.stats() if _pool is not None else {"backend": None}
+
+
+@atexit.register
+def close_sandbox_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,221 @@
+"""
+Priority and fair-share scheduling of grading jobs
+
+Jobs are split into priority classes (interactive submit > regrade > bulk
+backfill). Inside a class, jobs are served round-robin across assignments and,
+within an assignment, round-robin across students. One student resubmitting
+repeatedly or one teacher's bulk regrade therefore only ever gets its fair
+share of the workers. A submission can be queued at most once; re-queuing it
+upgrades the existing job's priority instead of adding a duplicate.
+
+Lower classes are never starved completely: after ``starvation_limit``
+consecutive dispatches from higher classes, one lower-class job is let through.
+Interactive latency is therefore bounded by the queue ahead of it in its own
+class plus at most one lower-class job per ``starvation_limit`` dispatches.
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Callable, Dict, Optional
+
+
+class JobPriority(IntEnum):
+    INTERACTIVE = 0  # Student pressed submit / grade
+    REGRADE = 1      # Single regrade requested by a teacher
+    BULK = 2         # Bulk regrade or backfill of a whole assignment
+
+
+@dataclass
+class QueuedJob:
+    submission_id: int
+    student_id: int
+    assignment_id: int
+    priority: JobPriority = JobPriority.INTERACTIVE
+    regrade: bool = False
+    enqueued_at: float = field(default_factory=time.monotonic)
+    cancelled: bool = False
+    sequence: int = 0
+
+
+class FairQueue:
+    """Two-level round robin: assignments first, then students within an assignment."""
+
+    def __init__(self):
+        self._assignments: "OrderedDict[int, OrderedDict[int, deque]]" = OrderedDict()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def push(self, job: QueuedJob) -> None:
+        students = self._assignments.setdefault(job.assignment_id, OrderedDict())
+        students.setdefault(job.student_id, deque()).append(job)
+        self._size += 1
+
+    def pop(self) -> Optional[QueuedJob]:
+        """Take the next job and rotate its assignment and student to the back."""
+        while self._assignments:
+            assignment_id, students = next(iter(self._assignments.items()))
+            student_id, jobs = next(iter(students.items()))
+            job = jobs.popleft()
+            self._size -= 1
+
+            if jobs:
+                students.move_to_end(student_id)
+            else:
+                del students[student_id]
+            if students:
+                self._assignments.move_to_end(assignment_id)
+            else:
+                del self._assignments[assignment_id]
+
+            # Jobs superseded by a higher-priority copy are skipped lazily
+            if not job.cancelled:
+                return job
+        return None
+
+
+class GradingScheduler:
+    """Thread pool that runs ``handler(job)`` for queued jobs in fair-share order."""
+
+    def __init__(self, handler: Callable[[QueuedJob], None], workers: int = 2,
+                 starvation_limit: int = 8, logger=None,
+                 maintenance: Optional[Callable[[], None]] = None, maintenance_interval: float = 60.0):
+        self.handler = handler
+        self.workers = workers
+        self.starvation_limit = starvation_limit
+        self.logger = logger
+        # Run every maintenance_interval seconds in its own thread while the workers run
+        self.maintenance = maintenance
+        self.maintenance_interval = maintenance_interval
+        self._stopped = threading.Event()
+        self._queues = {priority: FairQueue() for priority in JobPriority}
+        self._queued: Dict[int, QueuedJob] = {}
+        self._condition = threading.Condition()
+        self._consecutive = 0
+        self._sequence = itertools.count(1)
+        self._threads = []
+        self._stopping = False
+
+    # Queue management
+    def submit(self, submission_id: int, student_id: int, assignment_id: int,
+               priority: JobPriority = JobPriority.INTERACTIVE, regrade: bool = False) -> bool:
+        """
+        Queue a submission for grading.
+
+        Returns False when the submission was already queued; the queued job is
+        upgraded to the higher of the two priorities instead of being duplicated.
+        """
+        with self._condition:
+            existing = self._queued.get(submission_id)
+            if existing is not None:
+                if priority >= existing.priority:
+                    existing.regrade = existing.regrade or regrade
+                    return False
+                # Re-queue in the more urgent class, keeping the strongest request
+                existing.cancelled = True
+                self._enqueue(QueuedJob(submission_id, student_id, assignment_id, priority,
+                                        regrade or existing.regrade))
+                return False
+
+            self._enqueue(QueuedJob(submission_id, student_id, assignment_id, priority, regrade))
+            return True
+
+    def _enqueue(self, job: QueuedJob) -> None:
+        job.sequence = next(self._sequence)
+        self._queues[job.priority].push(job)
+        self._queued[job.submission_id] = job
+        self._condition.notify()
+
+    def next_job(self, timeout: Optional[float] = None) -> Optional[QueuedJob]:
+        """Pop the next job to run, waiting up to ``timeout`` seconds for one to arrive."""
+        with self._condition:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                job = self._pop()
+                if job is not None:
+                    del self._queued[job.submission_id]
+                    return job
+                if self._stopping:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def _pop(self) -> Optional[QueuedJob]:
+        non_empty = [p for p in JobPriority if len(self._queues[p])]
+        if not non_empty:
+            return None
+
+        # Let one lower-class job through after a long run of higher-class ones
+        chosen = non_empty[0]
+        if len(non_empty) > 1 and self._consecutive >= self.starvation_limit:
+            chosen = non_empty[1]
+
+        job = self._queues[chosen].pop()
+        if job is None:
+            # Only cancelled jobs were left in that class
+            return self._pop()
+        self._consecutive = self._consecutive + 1 if chosen == non_empty[0] and len(non_empty) > 1 else 0
+        return job
+
+    def pending(self) -> Dict[str, int]:
+        """Number of live queued jobs per priority class."""
+        with self._condition:
+            counts = {priority.name.lower(): 0 for priority in JobPriority}
+            for job in self._queued.values():
+                counts[job.priority.name.lower()] += 1
+            return counts
+
+    def is_queued(self, submission_id: int) -> bool:
+        with self._condition:
+            return submission_id in self._queued
+
+    # Worker threads
+    def start(self) -> None:
+        with self._condition:
+            if self._threads:
+                return
+            self._stopping = False
+            self._stopped.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"grading-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            if self.maintenance is not None:
+                thread = threading.Thread(target=self._maintain, name="grading-maintenance", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        with self._condition:
+            self._stopping = True
+            self._stopped.set()
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self) -> None:
+        while True:
+            job = self.next_job()
+            if job is None:
+                return
+            try:
+                self.handler(job)
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Grading job for submission {job.submission_id} failed: {e}")
+
+    def _maintain(self) -> None:
+        while not self._stopped.wait(self.maintenance_interval):
+            try:
+                self.maintenance()
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Grading maintenance failed: {e}")
@@ -0,0 +1,42 @@
+"""
+The grading processes' private directory in the temp directory
+
+The temp directory is writable by every local user, so a fixed name in it can
+be created first by someone else, who could then plant files there (a compiled
+build under its expected content hash) for the grader to run. Grading state
+therefore lives in ``<tempdir>/automarker-<uid>``, created with mode 0700. An
+existing directory is only used when it belongs to this user and nobody else
+can write to it.
+"""
+
+import os
+import stat
+import tempfile
+
+
+class ScratchDirectoryError(RuntimeError):
+    """A directory the grader would keep its files in could have been tampered with by another user."""
+
+
+def private_directory(path: str) -> str:
+    """Create ``path`` with mode 0700, or check that the existing one is ours and not writable by others."""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise ScratchDirectoryError(f"{path} is not a directory")
+    if info.st_uid != os.getuid():
+        raise ScratchDirectoryError(f"{path} belongs to uid {info.st_uid}, not to this user ({os.getuid()})")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise ScratchDirectoryError(f"{path} is writable by other users (mode {stat.S_IMODE(info.st_mode):o})")
+    return path
+
+
+def scratch_directory(*parts: str) -> str:
+    """``<tempdir>/automarker-<uid>``, or a directory under it, created private on first use."""
+    path = private_directory(os.path.join(tempfile.gettempdir(), f"automarker-{os.getuid()}"))
+    for part in parts:
+        path = private_directory(os.path.join(path, part))
+    return path
@@ -0,0 +1,254 @@
+"""
+Entry points for grading a submission, synchronously or through the scheduler
+
+Grading is single-flight per submission: concurrent requests in this process
+attach to the run already in progress, and a database lease makes the same
+hold across worker processes (the losing process waits for the lease to be
+released and then returns the stored result).
+
+Background jobs are durable (see ``grading.jobs``): each is recorded in
+``grading_jobs`` before it is queued, claimed before it runs and heartbeated
+while it runs. When a scheduler starts it requeues jobs whose worker died,
+picks up every job still waiting and sweeps dead workers' scratch space; while
+it runs it repeats the recovery every ``GRADING_RECOVERY_INTERVAL_SECONDS``.
+
+``GRADING_QUEUE`` picks who runs the jobs: ``"local"`` (default) grades them on
+this process's scheduler threads; ``"database"`` only records them, for
+standalone workers (``grading.worker``) to claim from the table.
+"""
+
+import threading
+import time
+from functools import partial
+
+from flask import current_app
+
+import automarker  # module import: automarker itself imports from this package
+from cache import assignment_cache
+from events import status_broker
+from models.models import db, Submission, SubmissionStatus, GradeStatus
+from .analytics import retract_result
+from .jobs import (
+    DEFAULT_MAX_ATTEMPTS, DEFAULT_SCRATCH_MAX_AGE, JobHeartbeat, claim_job, finish_job, pending_jobs, record_jobs,
+    recover_jobs, sweep_scratch
+)
+from .leases import LeaseKeeper, acquire_lease, lease_is_active
+from .scheduler import GradingScheduler, JobPriority
+from .singleflight import SingleFlight
+
+_scheduler_lock = threading.Lock()
+_in_flight = SingleFlight()
+
+
+def reset_for_regrade(submission):
+    """Drop the existing result so the submission can be graded again."""
+    if submission.result:
+        retract_result(submission)
+        db.session.delete(submission.result)
+        submission.result_id = None
+    
+    submission.status = SubmissionStatus.SUBMITTED
+    db.session.commit()
+    status_broker.publish(submission.submission_id, submission.status)
+
+
+def stored_result(submission_id):
+    """Build an automarker-style result dict from the result already stored for a submission."""
+    db.session.expire_all()
+    submission = db.session.get(Submission, submission_id)
+    if not submission:
+        raise ValueError(f"Submission {submission_id} not found")
+    
+    result = submission.result
+    if not result or result.grade_status != GradeStatus.GRADED:
+        return {
+            "success": False,
+            "submission_id": submission_id,
+            "error": result.error_message if result and result.error_message else "Grading did not complete",
+            "score": 0,
+            "percentage": 0
+        }
+    
+    assignment = assignment_cache.get(submission.assignment_id)
+    return {
+        "success": True,
+        "submission_id": submission_id,
+        "score": result.score,
+        "percentage": result.percentage,
+        "max_score": assignment.max_score if assignment else None,
+        "tests_total": result.test_cases_total,
+        "tests_passed": result.test_cases_passed,
+        "tests_failed": result.test_cases_total - result.test_cases_passed,
+        "tests_errors": 0,
+        "feedback": result.feedback,
+        "status": submission.status.value
+    }
+
+
+def _grade_exclusively(submission_id, regrade):
+    engine = db.engine
+    ttl = current_app.config.get('GRADING_LEASE_SECONDS', 300)
+    poll = current_app.config.get('GRADING_LEASE_POLL_SECONDS', 0.5)
+    
+    while not acquire_lease(engine, submission_id, ttl=ttl):
+        # Another process is grading this submission: wait for it and share its result
+        current_app.logger.info(f"Submission {submission_id} is being graded elsewhere, waiting")
+        while lease_is_active(engine, submission_id):
+            time.sleep(poll)
+        if not _holder_died(engine, submission_id):
+            return dict(stored_result(submission_id), coalesced=True)
+    
+    with LeaseKeeper(engine, submission_id, ttl=ttl):
+        if regrade:
+            submission = db.session.get(Submission, submission_id)
+            if not submission:
+                raise ValueError(f"Submission {submission_id} not found")
+            reset_for_regrade(submission)
+        
+        return automarker.AutoMarker().mark_submission(submission_id)
+
+
+def _holder_died(engine, submission_id):
+    """After a lease ends, tell a clean release apart from a holder that died mid-grade."""
+    status = db.session.query(Submission.status).filter_by(submission_id=submission_id).scalar()
+    db.session.close()
+    return status in (SubmissionStatus.GRADING, SubmissionStatus.PROCESSING)
+
+
+def run_grading(submission_id, regrade=False):
+    """
+    Grade a submission in the calling thread and return the automarker result dict.
+    
+    Concurrent calls for the same submission share one run; the returned dict has
+    ``coalesced=True`` for callers that attached to someone else's run.
+    """
+    result, shared = _in_flight.do(submission_id, lambda: _grade_exclusively(submission_id, regrade))
+    return dict(result, coalesced=True) if shared else result
+
+
+def _run_job(app, job):
+    with app.app_context():
+        if not claim_job(db.engine, job, ttl=app.config.get('GRADING_LEASE_SECONDS', 300)):
+            return  # Graded since it was queued, or claimed by another worker process
+    run_claimed_job(app, job.submission_id, job.regrade)
+
+
+def run_claimed_job(app, submission_id, regrade=False):
+    """Grade a job this process has claimed, heartbeating while it runs, and record how it ended."""
+    with app.app_context():
+        engine = db.engine
+        error = "Grading was interrupted"
+        try:
+            with JobHeartbeat(engine, submission_id, ttl=app.config.get('GRADING_LEASE_SECONDS', 300)):
+                result = run_grading(submission_id, regrade=regrade)
+            error = None if result.get("success") else result.get("error") or "Grading did not complete"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            raise
+        finally:
+            finish_job(engine, submission_id, error=error)
+
+
+def resume_grading(app=None, scheduler=None, stale_after=0):
+    """
+    Recover jobs abandoned by dead workers and queue the waiting ones on ``scheduler``.
+    
+    ``stale_after`` limits the waiting jobs to those queued that many seconds ago
+    or more (0: all of them, as on startup). Without a scheduler (standalone
+    workers claim from the table) only the recovery is done. Returns the ``Recovery``.
+    """
+    app = app or current_app._get_current_object()
+    with app.app_context():
+        recovery = recover_jobs(db.engine, app.config.get('GRADING_JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS),
+                                stale_after if scheduler is not None else None)
+    if scheduler is not None:
+        for job in recovery.queued:
+            scheduler.submit(job["submission_id"], job["student_id"], job["assignment_id"],
+                             priority=JobPriority(job["priority"]), regrade=job["regrade"])
+    if recovery.requeued or recovery.failed or recovery.adopted:
+        app.logger.warning(f"Recovered grading jobs: {len(recovery.requeued)} requeued, "
+                           f"{len(recovery.failed)} failed after repeated crashes, "
+                           f"{len(recovery.adopted)} stuck submissions adopted")
+    return recovery
+
+
+def get_scheduler(app=None):
+    """Return the app's grading scheduler, starting its workers on first use."""
+    app = app or current_app._get_current_object()
+    scheduler = app.extensions.get('grading_scheduler')
+    if scheduler is None:
+        with _scheduler_lock:
+            scheduler = app.extensions.get('grading_scheduler')
+            if scheduler is None:
+                interval = app.config.get('GRADING_RECOVERY_INTERVAL_SECONDS',
+                                          app.config.get('GRADING_LEASE_SECONDS', 300))
+                scheduler = GradingScheduler(
+                    handler=partial(_run_job, app),
+                    workers=app.config.get('GRADING_WORKERS', 2),
+                    starvation_limit=app.config.get('GRADING_STARVATION_LIMIT', 8),
+                    logger=app.logger,
+                    maintenance=lambda: resume_grading(app, scheduler, stale_after=interval),
+                    maintenance_interval=interval
+                )
+                start_up(app, scheduler)
+                scheduler.start()
+                app.extensions['grading_scheduler'] = scheduler
+    return scheduler
+
+
+def start_up(app, scheduler=None):
+    """Pick up where the previous workers left off: recover their jobs and remove their scratch files."""
+    try:
+        resume_grading(app, scheduler)
+        swept = sweep_scratch(max_age=app.config.get('GRADING_SCRATCH_MAX_AGE_SECONDS', DEFAULT_SCRATCH_MAX_AGE))
+        if swept:
+            app.logger.info(f"Removed {swept} orphaned grading scratch entries")
+    except Exception as e:
+        # Grading still works; abandoned jobs wait for the next recovery pass
+        app.logger.error(f"Grading recovery failed on startup: {e}")
+
+
+def uses_workers(app=None):
+    """True when standalone workers, not this process, run queued jobs (``GRADING_QUEUE = "database"``)."""
+    return (app or current_app).config.get('GRADING_QUEUE', 'local') == 'database'
+
+
+def submit_jobs(rows, priority=JobPriority.INTERACTIVE, regrade=False):
+    """
+    Record jobs for ``(submission_id, student_id, assignment_id)`` rows, then queue them.
+    
+    Returns how many were newly queued; the rest were already in the queue.
+    """
+    rows = [tuple(row) for row in rows]
+    queued = record_jobs(db.engine, [
+        {"submission_id": submission_id, "student_id": student_id, "assignment_id": assignment_id,
+         "priority": priority, "regrade": regrade}
+        for submission_id, student_id, assignment_id in rows
+    ])
+    if uses_workers():
+        return len(queued)
+    
+    scheduler = get_scheduler()
+    return sum(scheduler.submit(submission_id, student_id, assignment_id, priority=priority, regrade=regrade)
+               for submission_id, student_id, assignment_id in rows)
+
+
+def enqueue_grading(submission, priority=JobPriority.INTERACTIVE, regrade=False):
+    """
+    Queue a submission for background grading.
+    
+    Marks it PROCESSING so status subscribers see it is queued. Returns False if
+    the submission was already queued (the existing job is reused).
+    """
+    if submission.status != SubmissionStatus.GRADING:
+        submission.status = SubmissionStatus.PROCESSING
+        db.session.commit()
+        status_broker.publish(submission.submission_id, submission.status)
+    
+    return submit_jobs([(submission.submission_id, submission.student_id, submission.assignment_id)],
+                       priority=priority, regrade=regrade) == 1
+
+
+def pending_grading():
+    """Jobs waiting to be graded, per priority class."""
+    return pending_jobs(db.engine) if uses_workers() else get_scheduler().pending()
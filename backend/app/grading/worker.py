@@ -0,0 +1,98 @@
+"""
+Standalone grading workers: grading capacity that scales apart from the API
+
+With ``GRADING_QUEUE = "database"`` the API only records jobs in
+``grading_jobs`` and grades nothing itself. Any number of worker processes, on
+this host or on others that share the database, pull jobs from that table:
+
+    flask --app app grading-worker --threads 4
+
+Each worker thread claims the next queued job in fair-share order
+(``claim_next_job``: ``FOR UPDATE SKIP LOCKED`` where the database has it, one
+atomic UPDATE on SQLite), grades it under a heartbeat and records how it ended,
+then claims the next. A queued job is promoted one priority class for every
+``GRADING_PRIORITY_AGING_SECONDS`` it waits. On startup, and every
+``GRADING_RECOVERY_INTERVAL_SECONDS`` after, a worker requeues jobs abandoned
+by workers that died. Adding capacity for a deadline is starting more workers;
+stopping one (SIGTERM) lets its current jobs finish first.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from models.models import db
+from .jobs import DEFAULT_PRIORITY_AGING, claim_next_job
+from .service import resume_grading, run_claimed_job, start_up
+
+DEFAULT_POLL_SECONDS = 1.0
+
+
+class GradingWorker:
+    """Grades jobs claimed from ``grading_jobs`` on ``threads`` threads until stopped."""
+
+    def __init__(self, app, threads: int = 1, poll_interval: Optional[float] = None,
+                 recovery_interval: Optional[float] = None):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval or app.config.get('GRADING_WORKER_POLL_SECONDS', DEFAULT_POLL_SECONDS)
+        self.recovery_interval = recovery_interval or app.config.get(
+            'GRADING_RECOVERY_INTERVAL_SECONDS', app.config.get('GRADING_LEASE_SECONDS', 300))
+        self.graded = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def run(self, burst: bool = False) -> int:
+        """
+        Grade jobs until ``stop`` is called or, with ``burst``, until the queue
+        is empty. Returns the number of jobs this worker graded.
+        """
+        self._stopped.clear()
+        start_up(self.app)
+        threads = [threading.Thread(target=self._work, args=(burst,), name=f"grading-worker-{index}", daemon=True)
+                   for index in range(self.threads)]
+        for thread in threads:
+            thread.start()
+
+        # The main thread keeps watch for jobs of workers that died
+        next_recovery = time.monotonic() + self.recovery_interval
+        alive = threads
+        while alive:
+            alive[0].join(self.poll_interval)
+            alive = [thread for thread in alive if thread.is_alive()]
+            if time.monotonic() >= next_recovery and not self._stopped.is_set():
+                next_recovery += self.recovery_interval
+                try:
+                    resume_grading(self.app)
+                except Exception as e:
+                    self.app.logger.error(f"Grading recovery failed: {e}")
+        return self.graded
+
+    def stop(self) -> None:
+        """Stop claiming jobs; ``run`` returns once the jobs in progress are graded."""
+        self._stopped.set()
+
+    def _work(self, burst):
+        ttl = self.app.config.get('GRADING_LEASE_SECONDS', 300)
+        aging = self.app.config.get('GRADING_PRIORITY_AGING_SECONDS', DEFAULT_PRIORITY_AGING)
+        while not self._stopped.is_set():
+            try:
+                with self.app.app_context():
+                    job = claim_next_job(db.engine, ttl=ttl, aging=aging)
+            except Exception as e:
+                # The database is unreachable or busy: back off and try again
+                self.app.logger.error(f"Could not claim a grading job: {e}")
+                self._stopped.wait(self.poll_interval)
+                continue
+            if job is None:
+                if burst:
+                    return
+                self._stopped.wait(self.poll_interval)
+                continue
+
+            try:
+                run_claimed_job(self.app, job["submission_id"], job["regrade"])
+            except Exception as e:
+                self.app.logger.error(f"Grading job for submission {job['submission_id']} failed: {e}")
+            with self._lock:
+                self.graded += 1
@@ -0,0 +1,4 @@
+from .runner import (
+    Migration, MigrationContext, discover_migrations, applied_versions,
+    current_version, pending_migrations, upgrade
+)
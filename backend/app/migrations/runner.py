@@ -0,0 +1,222 @@
+"""
+Versioned schema migrations for the CSRS Automated Assessment System
+
+``db.create_all`` only creates missing tables, so it cannot add an index or a
+column to an existing ``automarker.db``. Migrations live in ``versions/`` as
+``NNNN_description.py`` modules exposing ``upgrade(ctx)``; applied versions are
+recorded in the ``schema_migrations`` table. A migration that adds tables defines
+them itself, as they were when it was written, instead of reading the current
+models, so a new database goes through every step an existing one does.
+
+Migrations are written to be safe against a live database:
+- every step runs in its own short transaction instead of one long one,
+- every step is idempotent, so a half-applied migration can simply be re-run,
+- data backfills are done in small batches so writers are never blocked for long,
+- indexes are built concurrently where the backend supports it.
+"""
+
+import importlib
+import pkgutil
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, Optional
+
+from sqlalchemy import MetaData, Table, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+VERSION_TABLE = "schema_migrations"
+_MODULE_PATTERN = re.compile(r"^(\d{4})_(\w+)$")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[["MigrationContext"], None]
+
+
+class MigrationContext:
+    """Online-friendly schema operations handed to each migration's ``upgrade``."""
+
+    def __init__(self, engine, batch_size: int = 500, batch_pause: float = 0.0, log=None):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.log = log or (lambda message: None)
+
+    @property
+    def dialect(self) -> str:
+        return self.engine.dialect.name
+
+    def execute(self, sql: str, params: Optional[dict] = None):
+        """Run a single statement in its own transaction."""
+        with self.engine.begin() as connection:
+            return connection.execute(text(sql), params or {})
+
+    def has_table(self, table: str) -> bool:
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column in {c["name"] for c in inspect(self.engine).get_columns(table)}
+
+    def has_index(self, table: str, name: str) -> bool:
+        return name in {i["name"] for i in inspect(self.engine).get_indexes(table)}
+
+    def create_tables(self, *tables: Table) -> None:
+        """
+        Create a migration's own table definitions if they do not exist yet.
+
+        Tables their foreign keys point at are reflected from the database, so a
+        migration only has to define the tables it adds.
+        """
+        metadata = MetaData()
+        copies = [table.to_metadata(metadata) for table in tables]
+        referred = {fk.target_fullname.split(".")[0] for table in copies for fk in table.foreign_keys}
+        metadata.reflect(bind=self.engine, only=sorted(referred - set(metadata.tables)))
+        metadata.create_all(bind=self.engine, tables=copies, checkfirst=True)
+
+    def add_column(self, table: str, column: str, ddl: str) -> None:
+        """
+        Add a nullable (or defaulted) column.
+
+        ``ALTER TABLE ... ADD COLUMN`` only rewrites the schema, not the rows, on
+        both SQLite and PostgreSQL, so it is a constant-time operation.
+        """
+        if self.has_column(table, column):
+            return
+        self.log(f"  adding column {table}.{column}")
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+    def create_index(self, name: str, table: str, columns: Iterable[str], unique: bool = False) -> None:
+        """
+        Create an index without holding a long write lock where possible.
+
+        PostgreSQL uses ``CREATE INDEX CONCURRENTLY`` (which must run outside a
+        transaction). SQLite has no concurrent build; the index is created in its
+        own transaction so the lock lasts only for the build itself, and with WAL
+        enabled readers keep working meanwhile.
+        """
+        if self.has_index(table, name):
+            return
+        self.log(f"  creating index {name} on {table}")
+        unique_sql = "UNIQUE " if unique else ""
+        column_sql = ", ".join(columns)
+        if self.dialect == "postgresql":
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.execute(text(
+                    f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({column_sql})"
+                ))
+        else:
+            self.execute(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({column_sql})")
+
+    def add_enum_value(self, type_name: str, value: str) -> None:
+        """
+        Add a value to a native enum type.
+
+        Only PostgreSQL has native enum types; SQLite stores enums as plain
+        strings, so there is nothing to change. ``ALTER TYPE ... ADD VALUE``
+        cannot run inside a transaction block before PostgreSQL 12, so it runs
+        in autocommit mode.
+        """
+        if self.dialect != "postgresql":
+            return
+        self.log(f"  adding {value} to enum {type_name}")
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text(f"ALTER TYPE {type_name} ADD VALUE IF NOT EXISTS '{value}'"))
+
+    def backfill(self, table: str, primary_key: str, set_clause: str, where_clause: str,
+                 params: Optional[dict] = None, batch_size: Optional[int] = None) -> int:
+        """
+        Apply ``UPDATE table SET <set_clause>`` to rows matching ``where_clause`` in batches.
+
+        ``where_clause`` must stop matching a row once it has been updated, otherwise
+        the loop never ends. Each batch commits separately. Returns rows updated.
+        """
+        batch_size = batch_size or self.batch_size
+        sql = (
+            f"UPDATE {table} SET {set_clause} WHERE {primary_key} IN ("
+            f"SELECT {primary_key} FROM {table} WHERE {where_clause} LIMIT :_batch_size)"
+        )
+        total = 0
+        while True:
+            updated = self.execute(sql, dict(params or {}, _batch_size=batch_size)).rowcount
+            total += updated
+            if updated < batch_size:
+                break
+            if self.batch_pause:
+                time.sleep(self.batch_pause)
+        if total:
+            self.log(f"  backfilled {total} rows in {table}")
+        return total
+
+
+def discover_migrations() -> List[Migration]:
+    """Load every migration module in ``migrations/versions`` ordered by version."""
+    from . import versions
+
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        match = _MODULE_PATTERN.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        migrations.append(Migration(int(match.group(1)), match.group(2), module.upgrade))
+    migrations.sort(key=lambda m: m.version)
+    return migrations
+
+
+def _ensure_version_table(engine) -> None:
+    with engine.begin() as connection:
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        ))
+
+
+def applied_versions(engine) -> set:
+    _ensure_version_table(engine)
+    with engine.connect() as connection:
+        return {row[0] for row in connection.execute(text(f"SELECT version FROM {VERSION_TABLE}"))}
+
+
+def current_version(engine) -> int:
+    """Return the highest applied migration version (0 for an empty database)."""
+    return max(applied_versions(engine), default=0)
+
+
+def pending_migrations(engine) -> List[Migration]:
+    applied = applied_versions(engine)
+    return [m for m in discover_migrations() if m.version not in applied]
+
+
+def upgrade(engine, target: Optional[int] = None, log=None, **context_options) -> List[Migration]:
+    """
+    Apply all pending migrations up to ``target`` (default: latest).
+
+    Safe to run from several processes at once: steps are idempotent and the
+    version row insert is guarded by its primary key.
+    """
+    log = log or (lambda message: None)
+    if engine.dialect.name == "sqlite":
+        # WAL lets readers continue while a migration step holds the write lock
+        with engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+    applied = []
+    for migration in pending_migrations(engine):
+        if target is not None and migration.version > target:
+            break
+        log(f"Applying migration {migration.version:04d}_{migration.name}")
+        migration.upgrade(MigrationContext(engine, log=log, **context_options))
+        try:
+            with engine.begin() as connection:
+                connection.execute(
+                    text(f"INSERT INTO {VERSION_TABLE} (version, name, applied_at) VALUES (:v, :n, :t)"),
+                    {"v": migration.version, "n": migration.name, "t": datetime.now(timezone.utc)}
+                )
+        except IntegrityError:
+            pass  # Another process recorded it first
+        applied.append(migration)
+    return applied
@@ -0,0 +1,310 @@
+"""
+Baseline schema: every table that existed before versioned migrations.
+
+The tables are defined here as they were at that point rather than taken from
+the current models, so a new database is built by the same steps that upgrade
+an existing one.
+"""
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, Enum, Float, ForeignKey, Integer, LargeBinary, MetaData, String, Table, Text
+)
+
+metadata = MetaData()
+
+INSTITUTION_TYPE = Enum("UNIVERSITY", "COLLEGE", "SCHOOL", "TRAINING_CENTER", name="institutiontype")
+SUBJECT_TYPE = Enum(
+    "PROGRAMMING", "MATHEMATICS", "SCIENCE", "ENGINEERING", "BUSINESS", "ARTS", name="subjecttype"
+)
+ACADEMIC_YEAR = Enum("FOUNDATION", "YEAR_1", "YEAR_2", "YEAR_3", "MASTERS", name="academicyear")
+UK_MODULE_GRADE = Enum(
+    "FIRST_CLASS", "UPPER_SECOND", "LOWER_SECOND", "THIRD_CLASS", "FAIL", "IN_PROGRESS", "DEFERRED",
+    "WITHDRAWN", name="ukmodulegrade"
+)
+PROGRAMMING_LANGUAGE = Enum(
+    "PYTHON", "JAVA", "JAVASCRIPT", "CPP", "C", "CSHARP", "GO", "RUST", "PHP", "RUBY",
+    name="programminglanguage"
+)
+TEST_TYPE = Enum(
+    "UNIT", "FUNCTIONAL", "PERFORMANCE", "INTEGRATION", "SYNTAX", "MEMORY", "SECURITY", name="testtype"
+)
+ASSIGNMENT_TYPE = Enum("CODING", "THEORY", "PROJECT", "EXAM", name="assignmenttype")
+GRADE_STATUS = Enum("NOT_GRADED", "GRADING", "GRADED", "NEEDS_REVIEW", "MANUAL_REVIEW", name="gradestatus")
+SUBMISSION_FILE_TYPE = Enum(
+    "PYTHON_FILE", "JAVA_FILE", "JAVASCRIPT_FILE", "CPP_FILE", "C_FILE", "TEXT_FILE", "ZIP_FILE",
+    "PDF_FILE", name="submissionfiletype"
+)
+SUBMISSION_STATUS = Enum(
+    "SUBMITTED", "PROCESSING", "GRADING", "GRADED", "PASSED", "PARTIAL", "FAILED", "ERROR", "LATE",
+    name="submissionstatus"
+)
+USER_TYPE = Enum("TEACHER", "STUDENT", "ADMIN", name="usertype")
+ACTIVITY_ACTION = Enum(
+    "LOGIN", "LOGOUT", "SUBMIT_ASSIGNMENT", "VIEW_ASSIGNMENT", "CREATE_ASSIGNMENT", "EDIT_ASSIGNMENT",
+    "DELETE_ASSIGNMENT", "GRADE_SUBMISSION", "VIEW_RESULTS", "ENROLL_STUDENT", "DISENROLL_STUDENT",
+    "CREATE_MODULE", "DELETE_MODULE", "UPLOAD_FILE", "DELETE_UPLOADED_FILE", "DOWNLOAD_FILE",
+    name="activityaction"
+)
+TEACHER_ROLE = Enum("INSTRUCTOR", "ASSISTANT", "COORDINATOR", name="teacherrole")
+ENROLLMENT_STATUS = Enum("ACTIVE", "COMPLETED", "DROPPED", "SUSPENDED", name="enrollmentstatus")
+
+Table(
+    "institutions", metadata,
+    Column("institution_id", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("code", String(10), nullable=False, unique=True),
+    Column("type", INSTITUTION_TYPE, nullable=False),
+    Column("country", String(100), nullable=False),
+    Column("city", String(100)),
+    Column("website", String(200)),
+    Column("contact_email", String(255)),
+    Column("phone", String(20)),
+    Column("address", Text),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "departments", metadata,
+    Column("department_id", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("code", String(10), nullable=False),
+    Column("description", Text),
+    Column("institution_id", Integer, ForeignKey("institutions.institution_id"), nullable=False),
+    Column("head_teacher_id", Integer, ForeignKey("teachers.teacher_id")),
+    Column("contact_email", String(255)),
+    Column("phone", String(20)),
+    Column("office_location", String(100)),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "subjects", metadata,
+    Column("subject_id", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("code", String(20), nullable=False),
+    Column("description", Text),
+    Column("type", SUBJECT_TYPE, nullable=False),
+    Column("department_id", Integer, ForeignKey("departments.department_id"), nullable=False),
+    Column("has_automated_marking", Boolean),
+    Column("credit_hours", Integer),
+    Column("prerequisite_subjects", Text),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "teachers", metadata,
+    Column("teacher_id", Integer, primary_key=True),
+    Column("first_name", String(100), nullable=False),
+    Column("surname", String(100), nullable=False),
+    Column("email", String(255), nullable=False, unique=True),
+    Column("password_hash", String(255)),
+    Column("employee_id", String(50), unique=True),
+    Column("institution_id", Integer, ForeignKey("institutions.institution_id"), nullable=False),
+    Column("department_id", Integer, ForeignKey("departments.department_id")),
+    Column("phone", String(20)),
+    Column("office_location", String(100)),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "students", metadata,
+    Column("student_id", Integer, primary_key=True),
+    Column("first_name", String(100), nullable=False),
+    Column("surname", String(100), nullable=False),
+    Column("email", String(255), nullable=False, unique=True),
+    Column("password_hash", String(255)),
+    Column("student_number", String(50), nullable=False, unique=True),
+    Column("institution_id", Integer, ForeignKey("institutions.institution_id"), nullable=False),
+    Column("phone", String(20)),
+    Column("enrollment_year", Integer),
+    Column("current_academic_year", ACADEMIC_YEAR),
+    Column("foundation_average", Float),
+    Column("year_1_average", Float),
+    Column("year_2_average", Float),
+    Column("year_3_average", Float),
+    Column("masters_average", Float),
+    Column("overall_coursework_average", Float),
+    Column("predicted_degree_class", UK_MODULE_GRADE),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "modules", metadata,
+    Column("module_id", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("code", String(20), nullable=False),
+    Column("description", Text),
+    Column("subject_id", Integer, ForeignKey("subjects.subject_id"), nullable=False),
+    Column("semester", String(20), nullable=False),
+    Column("year", Integer, nullable=False),
+    Column("start_date", DateTime, nullable=False),
+    Column("end_date", DateTime, nullable=False),
+    Column("max_students", Integer),
+    Column("credits", Integer),
+    Column("location", String(100)),
+    Column("schedule", Text),
+    Column("prerequisites", Text),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "tests", metadata,
+    Column("test_id", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("description", Text),
+    Column("test_file", LargeBinary),
+    Column("input_data", Text, nullable=False),
+    Column("expected_output", Text, nullable=False),
+    Column("timeout_seconds", Integer),
+    Column("programming_language", PROGRAMMING_LANGUAGE),
+    Column("test_type", TEST_TYPE),
+    Column("version", String(20)),
+    Column("created_by", Integer, ForeignKey("teachers.teacher_id"), nullable=False),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "assignments", metadata,
+    Column("assignment_id", Integer, primary_key=True),
+    Column("title", String(200), nullable=False),
+    Column("description", Text, nullable=False),
+    Column("instructions", Text),
+    Column("test_id", Integer, ForeignKey("tests.test_id")),
+    Column("rubric", Text, nullable=False),
+    Column("max_score", Float),
+    Column("pass_threshold", Float, nullable=False),
+    Column("due_date", DateTime, nullable=False),
+    Column("late_penalty", Float),
+    Column("max_attempts", Integer),
+    Column("weight", Float),
+    Column("type", ASSIGNMENT_TYPE, nullable=False),
+    Column("is_published", Boolean),
+    Column("is_active", Boolean),
+    Column("created_by", Integer, ForeignKey("teachers.teacher_id"), nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "results", metadata,
+    Column("result_id", Integer, primary_key=True),
+    Column("actual_output", Text, nullable=False),
+    Column("expected_output", Text, nullable=False),
+    Column("passed", Boolean, nullable=False),
+    Column("score", Float, nullable=False),
+    Column("percentage", Float, nullable=False),
+    Column("execution_time", Float),
+    Column("memory_usage", Integer),
+    Column("test_cases_passed", Integer),
+    Column("test_cases_total", Integer),
+    Column("error_message", Text),
+    Column("feedback", Text),
+    Column("feedback_summary", Text),
+    Column("grade_status", GRADE_STATUS),
+    Column("graded_at", DateTime),
+    Column("graded_by", String(50)),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "submissions", metadata,
+    Column("submission_id", Integer, primary_key=True),
+    Column("student_id", Integer, ForeignKey("students.student_id"), nullable=False),
+    Column("assignment_id", Integer, ForeignKey("assignments.assignment_id"), nullable=False),
+    Column("submission_date", DateTime, nullable=False),
+    Column("submission_file", LargeBinary),
+    Column("file_name", String(255)),
+    Column("file_type", SUBMISSION_FILE_TYPE),
+    Column("file_size", Integer),
+    Column("attempt_number", Integer),
+    Column("is_late", Boolean),
+    Column("days_late", Integer),
+    Column("ip_address", String(45)),
+    Column("user_agent", Text),
+    Column("status", SUBMISSION_STATUS),
+    Column("result_id", Integer, ForeignKey("results.result_id")),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "user_sessions", metadata,
+    Column("session_id", String(255), primary_key=True),
+    Column("user_id", Integer, nullable=False),
+    Column("user_type", USER_TYPE, nullable=False),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime, nullable=False),
+    Column("ip_address", String(45)),
+    Column("user_agent", Text),
+    Column("is_active", Boolean),
+    Column("last_activity", DateTime),
+)
+
+Table(
+    "activity_logs", metadata,
+    Column("log_id", Integer, primary_key=True),
+    Column("user_id", Integer, nullable=False),
+    Column("user_type", USER_TYPE, nullable=False),
+    Column("action", ACTIVITY_ACTION, nullable=False),
+    Column("resource_type", String(50)),
+    Column("resource_id", Integer),
+    Column("details", Text),
+    Column("ip_address", String(45)),
+    Column("user_agent", Text),
+    Column("timestamp", DateTime),
+    Column("success", Boolean),
+    Column("error_message", Text),
+)
+
+Table(
+    "teacher_modules", metadata,
+    Column("teacher_id", Integer, ForeignKey("teachers.teacher_id"), primary_key=True),
+    Column("module_id", Integer, ForeignKey("modules.module_id"), primary_key=True),
+    Column("role", TEACHER_ROLE),
+    Column("assigned_date", DateTime),
+    Column("is_active", Boolean),
+)
+
+Table(
+    "student_enrollments", metadata,
+    Column("student_id", Integer, ForeignKey("students.student_id"), primary_key=True),
+    Column("module_id", Integer, ForeignKey("modules.module_id"), primary_key=True),
+    Column("academic_year", ACADEMIC_YEAR, nullable=False),
+    Column("enrollment_date", DateTime),
+    Column("completion_date", DateTime),
+    Column("final_coursework_average", Float),
+    Column("exam_mark", Float),
+    Column("overall_grade", UK_MODULE_GRADE),
+    Column("coursework_weight", Float),
+    Column("exam_weight", Float),
+    Column("status", ENROLLMENT_STATUS),
+)
+
+Table(
+    "module_assignments", metadata,
+    Column("module_id", Integer, ForeignKey("modules.module_id"), primary_key=True),
+    Column("assignment_id", Integer, ForeignKey("assignments.assignment_id"), primary_key=True),
+    Column("weight", Float),
+    Column("visible", Boolean),
+    Column("assigned_date", DateTime),
+)
+
+
+def upgrade(ctx):
+    # Existing databases created by db.create_all are adopted as-is
+    ctx.create_tables(*metadata.tables.values())
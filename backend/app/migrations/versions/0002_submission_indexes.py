@@ -0,0 +1,7 @@
+"""Indexes for the hot submission lookups (per student/assignment, per status, by result)."""
+
+
+def upgrade(ctx):
+    ctx.create_index("ix_submissions_student_assignment", "submissions", ["student_id", "assignment_id"])
+    ctx.create_index("ix_submissions_assignment_status", "submissions", ["assignment_id", "status"])
+    ctx.create_index("ix_submissions_result_id", "submissions", ["result_id"])
@@ -0,0 +1,17 @@
+"""Per-submission grading leases so only one worker process grades a submission at a time."""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+Table(
+    "grading_leases", metadata,
+    Column("submission_id", Integer, ForeignKey("submissions.submission_id"), primary_key=True),
+    Column("owner", String(255), nullable=False),
+    Column("acquired_at", DateTime, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+)
+
+
+def upgrade(ctx):
+    ctx.create_tables(*metadata.tables.values())
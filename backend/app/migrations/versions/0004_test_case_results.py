@@ -0,0 +1,25 @@
+"""Structured per-test-case results attached to each Result."""
+
+from sqlalchemy import Column, Enum, Float, ForeignKey, Integer, MetaData, String, Table, Text
+
+metadata = MetaData()
+
+TEST_OUTCOME = Enum(
+    "PASSED", "FAILED", "ERROR", "SKIPPED", "EXPECTED_FAILURE", "UNEXPECTED_SUCCESS", name="testoutcome"
+)
+
+Table(
+    "test_case_results", metadata,
+    Column("test_case_result_id", Integer, primary_key=True),
+    Column("result_id", Integer, ForeignKey("results.result_id"), nullable=False),
+    Column("name", String(255), nullable=False),
+    Column("outcome", TEST_OUTCOME, nullable=False),
+    Column("duration", Float),
+    Column("message", Text),
+    Column("traceback", Text),
+)
+
+
+def upgrade(ctx):
+    ctx.create_tables(*metadata.tables.values())
+    ctx.create_index("ix_test_case_results_result_id", "test_case_results", ["result_id"])
@@ -0,0 +1,39 @@
+"""Precomputed per-test aggregates per assignment, backfilled from existing test case results."""
+
+from sqlalchemy import Column, Float, ForeignKey, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+Table(
+    "test_case_stats", metadata,
+    Column("assignment_id", Integer, ForeignKey("assignments.assignment_id"), primary_key=True),
+    Column("name", String(255), primary_key=True),
+    Column("runs", Integer, nullable=False),
+    Column("passed", Integer, nullable=False),
+    Column("failed", Integer, nullable=False),
+    Column("errors", Integer, nullable=False),
+    Column("total_duration", Float, nullable=False),
+    Column("max_duration", Float, nullable=False),
+)
+
+
+def upgrade(ctx):
+    ctx.create_tables(*metadata.tables.values())
+    ctx.create_index("ix_results_execution_time", "results", ["execution_time"])
+
+    # One set-based pass over existing rows; later results update the aggregates incrementally.
+    # A runner that passes the emptiness check alongside another skips the rows it already wrote.
+    if ctx.execute("SELECT COUNT(*) FROM test_case_stats").scalar() == 0:
+        ctx.execute("""
+            INSERT INTO test_case_stats
+                (assignment_id, name, runs, passed, failed, errors, total_duration, max_duration)
+            SELECT s.assignment_id, t.name, COUNT(*),
+                   SUM(CASE WHEN t.outcome = 'PASSED' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN t.outcome = 'FAILED' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN t.outcome = 'ERROR' THEN 1 ELSE 0 END),
+                   COALESCE(SUM(t.duration), 0), COALESCE(MAX(t.duration), 0)
+            FROM test_case_results t
+            JOIN submissions s ON s.result_id = t.result_id
+            GROUP BY s.assignment_id, t.name
+            ON CONFLICT DO NOTHING
+        """)
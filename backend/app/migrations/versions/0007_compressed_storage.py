@@ -0,0 +1,70 @@
+"""Compress existing submission files, test files, outputs and feedback in place."""
+
+import time
+
+from sqlalchemy import LargeBinary, String, bindparam, inspect, text
+
+from models.compression import encode, is_encoded
+
+# (table, primary key, column, is_text)
+COLUMNS = [
+    ("submissions", "submission_id", "submission_file", False),
+    ("tests", "test_id", "test_file", False),
+    ("results", "result_id", "actual_output", True),
+    ("results", "result_id", "feedback", True),
+]
+
+
+def upgrade(ctx):
+    if ctx.dialect == "postgresql":
+        # SQLite stores the bytes in the existing TEXT columns; PostgreSQL needs bytea
+        for table, _, column, is_text in COLUMNS:
+            if is_text and _is_text_column(ctx, table, column):
+                ctx.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BYTEA "
+                            f"USING convert_to({column}, 'UTF8')")
+
+    for table, primary_key, column, is_text in COLUMNS:
+        if ctx.has_table(table) and ctx.has_column(table, column):
+            _compress_column(ctx, table, primary_key, column)
+
+
+def _is_text_column(ctx, table, column):
+    """Whether the column still has its original text type (it is bytea once converted)."""
+    types = {c["name"]: c["type"] for c in inspect(ctx.engine).get_columns(table)}
+    return isinstance(types.get(column), String)
+
+
+def _compress_column(ctx, table, primary_key, column):
+    """Rewrite unmarked values batch by batch (keyset pagination, one transaction per batch)."""
+    select_sql = text(
+        f"SELECT {primary_key}, {column} FROM {table} "
+        f"WHERE {primary_key} > :last AND {column} IS NOT NULL ORDER BY {primary_key} LIMIT :limit"
+    )
+    update_sql = text(f"UPDATE {table} SET {column} = :value WHERE {primary_key} = :key").bindparams(
+        bindparam("value", type_=LargeBinary)
+    )
+
+    last, raw_total, stored_total = 0, 0, 0
+    while True:
+        with ctx.engine.begin() as connection:
+            rows = connection.execute(select_sql, {"last": last, "limit": ctx.batch_size}).all()
+            updates = []
+            for key, value in rows:
+                if is_encoded(value):
+                    continue
+                data = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+                encoded = encode(data)
+                raw_total += len(data)
+                stored_total += len(encoded)
+                updates.append({"key": key, "value": encoded})
+            if updates:
+                connection.execute(update_sql, updates)
+        if len(rows) < ctx.batch_size:
+            break
+        last = rows[-1][0]
+        if ctx.batch_pause:
+            time.sleep(ctx.batch_pause)
+
+    if raw_total:
+        ctx.log(f"  compressed {table}.{column}: {raw_total} -> {stored_total} bytes "
+                f"({raw_total / stored_total:.1f}x)")
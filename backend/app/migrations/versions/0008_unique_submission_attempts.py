@@ -0,0 +1,26 @@
+"""Unique (student, assignment, attempt_number) so concurrent submits cannot share an attempt."""
+
+
+def upgrade(ctx):
+    # Submissions tables created before attempts were tracked have nothing to constrain
+    if not ctx.has_column("submissions", "attempt_number"):
+        return
+
+    # Renumber every attempt of a student/assignment pair with colliding numbers, in submission order
+    ctx.execute("""
+        UPDATE submissions SET attempt_number = (
+            SELECT COUNT(*) FROM submissions earlier
+            WHERE earlier.student_id = submissions.student_id
+              AND earlier.assignment_id = submissions.assignment_id
+              AND earlier.submission_id <= submissions.submission_id
+        )
+        WHERE EXISTS (
+            SELECT 1 FROM submissions duplicate
+            WHERE duplicate.student_id = submissions.student_id
+              AND duplicate.assignment_id = submissions.assignment_id
+            GROUP BY duplicate.attempt_number
+            HAVING COUNT(*) > 1
+        )
+    """)
+    ctx.create_index("uq_submissions_attempt", "submissions",
+                     ["student_id", "assignment_id", "attempt_number"], unique=True)
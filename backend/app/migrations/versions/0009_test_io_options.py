@@ -0,0 +1,6 @@
+"""Per-test output comparison options for native stdin/stdout tests."""
+
+
+def upgrade(ctx):
+    if ctx.has_table("tests"):
+        ctx.add_column("tests", "io_options", "TEXT")
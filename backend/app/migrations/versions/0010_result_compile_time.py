@@ -0,0 +1,6 @@
+"""Build time of compiled-language submissions, kept apart from test run time."""
+
+
+def upgrade(ctx):
+    if ctx.has_table("results"):
+        ctx.add_column("results", "compile_time", "FLOAT")
@@ -0,0 +1,30 @@
+"""Durable grading jobs, so queued and interrupted grading survives worker restarts."""
+
+from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, Index, Integer, MetaData, String, Table, Text
+
+metadata = MetaData()
+
+GRADING_JOB_STATE = Enum("QUEUED", "RUNNING", "DONE", "FAILED", name="gradingjobstate")
+
+Table(
+    "grading_jobs", metadata,
+    Column("submission_id", Integer, ForeignKey("submissions.submission_id"), primary_key=True),
+    Column("student_id", Integer, nullable=False),
+    Column("assignment_id", Integer, nullable=False),
+    Column("priority", Integer, nullable=False),
+    Column("regrade", Boolean, nullable=False),
+    Column("state", GRADING_JOB_STATE, nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("owner", String(255)),
+    Column("enqueued_at", DateTime, nullable=False),
+    Column("started_at", DateTime),
+    Column("heartbeat_at", DateTime),
+    Column("lease_expires_at", DateTime),
+    Column("finished_at", DateTime),
+    Column("last_error", Text),
+    Index("ix_grading_jobs_state", "state", "priority", "enqueued_at"),
+)
+
+
+def upgrade(ctx):
+    ctx.create_tables(*metadata.tables.values())
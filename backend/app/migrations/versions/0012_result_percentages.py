@@ -0,0 +1,53 @@
+"""
+Repair automarked percentages that were stored as the raw score
+
+Results of assignments whose ``max_score`` is not 100 recorded the score as the
+percentage, so their score statistics are rebuilt from the corrected rows.
+"""
+
+# Assignments whose stored percentages can differ from their scores
+SCALED = "SELECT assignment_id FROM assignments WHERE max_score IS NOT NULL AND max_score NOT IN (0, 100)"
+
+
+def upgrade(ctx):
+    if not ctx.has_table("results") or not ctx.has_table("assignment_stats"):
+        return
+
+    # A corrected percentage no longer equals its (non-zero) score, so the batches terminate
+    ctx.backfill(
+        "results", "result_id",
+        "percentage = score * 100.0 / (SELECT a.max_score FROM submissions s "
+        "JOIN assignments a ON a.assignment_id = s.assignment_id WHERE s.result_id = results.result_id)",
+        f"graded_by = 'AUTOMARKER' AND score <> 0 AND percentage = score AND result_id IN ("
+        f"SELECT s.result_id FROM submissions s WHERE s.assignment_id IN ({SCALED}))"
+    )
+
+    late = "s.is_late" if ctx.has_column("submissions", "is_late") else "1 = 0"
+    with ctx.engine.begin() as connection:
+        connection.exec_driver_sql(f"DELETE FROM assignment_score_buckets WHERE assignment_id IN ({SCALED})")
+        connection.exec_driver_sql(f"DELETE FROM assignment_stats WHERE assignment_id IN ({SCALED})")
+        connection.exec_driver_sql(f"""
+            INSERT INTO assignment_stats
+                (assignment_id, graded_count, score_sum, score_sq_sum, percentage_sum, pass_count, late_count)
+            SELECT s.assignment_id, COUNT(*), SUM(r.score), SUM(r.score * r.score), SUM(r.percentage),
+                   SUM(CASE WHEN r.percentage >= a.pass_threshold THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN {late} THEN 1 ELSE 0 END)
+            FROM submissions s
+            JOIN results r ON r.result_id = s.result_id
+            JOIN assignments a ON a.assignment_id = s.assignment_id
+            WHERE r.grade_status = 'GRADED' AND s.assignment_id IN ({SCALED})
+            GROUP BY s.assignment_id
+            ON CONFLICT DO NOTHING
+        """)
+        connection.exec_driver_sql(f"""
+            INSERT INTO assignment_score_buckets (assignment_id, bucket, count)
+            SELECT s.assignment_id,
+                   CASE WHEN r.percentage >= 90 THEN 9 WHEN r.percentage < 0 THEN 0
+                        ELSE CAST(r.percentage / 10 AS INTEGER) END AS bucket,
+                   COUNT(*)
+            FROM submissions s
+            JOIN results r ON r.result_id = s.result_id
+            WHERE r.grade_status = 'GRADED' AND s.assignment_id IN ({SCALED})
+            GROUP BY s.assignment_id, bucket
+            ON CONFLICT DO NOTHING
+        """)
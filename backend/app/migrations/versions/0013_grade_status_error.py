@@ -0,0 +1,6 @@
+"""GradeStatus.ERROR for results the automarker could not produce."""
+
+
+def upgrade(ctx):
+    # SQLAlchemy names a native enum type after its class and stores member names
+    ctx.add_enum_value("gradestatus", "ERROR")
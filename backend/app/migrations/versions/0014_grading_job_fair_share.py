@@ -0,0 +1,6 @@
+"""Indexes for the last job start per assignment and per student, which fair-share claiming orders by."""
+
+
+def upgrade(ctx):
+    ctx.create_index("ix_grading_jobs_assignment_started", "grading_jobs", ["assignment_id", "started_at"])
+    ctx.create_index("ix_grading_jobs_student_started", "grading_jobs", ["assignment_id", "student_id", "started_at"])
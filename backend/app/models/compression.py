@@ -0,0 +1,106 @@
+"""
+Transparent compression for large text and binary columns
+
+Values are stored as ``MARKER | codec id | payload``. The codec byte is the
+per-row marker: rows written before compression was introduced have no marker
+and are returned unchanged, and a new codec can be added without rewriting old
+rows. ``MARKER`` starts with 0xFF, which never begins valid UTF-8 text and does
+not start any of the accepted submission file formats, so legacy values are
+never mistaken for encoded ones. Every value bound through these types is
+encoded, even one that happens to start with the marker, so it reads back as
+written.
+
+Columns using these types are declared ``deferred``, so their bytes are neither
+fetched nor decompressed until the attribute is actually read; queries that
+serialize many rows ``undefer`` the columns they return.
+"""
+
+import zlib
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+from utils.metrics import metrics
+
+MARKER = b"\xffCZ"
+CODEC_STORED = 0
+CODEC_ZLIB = 1
+
+MIN_COMPRESS_SIZE = 64  # Below this the zlib header outweighs any saving
+ZLIB_LEVEL = 6
+
+
+def is_encoded(value) -> bool:
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:3]) == MARKER
+
+
+def encode(data: bytes, metric: str = None) -> bytes:
+    """Compress ``data`` if that makes it smaller and prefix the codec marker."""
+    codec, payload = CODEC_STORED, data
+    if len(data) >= MIN_COMPRESS_SIZE:
+        compressed = zlib.compress(data, ZLIB_LEVEL)
+        if len(compressed) < len(data):
+            codec, payload = CODEC_ZLIB, compressed
+    encoded = MARKER + bytes([codec]) + payload
+    if metric:
+        metrics.increment(f"compression.{metric}.raw_bytes", len(data))
+        metrics.increment(f"compression.{metric}.stored_bytes", len(encoded))
+    return encoded
+
+
+def decode(value) -> bytes:
+    """Original bytes of a stored value; unmarked (legacy) values are returned as they are."""
+    value = bytes(value)
+    if value[:3] != MARKER:
+        return value
+    codec, payload = value[3], value[4:]
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(payload)
+    if codec == CODEC_STORED:
+        return payload
+    raise ValueError(f"Unknown compression codec {codec}")
+
+
+class CompressedBinary(TypeDecorator):
+    """``LargeBinary`` stored compressed; ``name`` labels its compression metrics."""
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, name: str = None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = name
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        return encode(bytes(value), self.name)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):  # Legacy value stored as TEXT (SQLite)
+            return value.encode("utf-8")
+        return decode(value)
+
+
+class CompressedText(CompressedBinary):
+    """``Text`` stored as compressed UTF-8 bytes; legacy text values are read as-is."""
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return decode(value).decode("utf-8")
+
+
+def compression_ratios() -> dict:
+    """Raw-to-stored size ratio per column for the values written by this process."""
+    counters = metrics.snapshot("compression.")
+    ratios = {}
+    for name, raw in counters.items():
+        if name.endswith(".raw_bytes"):
+            column = name[len("compression."):-len(".raw_bytes")]
+            stored = counters.get(f"compression.{column}.stored_bytes", 0)
+            ratios[column] = round(raw / stored, 2) if stored else None
+    return ratios
@@ -2,6 +2,8 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timezone
 from enum import Enum
 
+from .compression import CompressedBinary, CompressedText
+
 db = SQLAlchemy()
 
 # Enums for better data integrity
@@ -96,6 +98,13 @@ class GradeStatus(Enum):
     GRADED = "graded"
     NEEDS_REVIEW = "needs_review"
     MANUAL_REVIEW = "manual_review"
+    ERROR = "error"  # The automarker failed; error_message says why
+
+class GradingJobState(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
 
 class SubmissionFileType(Enum):
     PYTHON_FILE = ".py"
@@ -107,6 +116,14 @@ class SubmissionFileType(Enum):
     ZIP_FILE = ".zip"
     PDF_FILE = ".pdf"
 
+class TestOutcome(Enum):
+    PASSED = "passed"
+    FAILED = "failed"
+    ERROR = "error"
+    SKIPPED = "skipped"
+    EXPECTED_FAILURE = "expected_failure"
+    UNEXPECTED_SUCCESS = "unexpected_success"
+
 class ActivityAction(Enum):
     LOGIN = "login"
     LOGOUT = "logout"
@@ -461,9 +478,10 @@ class Test(db.Model):
     test_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    test_file = db.Column(db.LargeBinary)  # BLOB for test files
+    test_file = db.deferred(db.Column(CompressedBinary('test_file')))  # Compressed BLOB, loaded on access
     input_data = db.Column(db.Text, nullable=False)
     expected_output = db.Column(db.Text, nullable=False)
+    io_options = db.Column(db.Text)  # JSON: output comparison options; set for native I/O tests
     timeout_seconds = db.Column(db.Integer, default=5)
     programming_language = db.Column(db.Enum(ProgrammingLanguage), default=ProgrammingLanguage.PYTHON)
     test_type = db.Column(db.Enum(TestType), default=TestType.UNIT)
@@ -484,6 +502,7 @@ class Test(db.Model):
             'description': self.description,
             'input_data': self.input_data,
             'expected_output': self.expected_output,
+            'io_options': self.io_options,
             'timeout_seconds': self.timeout_seconds,
             'programming_language': self.programming_language.value,
             'test_type': self.test_type.value,
@@ -545,7 +564,7 @@ class Submission(db.Model):
     student_id = db.Column(db.Integer, db.ForeignKey('students.student_id'), nullable=False)
     assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.assignment_id'), nullable=False)
     submission_date = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
-    submission_file = db.Column(db.LargeBinary)  # BLOB for submission files
+    submission_file = db.deferred(db.Column(CompressedBinary('submission_file')))  # Compressed BLOB, loaded on access
     file_name = db.Column(db.String(255))
     file_type = db.Column(db.Enum(SubmissionFileType), default=SubmissionFileType.PYTHON_FILE)
     file_size = db.Column(db.Integer)
@@ -559,6 +578,14 @@ class Submission(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
+    __table_args__ = (
+        db.Index('ix_submissions_student_assignment', 'student_id', 'assignment_id'),
+        db.Index('ix_submissions_assignment_status', 'assignment_id', 'status'),
+        db.Index('ix_submissions_result_id', 'result_id'),
+        # One row per attempt: concurrent submits cannot both take the same attempt number
+        db.Index('uq_submissions_attempt', 'student_id', 'assignment_id', 'attempt_number', unique=True),
+    )
+    
     # Relationships
     student = db.relationship('Student', back_populates='submissions')
     assignment = db.relationship('Assignment', back_populates='submissions')
@@ -584,17 +611,18 @@ class Result(db.Model):
     __tablename__ = 'results'
     
     result_id = db.Column(db.Integer, primary_key=True)
-    actual_output = db.Column(db.Text, nullable=False)
+    actual_output = db.deferred(db.Column(CompressedText('actual_output'), nullable=False))  # Loaded on access
     expected_output = db.Column(db.Text, nullable=False)
     passed = db.Column(db.Boolean, nullable=False)
     score = db.Column(db.Float, nullable=False)
     percentage = db.Column(db.Float, nullable=False)
     execution_time = db.Column(db.Float)
+    compile_time = db.Column(db.Float)  # Seconds spent building the submission; None if nothing was compiled
     memory_usage = db.Column(db.Integer)
     test_cases_passed = db.Column(db.Integer, default=0)
     test_cases_total = db.Column(db.Integer, default=0)
     error_message = db.Column(db.Text)
-    feedback = db.Column(db.Text)
+    feedback = db.deferred(db.Column(CompressedText('feedback')))  # Loaded on access
     feedback_summary = db.Column(db.Text)
     grade_status = db.Column(db.Enum(GradeStatus), default=GradeStatus.NOT_GRADED)
     graded_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
@@ -602,8 +630,14 @@ class Result(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
+    __table_args__ = (
+        db.Index('ix_results_execution_time', 'execution_time'),
+    )
+    
     # Relationships
     submission = db.relationship('Submission', back_populates='result')
+    test_cases = db.relationship('TestCaseResult', back_populates='result', cascade='all, delete-orphan',
+                                 order_by='TestCaseResult.test_case_result_id')
     
     def to_dict(self):
         return {
@@ -614,6 +648,7 @@ class Result(db.Model):
             'score': self.score,
             'percentage': self.percentage,
             'execution_time': self.execution_time,
+            'compile_time': self.compile_time,
             'memory_usage': self.memory_usage,
             'test_cases_passed': self.test_cases_passed,
             'test_cases_total': self.test_cases_total,
@@ -624,6 +659,171 @@ class Result(db.Model):
             'graded_by': self.graded_by
         }
 
+class TestCaseResult(db.Model):
+    """Outcome of a single test case within a graded Result."""
+    __tablename__ = 'test_case_results'
+    
+    test_case_result_id = db.Column(db.Integer, primary_key=True)
+    result_id = db.Column(db.Integer, db.ForeignKey('results.result_id'), nullable=False)
+    name = db.Column(db.String(255), nullable=False)  # TestClass.test_method
+    outcome = db.Column(db.Enum(TestOutcome), nullable=False)
+    duration = db.Column(db.Float)  # Seconds
+    message = db.Column(db.Text)  # Assertion/exception message
+    traceback = db.Column(db.Text)  # Truncated to the last ~2000 characters
+    
+    __table_args__ = (
+        db.Index('ix_test_case_results_result_id', 'result_id'),
+    )
+    
+    # Relationships
+    result = db.relationship('Result', back_populates='test_cases')
+    
+    def to_dict(self):
+        return {
+            'test_case_result_id': self.test_case_result_id,
+            'name': self.name,
+            'outcome': self.outcome.value,
+            'duration': self.duration,
+            'message': self.message,
+            'traceback': self.traceback
+        }
+
+class TestCaseStats(db.Model):
+    """Running per-test aggregates for an assignment, updated incrementally as results arrive."""
+    __tablename__ = 'test_case_stats'
+    
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.assignment_id'), primary_key=True)
+    name = db.Column(db.String(255), primary_key=True)  # TestClass.test_method
+    runs = db.Column(db.Integer, nullable=False, default=0)
+    passed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Integer, nullable=False, default=0)
+    total_duration = db.Column(db.Float, nullable=False, default=0.0)
+    max_duration = db.Column(db.Float, nullable=False, default=0.0)  # Highest ever observed
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'runs': self.runs,
+            'passed': self.passed,
+            'failed': self.failed,
+            'errors': self.errors,
+            'failure_rate': (self.failed + self.errors) / self.runs if self.runs else 0.0,
+            'avg_duration': self.total_duration / self.runs if self.runs else 0.0,
+            'max_duration': self.max_duration
+        }
+
+class AssignmentStats(db.Model):
+    """Running score aggregates for an assignment, updated incrementally as results arrive."""
+    __tablename__ = 'assignment_stats'
+    
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.assignment_id'), primary_key=True)
+    graded_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    score_sq_sum = db.Column(db.Float, nullable=False, default=0.0)  # For the standard deviation
+    percentage_sum = db.Column(db.Float, nullable=False, default=0.0)
+    pass_count = db.Column(db.Integer, nullable=False, default=0)  # percentage >= pass_threshold
+    late_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Relationships
+    buckets = db.relationship('AssignmentScoreBucket', order_by='AssignmentScoreBucket.bucket',
+                              primaryjoin='AssignmentStats.assignment_id == foreign(AssignmentScoreBucket.assignment_id)',
+                              viewonly=True)
+    
+    def to_dict(self):
+        n = self.graded_count
+        mean = self.score_sum / n if n else 0.0
+        variance = max(self.score_sq_sum / n - mean * mean, 0.0) if n else 0.0
+        counts = {b.bucket: b.count for b in self.buckets}
+        return {
+            'assignment_id': self.assignment_id,
+            'graded_count': n,
+            'mean_score': mean,
+            'stddev_score': variance ** 0.5,
+            'mean_percentage': self.percentage_sum / n if n else 0.0,
+            'pass_count': self.pass_count,
+            'pass_rate': self.pass_count / n if n else 0.0,
+            'late_count': self.late_count,
+            'histogram': [
+                {'range': f"{b * 10}-{b * 10 + 10}", 'count': counts.get(b, 0)}
+                for b in range(10)
+            ]
+        }
+
+class AssignmentScoreBucket(db.Model):
+    """Number of graded results per 10-percentage-point band of an assignment."""
+    __tablename__ = 'assignment_score_buckets'
+    
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.assignment_id'), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)  # 0 = [0, 10), ..., 9 = [90, 100]
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class GradingLease(db.Model):
+    """Exclusive right of one worker process to grade a submission, held until expires_at."""
+    __tablename__ = 'grading_leases'
+    
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.submission_id'), primary_key=True)
+    owner = db.Column(db.String(255), nullable=False)  # host:pid:token of the holding process
+    acquired_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'submission_id': self.submission_id,
+            'owner': self.owner,
+            'acquired_at': self.acquired_at.isoformat() if self.acquired_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+class GradingJob(db.Model):
+    """
+    Durable record of a submission's grading job, one row per submission.
+
+    A RUNNING job belongs to ``owner`` until ``lease_expires_at``; the owner's
+    heartbeat keeps pushing that forward, so a job whose lease has expired was
+    abandoned by a worker that died and can be queued again.
+    """
+    __tablename__ = 'grading_jobs'
+    
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.submission_id'), primary_key=True)
+    student_id = db.Column(db.Integer, nullable=False)
+    assignment_id = db.Column(db.Integer, nullable=False)
+    priority = db.Column(db.Integer, nullable=False, default=0)  # grading.JobPriority
+    regrade = db.Column(db.Boolean, nullable=False, default=False)
+    state = db.Column(db.Enum(GradingJobState), nullable=False, default=GradingJobState.QUEUED)
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # Times a worker has started it
+    owner = db.Column(db.String(255))  # host:pid:token of the worker running it
+    enqueued_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    lease_expires_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    
+    __table_args__ = (
+        db.Index('ix_grading_jobs_state', 'state', 'priority', 'enqueued_at'),
+        # Last start per assignment and per student, for fair-share claiming
+        db.Index('ix_grading_jobs_assignment_started', 'assignment_id', 'started_at'),
+        db.Index('ix_grading_jobs_student_started', 'assignment_id', 'student_id', 'started_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'submission_id': self.submission_id,
+            'student_id': self.student_id,
+            'assignment_id': self.assignment_id,
+            'priority': self.priority,
+            'regrade': self.regrade,
+            'state': self.state.value,
+            'attempts': self.attempts,
+            'owner': self.owner,
+            'enqueued_at': self.enqueued_at.isoformat() if self.enqueued_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'last_error': self.last_error
+        }
+
 # Activity Logging and Session Management
 class UserSession(db.Model):
     __tablename__ = 'user_sessions'
@@ -7,10 +7,13 @@ the main application logic across different modules.
 
 from .validators import validate_file_extension, validate_enum_value
 from .helpers import format_datetime, calculate_late_penalty
+from .metrics import MetricsRegistry, metrics
 
 __all__ = [
     'validate_file_extension',
     'validate_enum_value', 
     'format_datetime',
-    'calculate_late_penalty'
+    'calculate_late_penalty',
+    'MetricsRegistry',
+    'metrics'
 ]
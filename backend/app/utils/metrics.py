@@ -0,0 +1,38 @@
+"""
+In-process metrics registry for the CSRS Automated Assessment System
+
+Counters are cheap, thread-safe and per process; ``GET /api/metrics`` exposes a
+snapshot for dashboards and load tests.
+"""
+
+import threading
+from typing import Dict
+
+
+class MetricsRegistry:
+    """Named monotonically increasing counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self, prefix: str = "") -> Dict[str, float]:
+        """Copy of all counters whose name starts with ``prefix``."""
+        with self._lock:
+            return {name: value for name, value in self._counters.items() if name.startswith(prefix)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
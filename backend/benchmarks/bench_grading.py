@@ -0,0 +1,129 @@
+"""
+Grading benchmark: automarker runs against one assignment's test file.
+
+Grades the same submission repeatedly with the inline executor, first with the
+compiled test cache dropped before every run (each run parses and compiles the
+test file, as it did when tests were written to a temp file and imported) and
+then with a warm cache (the code object for the test revision is reused).
+Finally the same runs go through a grading executor process, which adds the
+IPC round trip but keeps test code out of the web process. The test file
+imports the student's module in-process, so the timings are dominated by the
+automarker rather than by interpreter start-up.
+
+Usage (from backend/):
+    python benchmarks/bench_grading.py [--runs 20] [--cases 40]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from app import create_app
+from automarker import AutoMarker
+from cli import init_database
+from grading.compiled import compiled_tests
+from grading.executor import GradingExecutor, InlineExecutor, set_executor
+from models.models import db, Assignment, Student, Submission, Test
+
+STUDENT_CODE = b"""
+def add(a, b):
+    return a + b
+"""
+
+TEST_HEADER = """import importlib.util
+import unittest
+
+
+class TestSubmission(unittest.TestCase):
+
+    def setUp(self):
+        self.student_file = None
+        spec = importlib.util.spec_from_file_location("student", self.student_file)
+        self.student = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.student)
+"""
+
+TEST_CASE = """
+    def test_add_{n}(self):
+        \"\"\"add() handles case {n}.\"\"\"
+        self.assertEqual(self.student.add({n}, {n}), {double})
+        self.assertEqual(self.student.add(-{n}, {n}), 0)
+"""
+
+
+def test_source(cases):
+    return TEST_HEADER + "".join(TEST_CASE.format(n=n, double=2 * n) for n in range(cases))
+
+
+def report(label, samples):
+    print(f"{label:<28} median {statistics.median(samples) * 1000:8.1f} ms   "
+          f"min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms")
+
+
+def time_grading(marker, submission_id, runs, cold):
+    samples = []
+    for _ in range(runs):
+        if cold:
+            compiled_tests.invalidate()
+        start = time.perf_counter()
+        outcome = marker.mark_submission(submission_id)
+        samples.append(time.perf_counter() - start)
+        if not outcome["success"]:
+            raise RuntimeError(outcome["error"])
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--cases", type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+        with app.app_context():
+            init_database()
+            test = Test(name="Bench", test_file=test_source(args.cases).encode(), input_data="",
+                        expected_output="", created_by=1)
+            db.session.add(test)
+            db.session.flush()
+            assignment = Assignment(title="Bench", description="", rubric="", pass_threshold=40,
+                                    due_date=datetime(2030, 1, 1), created_by=1, test_id=test.test_id)
+            student = Student(first_name="Bench", surname="Student", email="bench@example.com",
+                              student_number="B001", institution_id=1)
+            db.session.add_all([assignment, student])
+            db.session.flush()
+            submission = Submission(student_id=student.student_id, assignment_id=assignment.assignment_id,
+                                    submission_file=STUDENT_CODE)
+            db.session.add(submission)
+            db.session.commit()
+
+            marker = AutoMarker()
+            set_executor(InlineExecutor())
+            marker.mark_submission(submission.submission_id)  # Warm imports and the metadata caches
+            cold = time_grading(marker, submission.submission_id, args.runs, cold=True)
+            compiled_tests.invalidate()
+            warm = time_grading(marker, submission.submission_id, args.runs, cold=False)
+            stats = compiled_tests.stats()
+
+            executor = GradingExecutor(processes=1)
+            set_executor(executor)
+            marker.mark_submission(submission.submission_id)  # Start the executor process
+            pooled = time_grading(marker, submission.submission_id, args.runs, cold=False)
+            executor.shutdown()
+
+    report(f"grade, cold compile ({args.cases})", cold)
+    report(f"grade, cached code ({args.cases})", warm)
+    report(f"grade, executor process ({args.cases})", pooled)
+    print(f"compiled test cache: {stats['hits']} hits, {stats['misses']} misses, hit rate {stats['hit_rate']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Sandbox overhead benchmark: the cost of isolating one student program run.
+
+Runs the same small student program (read two numbers, print their sum)
+through the subprocess orchestrator under every sandbox backend available on
+this host, sequentially (latency per run) and as a batch of concurrent runs
+(throughput). Each backend is measured with a pooled sandbox, as the automarker
+uses it, and the namespace backend also without a pool (a working directory
+and command prefix created and removed around every run) to show what the
+pool saves.
+
+Usage (from backend/):
+    python benchmarks/bench_sandbox.py [--runs 50] [--batch 64]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from grading.orchestrator import ProgramRun, SubprocessOrchestrator, python_command
+from grading.sandbox import BACKENDS, Sandbox, SandboxPool, create_backend
+
+STUDENT_CODE = "a, b = map(int, input().split())\nprint(a + b)\n"
+
+
+def write_program(sandbox):
+    path = os.path.join(sandbox.workdir, "main.py")
+    with open(path, "w") as f:
+        f.write(STUDENT_CODE)
+    return path
+
+
+def run_once(orchestrator, sandbox):
+    result = orchestrator.run(python_command(write_program(sandbox)), input="2 3\n", sandbox=sandbox)
+    if result.stdout.strip() != "5":
+        raise RuntimeError(f"{sandbox.backend.name}: unexpected result {result}")
+
+
+def pooled(orchestrator, pool, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        with pool.acquire() as sandbox:
+            run_once(orchestrator, sandbox)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def unpooled(orchestrator, backend, root, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        workdir = tempfile.mkdtemp(dir=root)
+        run_once(orchestrator, Sandbox(backend, workdir))
+        shutil.rmtree(workdir)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def batch(orchestrator, pool, size):
+    """Seconds for ``size`` concurrent runs, each in its own pooled sandbox."""
+    sandboxes = [pool.checkout() for _ in range(size)]
+    try:
+        runs = [ProgramRun(python_command(write_program(s)), input="2 3\n", sandbox=s) for s in sandboxes]
+        start = time.perf_counter()
+        results = orchestrator.run_many(runs)
+        elapsed = time.perf_counter() - start
+    finally:
+        for sandbox in sandboxes:
+            pool.release(sandbox)
+    if any(r.stdout.strip() != "5" for r in results):
+        raise RuntimeError(f"{pool.backend.name}: a concurrent run failed")
+    return elapsed
+
+
+def report(label, samples, baseline=None):
+    median = statistics.median(samples)
+    overhead = f"   +{(median - baseline) * 1000:6.1f} ms" if baseline is not None else ""
+    print(f"{label:<32} median {median * 1000:8.1f} ms   p90 {sorted(samples)[int(len(samples) * 0.9)] * 1000:8.1f} ms"
+          f"{overhead}")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=64)
+    args = parser.parse_args()
+
+    orchestrator = SubprocessOrchestrator()
+    root = tempfile.mkdtemp(prefix="bench-sandboxes-")
+    baseline = None
+    try:
+        for name, backend_class in BACKENDS.items():
+            if not backend_class.available():
+                print(f"{name:<32} unavailable (needs {', '.join(backend_class.requires)})")
+                continue
+            backend = create_backend(name, hidden_paths=[root])
+            pool = SandboxPool(backend, size=args.batch, root=os.path.join(root, name))
+            try:
+                pooled(orchestrator, pool, 3)  # Warm up
+                median = report(f"{name} (pooled)", pooled(orchestrator, pool, args.runs), baseline)
+                if name == "namespace":
+                    report(f"{name} (new sandbox per run)", unpooled(orchestrator, backend, root, args.runs), baseline)
+                elapsed = batch(orchestrator, pool, args.batch)
+                print(f"{'':<32} {args.batch} concurrent runs in {elapsed:.2f} s ({args.batch / elapsed:.0f} runs/s)")
+            except RuntimeError as e:
+                print(f"{name:<32} failed: {e}")
+                continue
+            finally:
+                pool.close()
+            baseline = median if baseline is None else baseline
+    finally:
+        orchestrator.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
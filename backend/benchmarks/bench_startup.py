@@ -0,0 +1,77 @@
+"""
+Cold-start benchmark for the Flask application.
+
+Each sample runs in a fresh interpreter so module imports are not cached,
+which is what every gunicorn worker (and every test process) pays.
+
+Usage (from backend/):
+    python benchmarks/bench_startup.py [--runs 10]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+# Time `import app` (which builds the module-level app instance)
+IMPORT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {app_dir!r})
+start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+"""
+
+# Time explicit schema creation + seeding, the work that used to run on import
+INIT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {app_dir!r})
+import app as app_module
+from cli import init_database
+from seed import seed_sample_data
+start = time.perf_counter()
+with app_module.app.app_context():
+    init_database()
+    seed_sample_data()
+print(time.perf_counter() - start)
+"""
+
+
+def sample(snippet, env):
+    """Run a snippet in a fresh interpreter and return the seconds it reported."""
+    output = subprocess.run(
+        [sys.executable, "-c", snippet.format(app_dir=str(APP_DIR))],
+        capture_output=True, text=True, check=True, env=env
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def report(label, samples):
+    print(f"{label:<28} median {statistics.median(samples) * 1000:8.1f} ms   "
+          f"min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+
+        import_samples = [sample(IMPORT_SNIPPET, env) for _ in range(args.runs)]
+        # First init run creates and seeds the database; later runs find it populated
+        init_samples = [sample(INIT_SNIPPET, env) for _ in range(args.runs)]
+
+    report("import app (cold worker)", import_samples)
+    report("init-db + seed-db (first)", init_samples[:1])
+    report("init-db + seed-db (again)", init_samples[1:] or init_samples)
+
+
+if __name__ == "__main__":
+    main()
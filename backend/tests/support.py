@@ -0,0 +1,45 @@
+"""Shared fixtures for the backend tests."""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from app import create_app
+from cli import init_database
+from models.models import db
+
+
+class AppTestCase(unittest.TestCase):
+    """
+    Each test gets an app on its own SQLite database in a temporary directory,
+    migrated to the latest schema, with an app context pushed.
+
+    Subclasses add settings with ``config``, and seed data in ``setUp`` after
+    calling ``super().setUp()``.
+    """
+
+    config = {}
+    database_file = "test.db"
+    migrate = True  # False leaves the database file uncreated
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, self.database_file)
+        self.database_uri = f"sqlite:///{self.db_path}"
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": self.database_uri, **self.config})
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        if self.migrate:
+            init_database()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.ctx.pop()
+        self.tmp.cleanup()
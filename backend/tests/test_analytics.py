@@ -0,0 +1,149 @@
+import unittest
+from datetime import datetime
+
+from sqlalchemy import text
+
+from support import AppTestCase
+from automarker import AutoMarker
+from grading import reset_for_regrade
+from migrations import upgrade
+from models.models import db, Assignment, Result, Submission, TestOutcome as Outcome
+
+
+def unit_results(*outcomes, duration=0.1):
+    records = [
+        {"name": f"Tests.test_{i}", "outcome": outcome, "duration": duration, "message": None, "traceback": None}
+        for i, outcome in enumerate(outcomes)
+    ]
+    passed = sum(1 for outcome in outcomes if outcome == Outcome.PASSED)
+    return {
+        "total": len(outcomes), "passed": passed, "failures": len(outcomes) - passed, "errors": 0,
+        "results": "", "failure_details": [], "error_details": [], "test_cases": records
+    }
+
+
+class TestTestCaseAnalytics(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        assignment = Assignment(title="A1", description="", rubric="", pass_threshold=50,
+                                due_date=datetime(2030, 1, 1), created_by=1)
+        db.session.add(assignment)
+        db.session.commit()
+        self.assignment_id = assignment.assignment_id
+
+    def grade(self, submission, test_results, score=0):
+        AutoMarker().create_or_update_result(submission, test_results, score, "")
+        db.session.commit()
+
+    def new_submission(self, student_id):
+        submission = Submission(student_id=student_id, assignment_id=self.assignment_id)
+        db.session.add(submission)
+        db.session.commit()
+        return submission
+
+    def stats(self):
+        response = self.client.get(f"/api/assignments/{self.assignment_id}/tests/stats")
+        return {t["name"]: t for t in response.json["data"]["tests"]}
+
+    def test_aggregates_follow_results(self):
+        self.grade(self.new_submission(1), unit_results(Outcome.PASSED, Outcome.FAILED))
+        self.grade(self.new_submission(2), unit_results(Outcome.FAILED, Outcome.FAILED, duration=0.5))
+
+        stats = self.stats()
+        self.assertEqual(stats["Tests.test_0"]["runs"], 2)
+        self.assertEqual(stats["Tests.test_0"]["failure_rate"], 0.5)
+        self.assertEqual(stats["Tests.test_1"]["failure_rate"], 1.0)
+        self.assertAlmostEqual(stats["Tests.test_1"]["avg_duration"], 0.3)
+        self.assertEqual(stats["Tests.test_1"]["max_duration"], 0.5)
+        # Most failing test first
+        self.assertEqual(list(stats)[0], "Tests.test_1")
+
+    def test_updating_a_result_replaces_its_contribution(self):
+        submission = self.new_submission(1)
+        self.grade(submission, unit_results(Outcome.FAILED))
+        self.grade(submission, unit_results(Outcome.PASSED))
+
+        stats = self.stats()
+        self.assertEqual(stats["Tests.test_0"]["runs"], 1)
+        self.assertEqual(stats["Tests.test_0"]["failure_rate"], 0.0)
+
+    def test_regrade_reset_retracts_result(self):
+        submission = self.new_submission(1)
+        self.grade(submission, unit_results(Outcome.FAILED))
+        reset_for_regrade(submission)
+
+        self.assertEqual(self.stats(), {})
+
+    def test_slowest_submissions(self):
+        self.grade(self.new_submission(1), unit_results(Outcome.PASSED, duration=0.1))
+        slow = self.new_submission(2)
+        self.grade(slow, unit_results(Outcome.PASSED, duration=2.0))
+
+        response = self.client.get(f"/api/assignments/{self.assignment_id}/slowest-submissions?limit=1")
+        rows = response.json["data"]["submissions"]
+        self.assertEqual([r["submission_id"] for r in rows], [slow.submission_id])
+
+    def assignment_stats(self):
+        return self.client.get(f"/api/assignments/{self.assignment_id}/stats").json["data"]
+
+    def test_assignment_stats_follow_results(self):
+        self.grade(self.new_submission(1), unit_results(Outcome.PASSED), score=40)
+        resubmitted = self.new_submission(2)
+        self.grade(resubmitted, unit_results(Outcome.PASSED), score=20)
+        self.grade(resubmitted, unit_results(Outcome.PASSED), score=100)
+
+        stats = self.assignment_stats()
+        self.assertEqual(stats["graded_count"], 2)
+        self.assertAlmostEqual(stats["mean_score"], 70)
+        self.assertAlmostEqual(stats["stddev_score"], 30)
+        self.assertEqual(stats["pass_rate"], 0.5)
+        counts = [band["count"] for band in stats["histogram"]]
+        self.assertEqual(counts, [0, 0, 0, 0, 1, 0, 0, 0, 0, 1])
+
+        reset_for_regrade(resubmitted)
+        stats = self.assignment_stats()
+        self.assertEqual(stats["graded_count"], 1)
+        self.assertEqual(sum(band["count"] for band in stats["histogram"]), 1)
+
+    def test_percentages_are_relative_to_max_score(self):
+        Assignment.query.filter_by(assignment_id=self.assignment_id).update({"max_score": 20})
+        db.session.commit()
+        self.grade(self.new_submission(1), unit_results(Outcome.PASSED, Outcome.FAILED), score=15)
+
+        stats = self.assignment_stats()
+        self.assertEqual(Result.query.one().percentage, 75)
+        self.assertEqual((stats["mean_score"], stats["mean_percentage"], stats["pass_count"]), (15, 75, 1))
+        self.assertEqual(stats["histogram"][7]["count"], 1)
+
+    def test_migration_repairs_percentages_stored_as_scores(self):
+        Assignment.query.filter_by(assignment_id=self.assignment_id).update({"max_score": 20})
+        db.session.commit()
+        self.grade(self.new_submission(1), unit_results(Outcome.PASSED, Outcome.FAILED), score=15)
+        # As recorded before percentages were scaled by max_score
+        db.session.execute(text("UPDATE results SET percentage = score"))
+        db.session.execute(text("UPDATE assignment_stats SET percentage_sum = 15, pass_count = 0"))
+        db.session.execute(text("UPDATE assignment_score_buckets SET bucket = 1"))
+        db.session.execute(text("DELETE FROM schema_migrations WHERE version = 12"))
+        db.session.commit()
+        db.session.remove()
+
+        upgrade(db.engine, batch_size=1)
+
+        stats = self.assignment_stats()
+        self.assertEqual(Result.query.one().percentage, 75)
+        self.assertEqual((stats["graded_count"], stats["mean_percentage"], stats["pass_count"]), (1, 75, 1))
+        self.assertEqual([band["count"] for band in stats["histogram"]], [0] * 7 + [1, 0, 0])
+
+    def test_assignment_stats_empty(self):
+        stats = self.assignment_stats()
+        self.assertEqual(stats["graded_count"], 0)
+        self.assertEqual(stats["mean_score"], 0.0)
+
+    def test_unknown_assignment(self):
+        self.assertEqual(self.client.get("/api/assignments/999/tests/stats").status_code, 404)
+        self.assertEqual(self.client.get("/api/assignments/999/stats").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
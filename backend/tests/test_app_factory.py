@@ -0,0 +1,37 @@
+import os
+import unittest
+
+from sqlalchemy import inspect
+
+from support import AppTestCase
+from models.models import db, Institution
+
+
+class TestAppFactory(AppTestCase):
+    database_file = os.path.join("db", "automarker.db")
+    migrate = False
+
+    def test_create_app_does_no_database_work(self):
+        """Building the app must not create the database file or tables."""
+        self.assertFalse(os.path.exists(self.db_path))
+
+    def test_init_db_command_creates_tables(self):
+        result = self.app.test_cli_runner().invoke(args=["init-db"])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+        tables = inspect(db.engine).get_table_names()
+        self.assertIn("submissions", tables)
+        self.assertIn("results", tables)
+
+    def test_seed_db_command_is_idempotent(self):
+        runner = self.app.test_cli_runner()
+        self.assertEqual(runner.invoke(args=["seed-db"]).exit_code, 0)
+        second = runner.invoke(args=["seed-db"])
+        self.assertEqual(second.exit_code, 0)
+        self.assertIn("skipping", second.output)
+
+        self.assertEqual(Institution.query.count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import stat
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from grading.build_cache import BuildCache
+from grading.scratch import ScratchDirectoryError
+
+KEY = BuildCache.key("c", ["gcc", "-O2", "-o", "main", "{source}"], "gcc 12.2.0", b"int main(void) {}\n")
+
+
+def store(root, workdir, barrier):
+    barrier.wait()
+    BuildCache(root).put(KEY, workdir, ["main"])
+
+
+class TestBuildCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "cache")
+        self.cache = BuildCache(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def workdir(self, name="work", files=None):
+        workdir = os.path.join(self.tmp.name, name)
+        os.makedirs(workdir, exist_ok=True)
+        for file_name, data in (files or {"main": b"\x7fELF binary"}).items():
+            path = os.path.join(workdir, file_name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+            os.chmod(path, 0o755)
+        return workdir
+
+    def test_stored_outputs_are_copied_into_a_fresh_workdir(self):
+        self.cache.put(KEY, self.workdir(files={"main": b"binary", "pkg/Util.class": b"class"}), ["main", "pkg/Util.class"])
+
+        target = os.path.join(self.tmp.name, "fresh")
+        os.makedirs(target)
+        self.assertTrue(BuildCache(self.root).get(KEY, target))
+        with open(os.path.join(target, "pkg", "Util.class"), "rb") as f:
+            self.assertEqual(f.read(), b"class")
+        self.assertEqual(os.stat(os.path.join(target, "main")).st_mode & 0o777, 0o755)
+
+        # A program rewriting its binary does not change the cached copy
+        with open(os.path.join(target, "main"), "wb") as f:
+            f.write(b"tampered")
+        again = os.path.join(self.tmp.name, "again")
+        os.makedirs(again)
+        self.cache.get(KEY, again)
+        with open(os.path.join(again, "main"), "rb") as f:
+            self.assertEqual(f.read(), b"binary")
+
+    def test_key_covers_source_flags_and_toolchain(self):
+        base = ("c", ["gcc", "-O2"], "gcc 12.2.0", b"source")
+        keys = {BuildCache.key(*base), BuildCache.key("c", ["gcc", "-O0"], "gcc 12.2.0", b"source"),
+                BuildCache.key("c", ["gcc", "-O2"], "gcc 13.1.0", b"source"),
+                BuildCache.key("c", ["gcc", "-O2"], "gcc 12.2.0", b"source2")}
+        self.assertEqual(len(keys), 4)
+
+    def test_misses_and_incomplete_entries(self):
+        target = self.workdir("target", {})
+        self.assertFalse(self.cache.get(KEY, target))
+
+        # An entry without a manifest (never renamed into place whole) is not served
+        os.makedirs(os.path.join(self.root, KEY[:2], KEY, "files"))
+        self.assertFalse(self.cache.get(KEY, target))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+    def test_least_recently_used_entries_are_evicted_over_the_size_bound(self):
+        cache = BuildCache(self.root, max_bytes=250)
+        keys = [BuildCache.key("c", ["gcc"], "gcc", bytes([n])) for n in range(3)]
+        workdir = self.workdir(files={"main": b"x" * 100})
+        now = time.time()
+        for age, key in zip((30, 20), keys):
+            cache.put(key, workdir, ["main"])
+            os.utime(os.path.join(self.root, key[:2], key), (now - age, now - age))
+        cache.get(keys[0], self.workdir("target", {}))  # Now the most recently used
+
+        cache.put(keys[2], workdir, ["main"])
+
+        self.assertEqual([cache.get(key, self.workdir("target", {})) for key in keys], [True, False, True])
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["bytes"], stats["evictions"]), (2, 200, 1))
+
+    def test_concurrent_stores_of_the_same_build_leave_one_complete_entry(self):
+        workdir = self.workdir(files={"main": b"y" * 1024 * 1024})
+        barrier = multiprocessing.Barrier(4)
+        writers = [multiprocessing.Process(target=store, args=(self.root, workdir, barrier)) for _ in range(4)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join(30)
+        self.assertTrue(all(writer.exitcode == 0 for writer in writers))
+
+        self.assertEqual(self.cache.stats()["entries"], 1)
+        self.assertEqual(os.listdir(os.path.join(self.root, "tmp")), [])
+        target = self.workdir("target", {})
+        self.assertTrue(self.cache.get(KEY, target))
+        self.assertEqual(os.path.getsize(os.path.join(target, "main")), 1024 * 1024)
+
+    def test_root_is_private_to_this_user(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.root).st_mode), 0o700)
+
+        shared = os.path.join(self.tmp.name, "shared")
+        os.mkdir(shared)
+        os.chmod(shared, 0o777)
+        with self.assertRaises(ScratchDirectoryError):
+            BuildCache(shared)
+
+    @unittest.skipUnless(os.getuid() == 0, "only root can create a directory owned by another user")
+    def test_root_created_by_another_user_is_refused(self):
+        planted = os.path.join(self.tmp.name, "planted")
+        os.mkdir(planted, 0o700)
+        os.chown(planted, 65534, 65534)
+        with self.assertRaises(ScratchDirectoryError):
+            BuildCache(planted)
+
+
+if __name__ == "__main__":
+    unittest.main()
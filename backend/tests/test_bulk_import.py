@@ -0,0 +1,113 @@
+import io
+import unittest
+import zipfile
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+
+from support import AppTestCase
+from bulk_import import import_submissions
+from models.models import db, Assignment, Student, Submission, SubmissionFileType, SubmissionStatus
+
+
+def make_archive(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in entries.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+class TestBulkImport(AppTestCase):
+    config = {"GRADING_WORKERS": 0}
+
+    def setUp(self):
+        super().setUp()
+
+        assignment = Assignment(title="Lab", description="", rubric="", pass_threshold=40, max_attempts=2,
+                                due_date=datetime(2025, 1, 1), created_by=1)
+        students = [Student(first_name=f"S{i}", surname="Test", email=f"s{i}@example.com",
+                            student_number=f"N{i:03d}", institution_id=1) for i in range(3)]
+        db.session.add_all([assignment, *students])
+        db.session.commit()
+        self.assignment_id = assignment.assignment_id
+        self.student_ids = [s.student_id for s in students]
+
+        # Student 2 already used one of their two attempts
+        db.session.add(Submission(student_id=self.student_ids[2], assignment_id=self.assignment_id))
+        db.session.commit()
+
+    def test_import_resolves_students_and_attempts(self):
+        archive = make_archive({
+            "N000/main.py": "print('a')",
+            "N001/Main.java": "class Main {}",
+            "N002/first.py": "print(1)",
+            "N002/second.py": "print(2)",
+            "N999/main.py": "",
+            "N000/notes.docx": "",
+            "stray.py": "",
+            "__MACOSX/N000/._main.py": "",
+        })
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        report = import_submissions(archive, self.assignment_id,
+                                    submitted_at=datetime(2025, 1, 3, 12, tzinfo=timezone.utc))
+
+        # Assignment, students, attempt counts and one batched insert
+        self.assertLessEqual(len(statements), 4)
+        self.assertEqual([e["student_number"] for e in report.imported], ["N000", "N001", "N002"])
+        self.assertEqual({s["entry"]: s["reason"] for s in report.skipped}, {
+            "N002/second.py": "Maximum attempts (2) reached",
+            "N999/main.py": "Unknown student number N999",
+            "N000/notes.docx": "Unsupported file type",
+            "stray.py": "Expected <student_number>/<file>",
+        })
+
+        java = db.session.get(Submission, report.imported[1]["submission_id"])
+        self.assertEqual(java.file_type, SubmissionFileType.JAVA_FILE)
+        self.assertEqual(java.submission_file, b"class Main {}")
+        self.assertEqual((java.attempt_number, java.is_late, java.days_late), (1, True, 2))
+        resubmitted = db.session.get(Submission, report.imported[2]["submission_id"])
+        self.assertEqual(resubmitted.attempt_number, 2)
+
+    def test_unlimited_attempts_are_numbered_past_the_highest(self):
+        Assignment.query.filter_by(assignment_id=self.assignment_id).update({"max_attempts": None})
+        # Student 2's only remaining attempt is their third; the first two were deleted
+        Submission.query.filter_by(student_id=self.student_ids[2]).update({"attempt_number": 3})
+        db.session.commit()
+
+        report = import_submissions(make_archive({"N002/a.py": "", "N002/b.py": ""}), self.assignment_id)
+
+        self.assertEqual(report.skipped, [])
+        self.assertEqual(sorted(db.session.get(Submission, e["submission_id"]).attempt_number
+                                for e in report.imported), [4, 5])
+
+    def test_batches_are_committed_separately(self):
+        archive = make_archive({f"N00{i}/main.py": "" for i in range(3)})
+        report = import_submissions(archive, self.assignment_id, batch_size=2)
+        self.assertEqual(len(report.imported), 3)
+        self.assertEqual(len({e["submission_id"] for e in report.imported}), 3)
+
+    def test_endpoint_queues_for_grading(self):
+        response = self.client.post(
+            f"/api/assignments/{self.assignment_id}/submissions/import?grade=true",
+            data={"archive": (make_archive({"N000/main.py": "print(1)"}), "class.zip")},
+            content_type="multipart/form-data"
+        )
+        self.assertEqual(response.status_code, 200)
+        submission_id = response.json["data"]["imported"][0]["submission_id"]
+        self.assertEqual(db.session.get(Submission, submission_id).status, SubmissionStatus.PROCESSING)
+        self.assertTrue(self.app.extensions["grading_scheduler"].is_queued(submission_id))
+
+    def test_endpoint_errors(self):
+        url = f"/api/assignments/{self.assignment_id}/submissions/import"
+        self.assertEqual(self.client.post(url).status_code, 400)
+        response = self.client.post(url, data={"archive": (io.BytesIO(b"not a zip"), "class.zip")},
+                                    content_type="multipart/form-data")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post("/api/assignments/999/submissions/import").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import time
+import unittest
+from datetime import datetime
+
+from sqlalchemy import event
+
+from support import AppTestCase
+from cache import LRUCache, assignment_cache, test_cache
+from models.models import db, Assignment, Test as AssignmentTest
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2, ttl=None)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (3, 1, 1))
+
+    def test_entries_expire(self):
+        cache = LRUCache(ttl=0.01)
+        cache.put("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_read_through_does_not_cache_missing_values(self):
+        cache = LRUCache()
+        loads = []
+        self.assertIsNone(cache.get_or_load("a", lambda: loads.append(1)))
+        self.assertEqual(cache.get_or_load("a", lambda: "value"), "value")
+        self.assertEqual(cache.get_or_load("a", lambda: "other"), "value")
+
+
+class TestMetadataCaches(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        test = AssignmentTest(name="Unit", test_file=b"import unittest\n", input_data="", expected_output="",
+                         created_by=1)
+        db.session.add(test)
+        db.session.flush()
+        assignment = Assignment(title="Lab", description="", rubric="", pass_threshold=40,
+                                due_date=datetime(2030, 1, 1), created_by=1, test_id=test.test_id)
+        db.session.add(assignment)
+        db.session.commit()
+        self.test_id = test.test_id
+        self.assignment_id = assignment.assignment_id
+
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self.record)
+
+    def record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self.record)
+        super().tearDown()
+
+    def test_artifact_is_loaded_once_per_revision(self):
+        hits = test_cache.stats()["artifacts"]["hits"]
+        first = test_cache.artifact(self.test_id)
+        second = test_cache.artifact(self.test_id)
+
+        self.assertIs(first, second)
+        self.assertEqual(first.source, b"import unittest\n")
+        self.assertEqual(sum("test_file" in s for s in self.statements), 1)
+        self.assertEqual(test_cache.stats()["artifacts"]["hits"], hits + 1)
+
+    def test_editing_a_test_serves_the_new_revision(self):
+        old = test_cache.artifact(self.test_id)
+        test = db.session.get(AssignmentTest, self.test_id)
+        test.test_file = b"import unittest  # v2\n"
+        test.version = "2.0"
+        db.session.commit()
+
+        new = test_cache.artifact(self.test_id)
+        self.assertEqual(new.source, b"import unittest  # v2\n")
+        self.assertNotEqual(new.sha256, old.sha256)
+
+    def test_assignment_metadata_skips_text_columns(self):
+        meta = assignment_cache.get(self.assignment_id)
+        self.assertEqual((meta.title, meta.test_id, meta.pass_threshold), ("Lab", self.test_id, 40))
+        self.assertNotIn("rubric", self.statements[0])
+
+        assignment_cache.get(self.assignment_id)
+        self.assertEqual(len(self.statements), 1)
+
+        db.session.get(Assignment, self.assignment_id).title = "Lab (revised)"
+        db.session.commit()
+        self.assertEqual(assignment_cache.get(self.assignment_id).title, "Lab (revised)")
+
+    def test_stats_in_metrics(self):
+        misses = assignment_cache.stats()["misses"]
+        assignment_cache.get(self.assignment_id)
+        caches = self.app.test_client().get("/api/metrics").json["caches"]
+        self.assertEqual(caches["assignments"]["misses"], misses + 1)
+        self.assertIn("artifacts", caches["tests"])
+
+
+if __name__ == "__main__":
+    unittest.main()
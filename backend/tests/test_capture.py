@@ -0,0 +1,113 @@
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from grading.capture import capture_stdout
+from grading.compiled import compile_test_source
+from grading.harness import run_test_module
+
+TEST_SOURCE = """import time
+import unittest
+
+
+class TestSubmission(unittest.TestCase):
+
+    def setUp(self):
+        self.student_file = None
+        with open(self.student_file) as f:
+            self.token = f.read().strip()
+
+    def test_prints_a_lot(self):
+        for i in range(50):
+            print(self.token, i)
+            time.sleep(0)
+
+    def test_fails_with_token(self):
+        print(self.token, "before failing")
+        self.assertEqual(self.token, "nobody")
+"""
+
+
+class TestCaptureIsolation(unittest.TestCase):
+
+    def test_threads_get_only_their_own_output(self):
+        barrier = threading.Barrier(32)
+        captured = {}
+
+        def job(n):
+            barrier.wait()
+            with capture_stdout() as output:
+                for i in range(200):
+                    print(f"job-{n}", i)
+                    if i % 10 == 0:
+                        time.sleep(0)
+            captured[n] = output.getvalue()
+
+        threads = [threading.Thread(target=job, args=(n,)) for n in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for n, text in captured.items():
+            self.assertEqual(text, "".join(f"job-{n} {i}\n" for i in range(200)))
+
+    def test_uncaptured_output_reaches_the_real_stream(self):
+        real = io.StringIO()
+        with redirect_stdout(real):
+            with capture_stdout() as output:
+                print("captured")
+                threading.Thread(target=print, args=("from a thread",)).start()
+                time.sleep(0.05)
+            print("after")
+
+        self.assertEqual(output.getvalue(), "captured\n")
+        self.assertEqual(real.getvalue(), "from a thread\nafter\n")
+
+    def test_asyncio_tasks_are_isolated(self):
+        async def job(n):
+            with capture_stdout() as output:
+                for i in range(20):
+                    print(n, i)
+                    await asyncio.sleep(0)
+            return output.getvalue()
+
+        async def main():
+            return await asyncio.gather(*(job(n) for n in range(10)))
+
+        for n, text in enumerate(asyncio.run(main())):
+            self.assertEqual(text, "".join(f"{n} {i}\n" for i in range(20)))
+
+    def test_concurrent_gradings_keep_their_feedback(self):
+        code = compile_test_source(TEST_SOURCE, "<stress test>")
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for n in range(40):
+                paths.append(os.path.join(tmp, f"student_{n}.py"))
+                with open(paths[-1], "w") as f:
+                    f.write(f"student-{n}\n")
+
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(lambda path: run_test_module(code, path), paths))
+
+        for n, result in enumerate(results):
+            self.assertEqual((result["total"], result["passed"]), (2, 1))
+            output = result["results"].split("Test output:\n", 1)[1]
+            lines = output.splitlines()
+            self.assertEqual(len(lines), 51)
+            self.assertTrue(all(line.startswith(f"student-{n} ") for line in lines), output)
+
+
+if __name__ == "__main__":
+    unittest.main()
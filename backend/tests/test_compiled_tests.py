@@ -0,0 +1,183 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from support import AppTestCase
+from automarker import AutoMarker
+from cache import TestArtifact
+from grading.compiled import CompiledTestCache, compile_test_source, compiled_tests, load_test_module
+from grading.executor import InlineExecutor, set_executor
+from grading.harness import run_test_artifact, run_test_module
+from grading.orchestrator import SubprocessOrchestrator
+from models.models import db, Assignment, Student, Submission, SubmissionStatus, Test as AssignmentTest
+
+TEST_SOURCE = b"""import unittest
+
+
+class TestSubmission(unittest.TestCase):
+
+    def setUp(self):
+        self.student_file = None
+
+    def test_file_contents(self):
+        with open(self.student_file) as f:
+            self.assertEqual(f.read().strip(), "print('hello')")
+
+    def test_fails(self):
+        raise KeyError("missing")
+"""
+
+RUN_STUDENT_SOURCE = b"""import unittest
+
+
+class TestShout(unittest.TestCase):
+
+    def test_shout(self):
+        result = run_student(input="hello\\n", timeout=5)
+        self.assertFalse(result.output_limit_exceeded, "printed too much output")
+        self.assertEqual(result.stdout, "HELLO\\n")
+"""
+
+NO_TIMEOUT_SOURCE = b"""import unittest
+
+
+class TestFinishes(unittest.TestCase):
+
+    def test_finishes(self):
+        self.assertFalse(run_student().timed_out, "took too long")
+"""
+
+SUBTEST_SOURCE = b"""import unittest
+
+
+class TestTable(unittest.TestCase):
+
+    def test_rows(self):
+        for row in range(3):
+            with self.subTest(row=row):
+                self.assertEqual(row, -1)
+
+    def test_passes(self):
+        pass
+"""
+
+
+class TestCompiledTestModules(unittest.TestCase):
+
+    def test_student_file_is_injected_per_module(self):
+        code = compile_test_source(TEST_SOURCE, "<test 1>")
+        first = load_test_module(code, "/tmp/first.py")
+        second = load_test_module(code, "/tmp/second.py")
+
+        self.assertIsNot(first.TestSubmission, second.TestSubmission)
+        case = first.TestSubmission("test_file_contents")
+        case.setUp()
+        self.assertEqual(case.student_file, "/tmp/first.py")
+        self.assertNotIn("submission_tests", sys.modules)
+
+    def test_code_is_compiled_once_per_revision(self):
+        cache = CompiledTestCache()
+        artifact = TestArtifact(1, "1.0", None, TEST_SOURCE, "a" * 64)
+        self.assertIs(cache.get(artifact), cache.get(artifact))
+
+        edited = TestArtifact(1, "1.0", None, TEST_SOURCE + b"\n", "b" * 64)
+        self.assertIsNot(cache.get(edited), cache.get(artifact))
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (2, 2))
+
+    def test_run_student_is_injected_per_module(self):
+        code = compile_test_source(RUN_STUDENT_SOURCE, "<test 3>")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "main.py")
+            with open(path, "w") as f:
+                f.write("print(input().upper())\n")
+            results = run_test_module(code, path)
+
+            with open(path, "w") as f:
+                f.write("while True:\n    print('spam')\n")
+            orchestrator = SubprocessOrchestrator(max_output_bytes=10_000)
+            with patch("grading.compiled.get_orchestrator", return_value=orchestrator):
+                runaway = run_test_module(code, path)
+            orchestrator.shutdown()
+
+        self.assertEqual((results["total"], results["passed"]), (1, 1))
+        self.assertEqual(runaway["failures"], 1)
+        self.assertIn("printed too much output", runaway["failure_details"][0])
+
+    def test_run_student_defaults_to_the_tests_timeout(self):
+        artifact = TestArtifact(4, "1.0", None, NO_TIMEOUT_SOURCE, "c" * 64, timeout_seconds=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "main.py")
+            with open(path, "w") as f:
+                f.write("import time\ntime.sleep(3)\n")
+            results = run_test_artifact(artifact, path)
+
+        self.assertEqual(results["failures"], 1)
+        self.assertIn("took too long", results["failure_details"][0])
+
+    def test_tracebacks_show_test_source(self):
+        code = compile_test_source(TEST_SOURCE, "<test 2>")
+        results = run_test_module(code, None)
+        error = next(r for r in results["test_cases"] if r["name"] == "TestSubmission.test_fails")
+        self.assertIn('raise KeyError("missing")', error["traceback"])
+
+    def test_failing_subtests_count_once_per_test(self):
+        results = run_test_module(compile_test_source(SUBTEST_SOURCE, "<test 3>"), None)
+
+        self.assertEqual((results["total"], results["passed"], results["failures"], results["errors"]), (2, 1, 1, 0))
+        self.assertEqual(len(results["failure_details"]), 1)
+
+
+class TestGradingWithCompiledTests(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        test = AssignmentTest(name="Unit", test_file=TEST_SOURCE, input_data="", expected_output="",
+                              created_by=1)
+        db.session.add(test)
+        db.session.flush()
+        assignment = Assignment(title="Lab", description="", rubric="", pass_threshold=40,
+                                due_date=datetime(2030, 1, 1), created_by=1, test_id=test.test_id)
+        student = Student(first_name="Ada", surname="Test", email="ada@example.com",
+                          student_number="N001", institution_id=1)
+        db.session.add_all([assignment, student])
+        db.session.flush()
+        self.submissions = [
+            Submission(student_id=student.student_id, assignment_id=assignment.assignment_id,
+                       attempt_number=n, submission_file=b"print('hello')\n")
+            for n in (1, 2)
+        ]
+        db.session.add_all(self.submissions)
+        db.session.commit()
+        self.test_id = test.test_id
+
+    def test_submissions_share_the_compiled_test(self):
+        previous = set_executor(InlineExecutor())
+        try:
+            before = compiled_tests.stats()
+            marker = AutoMarker()
+            outcomes = [marker.mark_submission(s.submission_id) for s in self.submissions]
+        finally:
+            set_executor(previous)
+
+        self.assertEqual([(o["tests_total"], o["tests_passed"]) for o in outcomes], [(2, 1), (2, 1)])
+        self.assertEqual(self.submissions[0].status, SubmissionStatus.PARTIAL)
+        after = self.app.test_client().get("/api/metrics").json["caches"]["compiled_tests"]
+        self.assertEqual(after["misses"] - before["misses"], 1)
+        self.assertEqual(after["hits"] - before["hits"], 1)
+
+    def test_syntax_error_in_test_file_is_reported(self):
+        test = db.session.get(AssignmentTest, self.test_id)
+        test.test_file = b"def broken(:\n"
+        db.session.commit()
+
+        outcome = AutoMarker().mark_submission(self.submissions[0].submission_id)
+        self.assertEqual(outcome["tests_total"], 0)
+        self.assertIn("Failed to run tests", outcome["feedback"])
+
+
+if __name__ == "__main__":
+    unittest.main()
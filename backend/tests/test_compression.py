@@ -0,0 +1,126 @@
+import os
+import unittest
+from datetime import datetime
+
+from sqlalchemy import event, text
+
+from support import AppTestCase
+from migrations import upgrade
+from models.compression import MARKER, decode, encode
+from models.models import db, Result, Submission
+from utils.metrics import metrics
+
+SOURCE = ("def fibonacci(n):\n    return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)\n" * 20).encode()
+
+
+class TestCodec(unittest.TestCase):
+
+    def test_round_trip(self):
+        encoded = encode(SOURCE)
+        self.assertTrue(encoded.startswith(MARKER))
+        self.assertLess(len(encoded), len(SOURCE) / 5)
+        self.assertEqual(decode(encoded), SOURCE)
+
+    def test_small_and_incompressible_values_are_stored(self):
+        self.assertEqual(encode(b"tiny"), MARKER + b"\x00tiny")
+        random_bytes = os.urandom(256)
+        self.assertEqual(decode(encode(random_bytes)), random_bytes)
+        self.assertEqual(len(encode(random_bytes)), 256 + 4)
+
+    def test_unmarked_values_are_legacy(self):
+        self.assertEqual(decode(b"print('hello')"), b"print('hello')")
+
+
+class TestCompressedColumns(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def test_columns_are_stored_compressed_and_read_transparently(self):
+        submission = Submission(student_id=1, assignment_id=1, submission_file=SOURCE)
+        result = Result(actual_output="ok\n" * 500, expected_output="", passed=True, score=0, percentage=0,
+                        feedback="Well done")
+        db.session.add_all([submission, result])
+        db.session.commit()
+
+        stored = db.session.execute(text("SELECT submission_file FROM submissions")).scalar()
+        self.assertTrue(stored.startswith(MARKER))
+        self.assertLess(len(stored), len(SOURCE))
+
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Submission, submission.submission_id).submission_file, SOURCE)
+        result = db.session.get(Result, result.result_id)
+        self.assertEqual(result.actual_output, "ok\n" * 500)
+        self.assertEqual(result.feedback, "Well done")
+
+        ratios = self.app.test_client().get("/api/metrics").json["compression_ratio"]
+        self.assertGreater(ratios["submission_file"], 5)
+
+    def test_file_is_not_loaded_until_read(self):
+        db.session.add(Submission(student_id=1, assignment_id=1, submission_file=SOURCE))
+        db.session.commit()
+        db.session.expire_all()
+
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        submission = Submission.query.first()
+        submission.to_dict()
+        self.assertNotIn("submission_file", statements[0])
+
+        self.assertEqual(submission.submission_file, SOURCE)
+        self.assertIn("submission_file", statements[-1])
+
+    def test_values_that_look_encoded_are_encoded_too(self):
+        data = encode(b"print(1)")
+        db.session.add(Submission(student_id=1, assignment_id=1, submission_file=data))
+        db.session.commit()
+        db.session.expire_all()
+
+        self.assertEqual(Submission.query.first().submission_file, data)
+
+    def test_result_output_is_not_loaded_until_read(self):
+        db.session.add(Result(actual_output="ok\n" * 500, expected_output="", passed=True, score=0,
+                              percentage=0, feedback="Well done"))
+        db.session.commit()
+        db.session.expire_all()
+
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        result = Result.query.first()
+        self.assertNotIn("results.actual_output", statements[0])
+        self.assertNotIn("results.feedback ", statements[0])
+
+        self.assertEqual(result.feedback, "Well done")
+        self.assertIn("results.feedback ", statements[-1])
+
+    def test_migration_compresses_legacy_rows(self):
+        db.session.execute(text(
+            "INSERT INTO submissions (student_id, assignment_id, submission_date, submission_file) "
+            "VALUES (1, 1, :now, :data)"
+        ), {"now": datetime(2025, 1, 1), "data": SOURCE})
+        db.session.execute(text(
+            "INSERT INTO results (actual_output, expected_output, passed, score, percentage, feedback) "
+            "VALUES (:output, '', 1, 0, 0, 'legacy feedback')"
+        ), {"output": "line\n" * 300})
+        db.session.commit()
+
+        # A legacy row reads back unchanged before the data migration...
+        self.assertEqual(Submission.query.first().submission_file, SOURCE)
+        self.assertEqual(Result.query.first().feedback, "legacy feedback")
+
+        db.session.execute(text("DELETE FROM schema_migrations WHERE version = 7"))
+        db.session.commit()
+        db.session.remove()
+        upgrade(db.engine, batch_size=1)
+
+        # ...and after it, from its compressed form
+        stored = db.session.execute(text("SELECT submission_file, actual_output FROM submissions, results")).one()
+        self.assertTrue(all(value.startswith(MARKER) for value in stored))
+        self.assertEqual(Submission.query.first().submission_file, SOURCE)
+        self.assertEqual(Result.query.first().actual_output, "line\n" * 300)
+        self.assertEqual(Result.query.first().feedback, "legacy feedback")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import threading
+import time
+import unittest
+
+from support import AppTestCase
+from events import StatusBroker, status_broker
+from models.models import db, Submission, SubmissionStatus
+
+
+class TestStatusBroker(unittest.TestCase):
+
+    def test_publish_without_subscribers_is_dropped(self):
+        broker = StatusBroker()
+        broker.publish(1, SubmissionStatus.GRADING)
+        self.assertEqual(broker.subscriber_count(1), 0)
+
+    def test_many_waiters_share_one_channel(self):
+        broker = StatusBroker()
+        received = []
+        subscriptions = [broker.subscribe(7) for _ in range(20)]
+        self.assertEqual(broker.subscriber_count(7), 20)
+
+        def waiter(subscription):
+            received.append(subscription.wait(5))
+            subscription.close()
+
+        threads = [threading.Thread(target=waiter, args=(s,)) for s in subscriptions]
+        for thread in threads:
+            thread.start()
+        broker.publish(7, SubmissionStatus.PASSED, result_id=3)
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(received), 20)
+        self.assertTrue(all(event["status"] == "passed" for event in received))
+        self.assertEqual(broker.subscriber_count(7), 0)
+
+    def test_wait_times_out(self):
+        broker = StatusBroker()
+        with broker.subscribe(1) as subscription:
+            self.assertIsNone(subscription.wait(0.05))
+
+
+class TestStatusEndpoints(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        submission = Submission(student_id=1, assignment_id=1, status=SubmissionStatus.GRADING)
+        db.session.add(submission)
+        db.session.commit()
+        self.submission_id = submission.submission_id
+
+    def publish_when_subscribed(self, status):
+        def publish():
+            deadline = time.monotonic() + 5
+            while status_broker.subscriber_count(self.submission_id) == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            status_broker.publish(self.submission_id, status)
+        thread = threading.Thread(target=publish)
+        thread.start()
+        return thread
+
+    def test_long_poll_returns_on_transition(self):
+        thread = self.publish_when_subscribed(SubmissionStatus.PASSED)
+        response = self.client.get(f"/api/submissions/{self.submission_id}/status?since=grading&wait=5")
+        thread.join()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["status"], "passed")
+        self.assertTrue(response.json["changed"])
+        self.assertTrue(response.json["terminal"])
+
+    def test_long_poll_returns_immediately_when_status_differs(self):
+        response = self.client.get(f"/api/submissions/{self.submission_id}/status?since=submitted&wait=5")
+        self.assertEqual(response.json["status"], "grading")
+        self.assertTrue(response.json["changed"])
+
+    def test_event_stream_ends_at_terminal_status(self):
+        thread = self.publish_when_subscribed(SubmissionStatus.FAILED)
+        response = self.client.get(f"/api/submissions/{self.submission_id}/events?timeout=5")
+        body = response.get_data(as_text=True)
+        thread.join()
+
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self.assertIn('"status": "grading"', body)
+        self.assertIn('"status": "failed"', body)
+
+    def commit_without_publishing(self, status):
+        """Change the status the way a grading worker process does: in the database only."""
+        def commit():
+            time.sleep(0.2)
+            with self.app.app_context():
+                Submission.query.filter_by(submission_id=self.submission_id).update({"status": status})
+                db.session.commit()
+        thread = threading.Thread(target=commit)
+        thread.start()
+        return thread
+
+    def test_waiters_see_changes_committed_by_other_processes(self):
+        self.app.config['STATUS_RECHECK_SECONDS'] = 0.05
+
+        thread = self.commit_without_publishing(SubmissionStatus.PARTIAL)
+        response = self.client.get(f"/api/submissions/{self.submission_id}/status?since=grading&wait=5")
+        thread.join()
+        self.assertEqual((response.json["status"], response.json["terminal"]), ("partial", True))
+
+        Submission.query.filter_by(submission_id=self.submission_id).update({"status": SubmissionStatus.GRADING})
+        db.session.commit()
+        thread = self.commit_without_publishing(SubmissionStatus.PASSED)
+        start = time.monotonic()
+        body = self.client.get(f"/api/submissions/{self.submission_id}/events?timeout=5").get_data(as_text=True)
+        thread.join()
+        self.assertIn('"status": "passed"', body)
+        self.assertLess(time.monotonic() - start, 4)
+
+    def test_unknown_submission(self):
+        self.assertEqual(self.client.get("/api/submissions/999/status").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from cache import TestArtifact
+from grading.executor import GradingExecutor
+
+TEST_SOURCE = """import os
+import unittest
+
+
+class TestSubmission(unittest.TestCase):
+
+    def setUp(self):
+        self.student_file = None
+
+    def test_reads_student_file(self):
+        print("checking", os.path.basename(self.student_file))
+        with open(self.student_file) as f:
+            self.assertEqual(f.read(), "answer = 42\\n")
+
+    def test_runs_in_executor(self):
+        self.assertNotEqual(os.getpid(), {parent_pid})
+"""
+
+
+def artifact(source, test_id=1):
+    source = source.encode()
+    return TestArtifact(test_id, "1.0", None, source, hashlib.sha256(source).hexdigest())
+
+
+def single_test(body):
+    return artifact(f"import os, time, unittest\n\nclass TestCase(unittest.TestCase):\n    def test(self):\n        {body}\n")
+
+
+class TestGradingExecutor(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.student_file = os.path.join(cls.tmp.name, "submission.py")
+        with open(cls.student_file, "w") as f:
+            f.write("answer = 42\n")
+        cls.tests = artifact(TEST_SOURCE.format(parent_pid=os.getpid()))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.executor = GradingExecutor(processes=2, timeout=30)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_runs_tests_out_of_process(self):
+        results = self.executor.run(self.tests, self.student_file)
+
+        self.assertEqual((results["total"], results["passed"]), (2, 2))
+        self.assertIn("checking submission.py", results["results"])
+        self.assertEqual(self.executor.stats()["jobs"], 1)
+
+    def test_timeout_kills_and_replaces_the_process(self):
+        results = self.executor.run(single_test("time.sleep(60)"), timeout=0.5)
+        self.assertIn("did not finish within 0.5 seconds", results["results"])
+
+        self.assertEqual(self.executor.run(self.tests, self.student_file)["passed"], 2)
+        stats = self.executor.stats()
+        self.assertEqual((stats["timeouts"], stats["started"], stats["live"]), (1, 2, 1))
+
+    def test_crash_is_reported_and_process_replaced(self):
+        results = self.executor.run(single_test("os._exit(3)"))
+        self.assertIn("exited unexpectedly (exit code 3)", results["results"])
+
+        self.assertEqual(self.executor.run(self.tests, self.student_file)["passed"], 2)
+        self.assertEqual(self.executor.stats()["crashes"], 1)
+
+    def test_processes_are_recycled(self):
+        executor = GradingExecutor(processes=1, max_jobs_per_process=2)
+        try:
+            pids = [executor.run(single_test("print(os.getpid())"))["results"].split()[-1] for _ in range(3)]
+        finally:
+            executor.shutdown()
+
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+        self.assertEqual(executor.stats()["recycled"], 1)
+
+    def test_concurrent_jobs_use_the_pool(self):
+        outcomes = []
+
+        def grade():
+            outcomes.append(self.executor.run(self.tests, self.student_file)["passed"])
+
+        threads = [threading.Thread(target=grade) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes, [2] * 6)
+        self.assertLessEqual(self.executor.stats()["started"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
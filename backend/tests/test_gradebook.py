@@ -0,0 +1,122 @@
+import csv
+import io
+import unittest
+from datetime import datetime
+
+from support import AppTestCase
+from automarker import AutoMarker
+from exports import ColumnarWriter, ColumnarFormatError, read_columnar
+from models.models import (
+    db, AcademicYear, Assignment, GradeStatus, Module, Result, Student, Submission,
+    module_assignments, student_enrollments
+)
+
+
+class TestColumnarFormat(unittest.TestCase):
+
+    def test_round_trip_across_row_groups(self):
+        writer = ColumnarWriter([("id", "i32"), ("name", "str"), ("mark", "f32")],
+                                metadata={"source": "test"}, row_group_size=2)
+        rows = [(1, "Ada", 75.5), (2, "", None), (3, "Zoë", 0.0)]
+        data = b"".join(writer.stream(rows))
+
+        metadata, decoded = read_columnar(io.BytesIO(data))
+        self.assertEqual(metadata["source"], "test")
+        self.assertEqual(decoded, rows)
+
+    def test_rejects_other_data(self):
+        with self.assertRaises(ColumnarFormatError):
+            read_columnar(io.BytesIO(b"student_id,mark\n"))
+
+
+class TestGradebookExport(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        module = Module(name="Programming", code="COMP101", subject_id=1, semester="Autumn", year=2025,
+                        start_date=datetime(2025, 9, 1), end_date=datetime(2025, 12, 1))
+        db.session.add(module)
+        a1, a2 = (Assignment(title=title, description="", rubric="", pass_threshold=40,
+                             due_date=datetime(2025, 11, 1), created_by=1) for title in ("Lab 1", "Lab 2"))
+        students = [Student(first_name=f"S{i}", surname="Test", email=f"s{i}@example.com",
+                            student_number=f"N{i:03d}", institution_id=1) for i in range(3)]
+        db.session.add_all([a1, a2, *students])
+        db.session.flush()
+        self.module_id = module.module_id
+        db.session.execute(module_assignments.insert(), [
+            {"module_id": module.module_id, "assignment_id": a1.assignment_id, "weight": 1.0},
+            {"module_id": module.module_id, "assignment_id": a2.assignment_id, "weight": 3.0},
+        ])
+        db.session.execute(student_enrollments.insert(), [
+            {"student_id": s.student_id, "module_id": module.module_id, "academic_year": AcademicYear.YEAR_1}
+            for s in students
+        ])
+
+        # Student 0: two attempts at Lab 1 (best counts) and Lab 2; student 1: Lab 1 only; student 2: nothing
+        self.add_result(students[0], a1, 40)
+        self.add_result(students[0], a1, 80)
+        self.add_result(students[0], a2, 60)
+        self.add_result(students[1], a1, 100)
+        self.add_result(students[1], a2, 90, grade_status=GradeStatus.NOT_GRADED)
+        db.session.commit()
+
+    def add_result(self, student, assignment, percentage, grade_status=GradeStatus.GRADED):
+        result = Result(actual_output="", expected_output="", passed=True, score=percentage,
+                        percentage=percentage, grade_status=grade_status)
+        db.session.add(result)
+        db.session.flush()
+        attempt = Submission.query.filter_by(student_id=student.student_id,
+                                             assignment_id=assignment.assignment_id).count() + 1
+        db.session.add(Submission(student_id=student.student_id, assignment_id=assignment.assignment_id,
+                                  attempt_number=attempt, result_id=result.result_id))
+
+    def test_csv_export(self):
+        response = self.client.get(f"/api/modules/{self.module_id}/gradebook")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("COMP101_gradebook.csv", response.headers["Content-Disposition"])
+
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(rows[0], ["student_id", "student_number", "first_name", "surname",
+                                   "Lab 1 (weight 1)", "Lab 2 (weight 3)", "weighted_total"])
+        self.assertEqual([row[4:] for row in rows[1:]], [
+            ["80.00", "60.00", "65.00"],
+            ["100.00", "", "25.00"],
+            ["", "", "0.00"],
+        ])
+
+    def test_columnar_export(self):
+        response = self.client.get(f"/api/modules/{self.module_id}/gradebook?format=columnar")
+        self.assertEqual(response.status_code, 200)
+
+        metadata, rows = read_columnar(io.BytesIO(response.get_data()))
+        self.assertEqual(metadata["module_code"], "COMP101")
+        self.assertEqual([a["weight"] for a in metadata["assignments"]], [1.0, 3.0])
+        self.assertEqual([row[1] for row in rows], ["N000", "N001", "N002"])
+        self.assertEqual(rows[0][4:], (80.0, 60.0, 65.0))
+        self.assertEqual(rows[2][4:], (None, None, 0.0))
+
+    def test_marks_are_percentages_of_max_score(self):
+        lab2 = Assignment.query.filter_by(title="Lab 2").one()
+        lab2.max_score = 50
+        submission = Submission(student_id=Student.query.filter_by(student_number="N002").one().student_id,
+                                assignment_id=lab2.assignment_id)
+        db.session.add(submission)
+        db.session.commit()
+        AutoMarker().create_or_update_result(submission, {
+            "total": 2, "passed": 1, "failures": 1, "errors": 0, "results": "",
+            "failure_details": [], "error_details": [], "test_cases": []
+        }, 25, "")
+        db.session.commit()
+
+        response = self.client.get(f"/api/modules/{self.module_id}/gradebook")
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(rows[3][4:], ["", "50.00", "37.50"])
+
+    def test_errors(self):
+        self.assertEqual(self.client.get("/api/modules/999/gradebook").status_code, 404)
+        self.assertEqual(self.client.get(f"/api/modules/{self.module_id}/gradebook?format=xlsx").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
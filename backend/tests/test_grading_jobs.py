@@ -0,0 +1,168 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from support import AppTestCase
+from automarker import AutoMarker
+from grading import JobPriority, QueuedJob, get_scheduler
+from grading.jobs import claim_job, finish_job, record_jobs, recover_jobs, sweep_scratch
+from grading.sandbox import OWNER_FILE, POOL_PREFIX
+from grading.scratch import scratch_directory
+from models.models import db, GradeStatus, GradingJob, GradingJobState, Submission, SubmissionStatus
+
+
+class TestGradingJobs(AppTestCase):
+    config = {"GRADING_WORKERS": 1}
+
+    def setUp(self):
+        super().setUp()
+        self.engine = db.engine
+        self.submissions = []
+        for attempt in range(1, 4):
+            submission = Submission(student_id=1, assignment_id=1, attempt_number=attempt,
+                                    submission_file=b"print(1)", status=SubmissionStatus.PROCESSING)
+            db.session.add(submission)
+            db.session.commit()
+            self.submissions.append(submission.submission_id)
+
+    def tearDown(self):
+        scheduler = self.app.extensions.get('grading_scheduler')
+        if scheduler:
+            scheduler.stop(5)
+        super().tearDown()
+
+    def job(self, submission_id, priority=JobPriority.BULK, regrade=False):
+        return {"submission_id": submission_id, "student_id": 1, "assignment_id": 1,
+                "priority": priority, "regrade": regrade}
+
+    def row(self, submission_id):
+        db.session.expire_all()
+        return db.session.get(GradingJob, submission_id)
+
+    def crashed(self, submission_id, attempts=1):
+        """Leave a job RUNNING under a worker whose lease has already run out."""
+        record_jobs(self.engine, [self.job(submission_id)])
+        self.assertTrue(claim_job(self.engine, QueuedJob(submission_id, 1, 1), owner="dead-host:1", ttl=-1))
+        GradingJob.query.filter_by(submission_id=submission_id).update({"attempts": attempts})
+        Submission.query.filter_by(submission_id=submission_id).update({"status": SubmissionStatus.GRADING})
+        db.session.commit()
+
+    def test_recording_keeps_one_row_per_submission(self):
+        first, second = self.submissions[:2]
+        record_jobs(self.engine, [self.job(first), self.job(second)])
+        record_jobs(self.engine, [self.job(first, JobPriority.INTERACTIVE, regrade=True)])
+        self.assertEqual((self.row(first).priority, self.row(first).regrade), (JobPriority.INTERACTIVE, True))
+
+        # A finished job is queued afresh when the submission is queued again
+        job = QueuedJob(second, 1, 1)
+        self.assertTrue(claim_job(self.engine, job, owner="worker-a"))
+        self.assertFalse(claim_job(self.engine, job, owner="worker-b"))
+        self.assertTrue(finish_job(self.engine, second, owner="worker-a"))
+        self.assertEqual(self.row(second).state, GradingJobState.DONE)
+        record_jobs(self.engine, [self.job(second)])
+        self.assertEqual((self.row(second).state, self.row(second).attempts), (GradingJobState.QUEUED, 0))
+        self.assertEqual(GradingJob.query.count(), 2)
+
+    def test_abandoned_and_stuck_submissions_are_recovered(self):
+        crashed, stuck, queued = self.submissions
+        self.crashed(crashed)
+        record_jobs(self.engine, [self.job(queued)])
+        # `stuck` is PROCESSING with no job at all (queued before jobs were recorded)
+
+        recovery = recover_jobs(self.engine)
+
+        self.assertEqual((recovery.requeued, recovery.adopted, recovery.failed), ([crashed], [stuck], []))
+        self.assertEqual({job["submission_id"] for job in recovery.queued}, set(self.submissions))
+        self.assertEqual(self.row(crashed).state, GradingJobState.QUEUED)
+        self.assertIsNone(self.row(crashed).owner)
+
+    def test_a_job_that_keeps_killing_workers_is_failed(self):
+        poison = self.submissions[0]
+        self.crashed(poison, attempts=3)
+
+        recovery = recover_jobs(self.engine, max_attempts=3)
+
+        self.assertEqual(recovery.failed, [poison])
+        self.assertEqual(self.row(poison).state, GradingJobState.FAILED)
+        self.assertEqual(db.session.get(Submission, poison).status, SubmissionStatus.ERROR)
+
+    def test_scheduler_resumes_interrupted_grading_on_startup(self):
+        crashed = self.submissions[0]
+        self.crashed(crashed)
+        graded = []
+
+        def mark(marker, submission_id):
+            graded.append(submission_id)
+            return {"success": True, "submission_id": submission_id, "score": 1}
+
+        with patch("automarker.AutoMarker.mark_submission", mark):
+            get_scheduler(self.app)
+            deadline = time.monotonic() + 5
+            while (GradingJob.query.filter_by(state=GradingJobState.DONE).count() < len(self.submissions)
+                   and time.monotonic() < deadline):
+                db.session.expire_all()
+                time.sleep(0.05)
+
+        self.assertEqual(sorted(graded), self.submissions)
+        job = self.row(crashed)
+        self.assertEqual((job.state, job.attempts), (GradingJobState.DONE, 2))
+
+    def test_grading_errors_are_recorded_on_the_result(self):
+        outcome = AutoMarker().mark_submission(self.submissions[0])  # Assignment 1 does not exist
+
+        self.assertFalse(outcome["success"])
+        submission = db.session.get(Submission, self.submissions[0])
+        self.assertEqual(submission.status, SubmissionStatus.ERROR)
+        self.assertEqual(submission.result.grade_status, GradeStatus.ERROR)
+
+
+class TestScratchSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def pool_root(self, pid):
+        root = tempfile.mkdtemp(prefix=POOL_PREFIX, dir=self.tmp.name)
+        os.makedirs(os.path.join(root, "slot-0"))
+        with open(os.path.join(root, OWNER_FILE), "w") as f:
+            f.write(str(pid))
+        return root
+
+    def test_dead_workers_scratch_is_removed(self):
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        dead, alive = self.pool_root(exited.pid), self.pool_root(os.getpid())
+        old, new, unrelated = (os.path.join(self.tmp.name, name)
+                               for name in ("submission_old.py", "test_new_test.py", "test_data.txt"))
+        for path in (old, new, unrelated):
+            open(path, "w").close()
+        os.utime(old, (time.time() - 7200, time.time() - 7200))
+        os.utime(unrelated, (time.time() - 7200, time.time() - 7200))
+
+        self.assertEqual(sweep_scratch(self.tmp.name, max_age=3600), 2)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)),
+                         sorted([os.path.basename(alive), "test_new_test.py", "test_data.txt"]))
+        self.assertFalse(os.path.exists(dead))
+
+    def test_only_the_private_scratch_directory_is_swept(self):
+        with patch.object(tempfile, "tempdir", self.tmp.name):
+            ours = os.path.join(scratch_directory(), "submission_ours.py")
+            theirs = os.path.join(self.tmp.name, "submission_theirs.py")
+            for path in (ours, theirs):
+                open(path, "w").close()
+                os.utime(path, (time.time() - 7200, time.time() - 7200))
+
+            self.assertEqual(sweep_scratch(max_age=3600), 1)
+        self.assertFalse(os.path.exists(ours))
+        self.assertTrue(os.path.exists(theirs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import subprocess
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from support import AppTestCase
+from grading import JobPriority, enqueue_grading, pending_grading
+from grading.jobs import claim_next_job, record_jobs
+from models.models import (
+    db, Assignment, GradingJob, GradingJobState, Result, Student, Submission, SubmissionStatus,
+    Test as AssignmentTest
+)
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+WORKERS = 3
+SUBMISSIONS = 12
+# Slow enough that every worker process is up before the queue runs dry
+ADDER = b"import time\ntime.sleep(0.2)\na, b = map(int, input().split())\nprint(a + b)\n"
+
+
+class TestGradingWorkers(AppTestCase):
+    config = {"GRADING_QUEUE": "database"}
+
+    def setUp(self):
+        super().setUp()
+
+        test = AssignmentTest(name="Adder", input_data="2 3", expected_output="5", io_options="{}", created_by=1)
+        db.session.add(test)
+        db.session.flush()
+        self.assignment = Assignment(title="Adder", description="", rubric="", pass_threshold=40,
+                                     due_date=datetime(2030, 1, 1), created_by=1, test_id=test.test_id)
+        self.student = Student(first_name="Ada", surname="Test", email="ada@example.com",
+                               student_number="N001", institution_id=1)
+        db.session.add_all([self.assignment, self.student])
+        db.session.commit()
+
+    def submit(self, count):
+        submissions = [Submission(student_id=self.student.student_id, assignment_id=self.assignment.assignment_id,
+                                  attempt_number=attempt, submission_file=ADDER)
+                       for attempt in range(1, count + 1)]
+        db.session.add_all(submissions)
+        db.session.commit()
+        return submissions
+
+    def job(self, submission, priority=JobPriority.INTERACTIVE):
+        return {"submission_id": submission.submission_id, "student_id": submission.student_id,
+                "assignment_id": submission.assignment_id, "priority": priority, "regrade": False}
+
+    def test_jobs_are_claimed_by_priority_then_age(self):
+        first, second, third = self.submit(3)
+        record_jobs(db.engine, [self.job(first, JobPriority.BULK), self.job(second, JobPriority.BULK),
+                                self.job(third)])
+
+        claimed = [claim_next_job(db.engine, owner="worker")["submission_id"] for _ in range(3)]
+        self.assertEqual(claimed, [third.submission_id, first.submission_id, second.submission_id])
+        self.assertIsNone(claim_next_job(db.engine, owner="worker"))
+
+    def test_one_student_does_not_hold_back_another(self):
+        other = Student(first_name="Bo", surname="Test", email="bo@example.com", student_number="N002",
+                        institution_id=1)
+        db.session.add(other)
+        db.session.commit()
+        resubmissions = self.submit(10)
+        theirs = Submission(student_id=other.student_id, assignment_id=self.assignment.assignment_id,
+                            attempt_number=1, submission_file=ADDER)
+        db.session.add(theirs)
+        db.session.commit()
+        record_jobs(db.engine, [self.job(s) for s in resubmissions + [theirs]])
+
+        claimed = [claim_next_job(db.engine, owner="worker")["submission_id"] for _ in range(2)]
+        self.assertEqual(claimed, [resubmissions[0].submission_id, theirs.submission_id])
+
+    def test_waiting_jobs_move_up_a_priority_class(self):
+        bulk, interactive = self.submit(2)
+        record_jobs(db.engine, [self.job(bulk, JobPriority.BULK), self.job(interactive)])
+        GradingJob.query.filter_by(submission_id=bulk.submission_id).update(
+            {"enqueued_at": datetime.now(timezone.utc) - timedelta(seconds=300)})
+        db.session.commit()
+
+        # Waiting 300 seconds is not enough for an hour's aging, but two classes' worth of two minutes
+        self.assertEqual(claim_next_job(db.engine, owner="worker", aging=3600)["submission_id"],
+                         interactive.submission_id)
+        record_jobs(db.engine, [self.job(interactive)])
+        self.assertEqual(claim_next_job(db.engine, owner="worker", aging=120)["submission_id"], bulk.submission_id)
+
+    def test_worker_processes_share_one_queue(self):
+        for submission in self.submit(SUBMISSIONS):
+            self.assertTrue(enqueue_grading(submission))
+        # The API tier only records the jobs
+        self.assertNotIn('grading_scheduler', self.app.extensions)
+        self.assertEqual(pending_grading()["interactive"], SUBMISSIONS)
+
+        env = dict(os.environ, DATABASE_URL=self.database_uri)
+        workers = [subprocess.Popen([sys.executable, "-m", "flask", "--app", "app", "grading-worker",
+                                     "--threads", "1", "--burst"],
+                                    cwd=APP_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                   for _ in range(WORKERS)]
+        outputs = [worker.communicate(timeout=120)[0].decode() for worker in workers]
+        for worker, output in zip(workers, outputs):
+            self.assertEqual(worker.returncode, 0, output)
+
+        db.session.expire_all()
+        jobs = GradingJob.query.all()
+        self.assertEqual(len(jobs), SUBMISSIONS)
+        # Every job was graded exactly once, and the work was spread over the workers
+        self.assertTrue(all(job.state is GradingJobState.DONE and job.attempts == 1 for job in jobs))
+        self.assertGreater(len({job.owner for job in jobs}), 1)
+        self.assertEqual(Result.query.count(), SUBMISSIONS)
+        self.assertEqual({s.status for s in Submission.query.all()}, {SubmissionStatus.PASSED})
+        self.assertEqual(sum(int(output.split("after ")[1].split(" ")[0]) for output in outputs), SUBMISSIONS)
+
+
+if __name__ == "__main__":
+    unittest.main()
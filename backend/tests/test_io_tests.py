@@ -0,0 +1,176 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+from support import AppTestCase
+from automarker import AutoMarker
+from grading.io_tests import REPLAY_HARNESS, IOOptions, compare_output, run_io_tests, split_cases
+from utils.metrics import metrics
+from models.models import (
+    db, Assignment, Student, Submission, SubmissionStatus, Test as AssignmentTest,
+    TestCaseResult as CaseResult, TestOutcome as Outcome
+)
+
+ADDER = b"a, b = map(float, input().split())\nprint(a + b)\n"
+
+
+class TestOutputComparison(unittest.TestCase):
+
+    def test_trailing_whitespace_is_ignored_by_default(self):
+        self.assertIsNone(compare_output("5  \n\n\n", "5"))
+        self.assertEqual(compare_output(" 5\n", "5"), "line 1: expected '5', got ' 5'")
+
+    def test_exact_and_collapsed_whitespace(self):
+        self.assertIsNotNone(compare_output("5\n", "5", IOOptions(whitespace="exact")))
+        self.assertIsNone(compare_output("1  2\n3", "1 2 3", IOOptions(whitespace="collapse")))
+
+    def test_case_and_numeric_tolerance(self):
+        self.assertIsNone(compare_output("HELLO", "hello", IOOptions(case_sensitive=False)))
+        options = IOOptions(numeric_tolerance=0.001)
+        self.assertIsNone(compare_output("pi = 3.1416", "pi = 3.14159", options))
+        self.assertIsNotNone(compare_output("pi = 3.2", "pi = 3.14159", options))
+        self.assertIsNotNone(compare_output("tau = 3.1416", "pi = 3.14159", options))
+
+    def test_missing_lines_are_reported(self):
+        self.assertEqual(compare_output("0\n1", "0\n1\n2"), "expected 3 line(s) of output, got 2")
+
+    def test_cases_and_options_are_validated(self):
+        self.assertEqual(split_cases("1 2\n---\n3 4", "3\n---\n7"), [("1 2\n", "3"), ("3 4\n", "7")])
+        with self.assertRaises(ValueError):
+            split_cases("1\n---\n2", "1")
+        with self.assertRaises(ValueError):
+            IOOptions.parse('{"tolerance": 1}')
+
+
+class TestNativeIOGrading(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        test = AssignmentTest(name="Adder", input_data="2 3\n---\n10 -4\n---\n0.1 0.2",
+                              expected_output="5\n---\n6\n---\n0.3", io_options='{"numeric_tolerance": 1e-6}',
+                              timeout_seconds=2, created_by=1)
+        db.session.add(test)
+        db.session.flush()
+        assignment = Assignment(title="Adder", description="", rubric="", pass_threshold=40,
+                                due_date=datetime(2030, 1, 1), created_by=1, test_id=test.test_id)
+        self.student = Student(first_name="Ada", surname="Test", email="ada@example.com",
+                               student_number="N001", institution_id=1)
+        db.session.add_all([assignment, self.student])
+        db.session.commit()
+        self.assignment_id = assignment.assignment_id
+
+    def grade(self, source, attempt=1):
+        submission = Submission(student_id=self.student.student_id, assignment_id=self.assignment_id,
+                                attempt_number=attempt, submission_file=source)
+        db.session.add(submission)
+        db.session.commit()
+        return submission, AutoMarker().mark_submission(submission.submission_id)
+
+    def test_correct_program_passes_every_case(self):
+        submission, outcome = self.grade(ADDER)
+
+        self.assertEqual((outcome["tests_total"], outcome["tests_passed"]), (3, 3))
+        self.assertEqual(submission.status, SubmissionStatus.PASSED)
+        names = [case.name for case in CaseResult.query.order_by(CaseResult.name)]
+        self.assertEqual(names, ["IOTest.case_1", "IOTest.case_2", "IOTest.case_3"])
+
+    def test_wrong_output_crash_and_timeout(self):
+        _, wrong = self.grade(b"a, b = map(float, input().split())\nprint(a - b)\n")
+        self.assertEqual((wrong["tests_total"], wrong["tests_failed"]), (3, 3))
+        self.assertIn("IOTest.case_1: line 1: expected '5', got '-1.0'", wrong["feedback"])
+
+        _, crash = self.grade(b"raise SystemExit('no input handling')\n", attempt=2)
+        self.assertEqual(crash["tests_errors"], 3)
+        case = CaseResult.query.filter_by(outcome=Outcome.ERROR).first()
+        self.assertEqual(case.message, "Program exited with code 1")
+        self.assertIn("no input handling", case.traceback)
+
+        _, hang = self.grade(b"while True:\n    pass\n", attempt=3)
+        self.assertEqual(hang["tests_errors"], 3)
+        self.assertIn("Execution timed out", hang["feedback"])
+
+
+class TestSingleProcessReplay(unittest.TestCase):
+
+    INPUTS = "\n---\n".join(f"{n} {n * 2}" for n in range(8))
+    EXPECTED = "\n---\n".join(f"{n * 3}.0" for n in range(8))
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "main.py")
+        metrics.reset()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_cases(self, source, single_process, inputs=INPUTS, expected=EXPECTED):
+        with open(self.path, "wb") as f:
+            f.write(source)
+        results = run_io_tests([sys.executable, self.path], inputs, expected,
+                               io_options={"single_process": single_process}, timeout=5, cwd=self.tmp.name,
+                               replay_command=[sys.executable, REPLAY_HARNESS, self.path])
+        return [(r["name"], r["outcome"], r["message"]) for r in results["test_cases"]]
+
+    def test_one_process_for_all_cases(self):
+        source = b"import helper\n" + ADDER
+        with open(os.path.join(self.tmp.name, "helper.py"), "w") as f:
+            f.write("COUNT = 1\n")
+
+        replayed = self.run_cases(source, single_process=True)
+        self.assertEqual(metrics.get("io_tests.process_spawns"), 1)
+        self.assertEqual(metrics.get("io_tests.fallback_cases"), 0)
+        self.assertEqual(replayed, self.run_cases(source, single_process=False))
+        self.assertTrue(all(outcome == Outcome.PASSED for _, outcome, _ in replayed))
+
+    def test_failures_are_confirmed_in_their_own_process(self):
+        source = b"import sys\na, b = map(int, input().split())\nif a % 2: sys.exit(3)\nprint(float(a + b))\n"
+        replayed = self.run_cases(source, single_process=True)
+
+        self.assertEqual(replayed, self.run_cases(source, single_process=False))
+        self.assertEqual(metrics.get("io_tests.fallback_cases"), 4)
+        self.assertEqual(replayed[1][2], "Program exited with code 3")
+
+    def test_output_bypassing_sys_stdout_falls_back(self):
+        source = b"import os\na, b = map(float, input().split())\nos.write(1, f'{a + b}\\n'.encode())\n"
+        replayed = self.run_cases(source, single_process=True)
+
+        self.assertTrue(all(outcome == Outcome.PASSED for _, outcome, _ in replayed))
+        self.assertEqual(metrics.get("io_tests.fallback_cases"), 8)
+
+    def test_runaway_output_is_stopped_and_reported(self):
+        replayed = self.run_cases(b"while True:\n    print('spam' * 25)\n", single_process=True,
+                                  inputs="", expected="spam")
+
+        [(_, outcome, message)] = replayed
+        self.assertEqual(outcome, Outcome.ERROR)
+        self.assertTrue(message.startswith("Output limit exceeded: stopped after"), message)
+        self.assertEqual(metrics.get("io_tests.fallback_cases"), 1)
+
+    def test_state_does_not_leak_between_cases(self):
+        source = (b"import builtins, os, sys\n"
+                  b"builtins.seen = getattr(builtins, 'seen', 0) + 1\n"
+                  b"sys.path.append('elsewhere')\n"
+                  b"deep = sys.getrecursionlimit() > 50\n"
+                  b"sys.setrecursionlimit(50)\n"
+                  b"os.environ['SEEN'] = os.environ.get('SEEN', '') + 'x'\n"
+                  b"print(builtins.seen, sys.path.count('elsewhere'), deep, os.environ['SEEN'])\n")
+        replayed = self.run_cases(source, single_process=True, inputs="\n---\n",
+                                  expected="1 1 True x\n---\n1 1 True x")
+
+        self.assertEqual([outcome for _, outcome, _ in replayed], [Outcome.PASSED, Outcome.PASSED])
+        self.assertEqual(metrics.get("io_tests.fallback_cases"), 0)
+
+    def test_leaked_state_does_not_pass_a_case(self):
+        # The second case only prints the answer if the first one's assignment to sys survived
+        source = b"import sys\nif input() == 'set': sys.answer = 42\nprint(getattr(sys, 'answer', 'unset'))\n"
+        inputs, expected = "set\n---\nget\n", "42\n---\n42"
+        replayed = self.run_cases(source, single_process=True, inputs=inputs, expected=expected)
+
+        self.assertEqual(replayed, self.run_cases(source, single_process=False, inputs=inputs, expected=expected))
+        self.assertEqual([outcome for _, outcome, _ in replayed], [Outcome.PASSED, Outcome.FAILED])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import shutil
+import unittest
+from datetime import datetime
+
+from support import AppTestCase
+from automarker import AutoMarker
+from grading.build_cache import BuildCache, set_build_cache
+from grading.executor import InlineExecutor, set_executor
+from grading.languages import RUNNERS, UnsupportedLanguageError, runner_for
+from utils.metrics import metrics
+from models.models import (
+    db, Assignment, ProgrammingLanguage, Result, Student, Submission, SubmissionFileType, SubmissionStatus,
+    Test as AssignmentTest, TestCaseResult as CaseResult
+)
+
+C_ADDER = b'#include <stdio.h>\nint main(void) { int a, b; scanf("%d %d", &a, &b); printf("%d\\n", a + b); }\n'
+
+RUN_STUDENT_TEST = b"""import unittest
+
+
+class TestAdder(unittest.TestCase):
+
+    def test_adds(self):
+        self.assertEqual(run_student(input="20 22\\n", timeout=5).stdout, "42\\n")
+"""
+
+
+class TestRunnerRegistry(unittest.TestCase):
+
+    def test_test_language_wins_over_file_type(self):
+        self.assertIs(runner_for(ProgrammingLanguage.C, SubmissionFileType.PYTHON_FILE).language, ProgrammingLanguage.C)
+        self.assertIs(runner_for(None, SubmissionFileType.CPP_FILE).language, ProgrammingLanguage.CPP)
+        self.assertIs(runner_for(None, SubmissionFileType.ZIP_FILE).language, ProgrammingLanguage.PYTHON)
+
+    def test_languages_without_a_runner_are_rejected(self):
+        with self.assertRaises(UnsupportedLanguageError):
+            runner_for(ProgrammingLanguage.CSHARP)
+
+    def test_commands_use_absolute_paths_in_the_working_directory(self):
+        runner = RUNNERS[ProgrammingLanguage.JAVA]
+        self.assertEqual(runner.run_command("/sandbox/slot-1"), ["java", "-cp", "/sandbox/slot-1", "Main"])
+        self.assertIn("/sandbox/slot-1/Main.java", runner.compile_command("/sandbox/slot-1"))
+
+
+@unittest.skipUnless(shutil.which("gcc"), "gcc is not installed")
+class TestCompiledGrading(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.previous_cache = set_build_cache(BuildCache(os.path.join(self.tmp.name, "builds")))
+        metrics.reset()
+
+        self.student = Student(first_name="Ada", surname="Test", email="ada@example.com",
+                               student_number="N001", institution_id=1)
+        db.session.add(self.student)
+        db.session.commit()
+        self.attempts = 0
+
+    def tearDown(self):
+        set_build_cache(self.previous_cache)
+        super().tearDown()
+
+    def assignment(self, language=ProgrammingLanguage.C, **test_fields):
+        fields = dict(input_data="2 3\n---\n10 -4", expected_output="5\n---\n6", io_options="{}")
+        fields.update(test_fields)
+        test = AssignmentTest(name="Adder", programming_language=language, created_by=1, **fields)
+        db.session.add(test)
+        db.session.flush()
+        assignment = Assignment(title="Adder", description="", rubric="", pass_threshold=40,
+                                due_date=datetime(2030, 1, 1), created_by=1, test_id=test.test_id)
+        db.session.add(assignment)
+        db.session.commit()
+        return assignment.assignment_id
+
+    def grade(self, assignment_id, source, file_type=SubmissionFileType.C_FILE):
+        self.attempts += 1
+        submission = Submission(student_id=self.student.student_id, assignment_id=assignment_id,
+                                attempt_number=self.attempts, submission_file=source, file_type=file_type)
+        db.session.add(submission)
+        db.session.commit()
+        outcome = AutoMarker().mark_submission(submission.submission_id)
+        return submission, outcome
+
+    def test_c_program_is_compiled_once_and_run_for_every_case(self):
+        assignment_id = self.assignment()
+        first, outcome = self.grade(assignment_id, C_ADDER)
+        self.assertEqual((outcome["tests_total"], outcome["tests_passed"]), (2, 2))
+        self.assertEqual(metrics.get("builds.compiles"), 1)
+        self.assertGreater(first.result.compile_time, 0)
+        self.assertNotEqual(first.result.compile_time, first.result.execution_time)
+
+        # The same source again (a regrade or a resubmission) reuses the build
+        second, outcome = self.grade(assignment_id, C_ADDER)
+        self.assertEqual(outcome["tests_passed"], 2)
+        self.assertEqual((metrics.get("builds.compiles"), metrics.get("builds.cache_hits")), (1, 1))
+        self.assertEqual(second.result.compile_time, 0.0)
+
+        # Another grading process with its own handle on the same directory
+        set_build_cache(BuildCache(os.path.join(self.tmp.name, "builds")))
+        _, outcome = self.grade(assignment_id, C_ADDER)
+        self.assertEqual(outcome["tests_passed"], 2)
+        self.assertEqual((metrics.get("builds.compiles"), metrics.get("builds.cache_hits")), (1, 2))
+
+    def test_compile_errors_are_reported_as_a_build_error(self):
+        submission, outcome = self.grade(self.assignment(), b"int main(void) { return missing; }\n")
+
+        self.assertEqual((outcome["tests_total"], outcome["tests_errors"]), (1, 1))
+        self.assertEqual(submission.status, SubmissionStatus.FAILED)
+        case = CaseResult.query.one()
+        self.assertEqual((case.name, case.message), ("Build.compile", "Compilation failed"))
+        self.assertIn("missing", case.traceback)
+
+    def test_unit_tests_run_the_built_program(self):
+        assignment_id = self.assignment(test_file=RUN_STUDENT_TEST, input_data="", expected_output="", io_options=None)
+        previous = set_executor(InlineExecutor())
+        try:
+            _, outcome = self.grade(assignment_id, C_ADDER)
+        finally:
+            set_executor(previous)
+        self.assertEqual((outcome["tests_total"], outcome["tests_passed"]), (1, 1))
+
+    @unittest.skipUnless(shutil.which("node"), "node is not installed")
+    def test_interpreted_languages_run_without_a_build(self):
+        assignment_id = self.assignment(ProgrammingLanguage.JAVASCRIPT)
+        source = b'const [a, b] = require("fs").readFileSync(0, "utf8").trim().split(/\\s+/).map(Number);\nconsole.log(a + b);\n'
+        submission, outcome = self.grade(assignment_id, source, SubmissionFileType.JAVASCRIPT_FILE)
+
+        self.assertEqual(outcome["tests_passed"], 2)
+        self.assertIsNone(db.session.get(Result, submission.result_id).compile_time)
+
+    def test_unsupported_language_fails_the_test_run(self):
+        _, outcome = self.grade(self.assignment(ProgrammingLanguage.CSHARP), b"class P {}")
+        self.assertEqual(outcome["tests_total"], 0)
+        self.assertIn("No runner for csharp submissions", outcome["feedback"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from sqlalchemy import LargeBinary, create_engine, inspect, text
+
+from migrations import MigrationContext, current_version, discover_migrations, pending_migrations, upgrade
+from models.models import db
+
+# A PostgreSQL database to also run these tests against; each test works in a schema of its own there
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+def _insert_graded_submission(connection):
+    """Submission 1 of student 1 to assignment 1, graded as result 1, with the rows they reference."""
+    connection.execute(text("INSERT INTO institutions (institution_id, name, code, type, country) "
+                            "VALUES (1, 'University', 'UNI', 'UNIVERSITY', 'UK')"))
+    connection.execute(text("INSERT INTO teachers (teacher_id, first_name, surname, email, institution_id) "
+                            "VALUES (1, 'Ada', 'Teacher', 'teacher@example.com', 1)"))
+    connection.execute(text("INSERT INTO students (student_id, first_name, surname, email, student_number, "
+                            "institution_id) VALUES (1, 'Sam', 'Student', 'student@example.com', 'S1', 1)"))
+    connection.execute(text("INSERT INTO assignments (assignment_id, title, description, rubric, pass_threshold, "
+                            "due_date, type, created_by) "
+                            "VALUES (1, 'Lab', '', '', 40, CURRENT_TIMESTAMP, 'CODING', 1)"))
+    connection.execute(text("INSERT INTO results (result_id, actual_output, expected_output, passed, score, "
+                            "percentage) VALUES (1, :output, '', :passed, 1, 100)"),
+                       {"output": b"", "passed": True})
+    connection.execute(text("INSERT INTO submissions (submission_id, student_id, assignment_id, result_id, "
+                            "submission_date) VALUES (1, 1, 1, 1, CURRENT_TIMESTAMP)"))
+
+
+class RacingContext(MigrationContext):
+    """Sees every table as empty, as a runner does that checks just before another one's backfill commits."""
+
+    def execute(self, sql, params=None):
+        return super().execute("SELECT 0" if sql.startswith("SELECT COUNT(*)") else sql, params)
+
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'automarker.db')}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_upgrade_applies_all_migrations_once(self):
+        applied = upgrade(self.engine)
+        self.assertEqual([m.version for m in applied], [m.version for m in discover_migrations()])
+        self.assertEqual(current_version(self.engine), discover_migrations()[-1].version)
+        self.assertEqual(pending_migrations(self.engine), [])
+
+        # Running again is a no-op
+        self.assertEqual(upgrade(self.engine), [])
+
+    def test_upgrade_from_empty_database_matches_models(self):
+        """Migrations build their own tables, so every later column and index must come from a migration."""
+        upgrade(self.engine)
+
+        inspector = inspect(self.engine)
+        for table in db.metadata.tables.values():
+            with self.subTest(table=table.name):
+                self.assertEqual({c["name"] for c in inspector.get_columns(table.name)}, set(table.columns.keys()))
+                self.assertLessEqual({i.name for i in table.indexes},
+                                     {i["name"] for i in inspector.get_indexes(table.name)})
+
+    def test_every_migration_can_be_rerun(self):
+        """A step that failed after its work was done is simply run again."""
+        upgrade(self.engine)
+
+        for migration in discover_migrations():
+            with self.subTest(migration=migration.name):
+                migration.upgrade(MigrationContext(self.engine))
+
+    def test_upgrade_adds_indexes_to_existing_database(self):
+        """A database created by the old db.create_all path gets the new indexes."""
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE submissions (submission_id INTEGER PRIMARY KEY, student_id INTEGER, "
+                "assignment_id INTEGER, status VARCHAR(10), result_id INTEGER)"
+            ))
+
+        upgrade(self.engine)
+
+        indexes = {i["name"] for i in inspect(self.engine).get_indexes("submissions")}
+        self.assertIn("ix_submissions_student_assignment", indexes)
+
+    def test_concurrent_backfills_do_not_collide(self):
+        upgrade(self.engine)
+        with self.engine.begin() as connection:
+            _insert_graded_submission(connection)
+            connection.execute(text("INSERT INTO test_case_results (result_id, name, outcome, duration) "
+                                    "VALUES (1, 'Tests.test_a', 'PASSED', 0.5)"))
+        test_case_stats = next(m for m in discover_migrations() if m.name == "test_case_stats")
+
+        for _ in range(2):
+            test_case_stats.upgrade(RacingContext(self.engine))
+
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute(text("SELECT name, runs FROM test_case_stats")).all(),
+                             [("Tests.test_a", 1)])
+
+    def test_backfill_runs_in_batches(self):
+        with self.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE items (item_id INTEGER PRIMARY KEY, value INTEGER)"))
+            connection.execute(text("INSERT INTO items (item_id) VALUES " + ", ".join(f"({i})" for i in range(1, 26))))
+
+        ctx = MigrationContext(self.engine, batch_size=10)
+        ctx.add_column("items", "doubled", "INTEGER")
+        ctx.add_column("items", "doubled", "INTEGER")  # idempotent
+        updated = ctx.backfill("items", "item_id", "value = item_id, doubled = item_id * 2", "value IS NULL")
+
+        self.assertEqual(updated, 25)
+        with self.engine.connect() as connection:
+            remaining = connection.execute(text("SELECT COUNT(*) FROM items WHERE doubled IS NULL")).scalar()
+        self.assertEqual(remaining, 0)
+
+
+@unittest.skipUnless(POSTGRES_URL, "TEST_POSTGRES_URL is not set")
+class TestMigrationsPostgres(TestMigrations):
+
+    def setUp(self):
+        self.schema = f"migrations_test_{os.getpid()}"
+        self.admin = create_engine(POSTGRES_URL)
+        with self.admin.begin() as connection:
+            connection.execute(text(f"CREATE SCHEMA {self.schema}"))
+        self.engine = create_engine(POSTGRES_URL, connect_args={"options": f"-csearch_path={self.schema}"})
+
+    def tearDown(self):
+        self.engine.dispose()
+        with self.admin.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {self.schema} CASCADE"))
+        self.admin.dispose()
+
+    def test_compressed_columns_are_binary(self):
+        upgrade(self.engine)
+
+        columns = {c["name"]: c["type"] for c in inspect(self.engine).get_columns("results")}
+        self.assertIsInstance(columns["actual_output"], LargeBinary)
+        self.assertIsInstance(columns["feedback"], LargeBinary)
+
+
+if __name__ == "__main__":
+    unittest.main()
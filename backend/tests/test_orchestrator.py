@@ -0,0 +1,118 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the app directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from automarker import AutoMarker
+from cache import TestArtifact
+from grading.orchestrator import ProgramRun, SubprocessOrchestrator
+
+PYTHON = sys.executable
+
+
+class TestSubprocessOrchestrator(unittest.TestCase):
+
+    def setUp(self):
+        self.orchestrator = SubprocessOrchestrator(max_concurrency=256, max_output_bytes=10_000_000, keep_bytes=1000)
+
+    def tearDown(self):
+        self.orchestrator.shutdown()
+
+    def test_feeds_input_and_captures_output(self):
+        result = self.orchestrator.run(
+            [PYTHON, "-c", "import sys; a, b = map(int, input().split()); print(a + b); print('done', file=sys.stderr)"],
+            input="2 3\n"
+        )
+        self.assertTrue(result.ok)
+        self.assertEqual((result.stdout, result.stderr), ("5\n", "done\n"))
+
+    def test_timeout_kills_the_process_group(self):
+        start = time.perf_counter()
+        result = self.orchestrator.run(["sh", "-c", "sleep 30 & sleep 30"], timeout=0.3)
+
+        self.assertTrue(result.timed_out)
+        self.assertFalse(result.ok)
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual(self.orchestrator.stats()["timeouts"], 1)
+
+    def test_keeps_head_and_tail_of_large_output(self):
+        result = self.orchestrator.run([PYTHON, "-c", "print('start' + 'x' * 5_000_000); print('end')"])
+
+        self.assertEqual(result.returncode, 0)
+        self.assertTrue(result.truncated)
+        self.assertEqual(result.stdout_bytes, 5_000_010)
+        self.assertTrue(result.stdout.startswith("start" + "x" * 995 + "\n... [4998010 bytes omitted] ...\n"))
+        self.assertTrue(result.stdout.endswith("x" * 995 + "\nend\n"))
+
+    def test_runaway_output_kills_the_program(self):
+        orchestrator = SubprocessOrchestrator(max_output_bytes=100_000, keep_bytes=100)
+        try:
+            start = time.perf_counter()
+            result = orchestrator.run([PYTHON, "-c", "while True: print('spam' * 25)"], timeout=30)
+        finally:
+            orchestrator.shutdown()
+
+        self.assertLess(time.perf_counter() - start, 10)
+        self.assertTrue(result.output_limit_exceeded)
+        self.assertFalse(result.timed_out or result.ok)
+        self.assertLess(result.stdout_bytes, 1_000_000)
+        self.assertLess(len(result.stdout), 300)
+        self.assertEqual(orchestrator.stats()["output_limit_kills"], 1)
+
+    def test_missing_program_is_an_error_not_an_exception(self):
+        result = self.orchestrator.run(["/nonexistent/program"])
+        self.assertIsNotNone(result.error)
+        self.assertIsNone(result.returncode)
+
+    def test_hundreds_of_programs_in_flight(self):
+        runs = [ProgramRun(["sh", "-c", f"sleep 0.5; echo {n}"]) for n in range(200)]
+        start = time.perf_counter()
+        results = self.orchestrator.run_many(runs)
+
+        self.assertEqual([r.stdout for r in results], [f"{n}\n" for n in range(200)])
+        self.assertLess(time.perf_counter() - start, 20)  # 100 s if run one after another
+
+    def test_semaphore_bounds_concurrency(self):
+        orchestrator = SubprocessOrchestrator(max_concurrency=3)
+        try:
+            start = time.perf_counter()
+            orchestrator.run_many([ProgramRun(["sleep", "0.3"]) for _ in range(9)])
+            self.assertGreaterEqual(time.perf_counter() - start, 0.85)
+        finally:
+            orchestrator.shutdown()
+
+
+class TestRunStudentCode(unittest.TestCase):
+
+    def test_runs_through_the_orchestrator(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "main.py")
+            with open(path, "w") as f:
+                f.write("name = input()\nprint(f'Hello {name}')\n")
+            marker = AutoMarker()
+            self.assertEqual(marker.run_student_code(path, "Ada\n"), ("Hello Ada", None))
+
+            with open(path, "w") as f:
+                f.write("while True:\n    pass\n")
+            self.assertEqual(marker.run_student_code(path, timeout=0.5), (None, "Execution timed out"))
+            artifact = TestArtifact(1, "1.0", None, b"", "0" * 64, timeout_seconds=1)
+            self.assertEqual(marker.run_student_code(path, artifact=artifact), (None, "Execution timed out"))
+
+            orchestrator = SubprocessOrchestrator(max_output_bytes=10_000)
+            with patch("automarker.get_orchestrator", return_value=orchestrator):
+                with open(path, "w") as f:
+                    f.write("while True:\n    print('spam')\n")
+                output, error = marker.run_student_code(path)
+            orchestrator.shutdown()
+            self.assertIsNone(output)
+            self.assertTrue(error.startswith("Output limit exceeded"))
+
+
+if __name__ == "__main__":
+    unittest.main()
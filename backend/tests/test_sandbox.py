@@ -0,0 +1,170 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+from support import AppTestCase
+from automarker import AutoMarker
+from grading.orchestrator import SubprocessOrchestrator
+from grading.sandbox import (
+    NamespaceBackend, SandboxBackend, SandboxError, SandboxLimits, SandboxPool, create_backend, set_sandbox_pool
+)
+from utils.metrics import metrics
+from models.models import db, Assignment, Student, Submission, Test as AssignmentTest
+
+PROBE = """import json, os, socket, subprocess
+# Root of the user namespace could unmount the tmpfs over a hidden path, but its capabilities are dropped
+subprocess.run(["umount", HIDDEN], capture_output=True)
+report = {"hidden": os.listdir(HIDDEN), "secret": os.environ.get("AUTOMARKER_SECRET"), "pid": os.getpid()}
+try:
+    socket.create_connection(("127.0.0.1", 9), timeout=1)
+except OSError as e:
+    report["network"] = e.errno
+try:
+    open("/sandbox-escape", "w")
+except OSError as e:
+    report["root_writable"] = False
+with open("scratch.txt", "w") as f:
+    f.write("ok")
+print(json.dumps(report))
+"""
+
+
+def namespaces_available():
+    if not NamespaceBackend.available():
+        return False
+    return subprocess.run(["unshare", "--user", "--map-root-user", "true"], capture_output=True).returncode == 0
+
+
+class TestSandboxPool(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_sandboxes_are_reused_and_emptied(self):
+        pool = SandboxPool(SandboxBackend(), size=2, root=self.root)
+        try:
+            with pool.acquire() as first:
+                os.makedirs(os.path.join(first.workdir, "build"))
+                with open(os.path.join(first.workdir, "main.py"), "w") as f:
+                    f.write("print('hi')\n")
+            with pool.acquire() as again:
+                self.assertIs(again, first)
+                self.assertEqual(os.listdir(again.workdir), [])
+            self.assertEqual(pool.stats(), {"backend": "subprocess", "size": 2, "in_use": 0, "acquired": 2, "waits": 0})
+        finally:
+            pool.close()
+
+    def test_nested_hidden_paths_are_collapsed(self):
+        backend = SandboxBackend(hidden_paths=["/tmp/a/b", "/tmp", "/srv/x", "/srv/xy"])
+        self.assertEqual(backend.hidden_paths, ("/srv/x", "/srv/xy", "/tmp"))
+
+    def test_unknown_or_unavailable_backends_are_errors(self):
+        with self.assertRaises(SandboxError):
+            create_backend("docker")
+
+        class Missing(SandboxBackend):
+            requires = ("no-such-sandbox-tool",)
+        with self.assertRaises(SandboxError):
+            SandboxPool(Missing(), size=1, root=self.root)
+
+    def test_plain_subprocess_commands_are_unchanged(self):
+        pool = SandboxPool(SandboxBackend(), size=1, root=self.root)
+        try:
+            with pool.acquire() as sandbox:
+                self.assertEqual(sandbox.command(["python3", "main.py"], timeout=5), ["python3", "main.py"])
+                self.assertIsNone(sandbox.env())
+        finally:
+            pool.close()
+
+
+@unittest.skipUnless(namespaces_available(), "unprivileged user namespaces are not available")
+class TestNamespaceSandbox(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.hidden = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(__file__)))
+        with open(os.path.join(self.hidden, "automarker.db"), "w") as f:
+            f.write("other students' work")
+        backend = create_backend("namespace", SandboxLimits(memory_bytes=256 * 1024 * 1024),
+                                 [tempfile.gettempdir(), self.hidden, self.root])
+        self.pool = SandboxPool(backend, size=2, root=self.root)
+        self.orchestrator = SubprocessOrchestrator()
+        os.environ["AUTOMARKER_SECRET"] = "hunter2"
+
+    def tearDown(self):
+        os.environ.pop("AUTOMARKER_SECRET", None)
+        self.orchestrator.shutdown()
+        self.pool.close()
+        os.remove(os.path.join(self.hidden, "automarker.db"))
+        os.rmdir(self.hidden)
+        super().tearDown()
+
+    def run_program(self, sandbox, source, **kwargs):
+        path = os.path.join(sandbox.workdir, "main.py")
+        with open(path, "w") as f:
+            f.write(source)
+        return self.orchestrator.run([sys.executable, path], sandbox=sandbox, **kwargs)
+
+    def test_program_is_isolated(self):
+        with self.pool.acquire() as sandbox:
+            result = self.run_program(sandbox, f"HIDDEN = {self.hidden!r}\n" + PROBE)
+            self.assertTrue(result.ok, result.stderr)
+            self.assertTrue(os.path.exists(os.path.join(sandbox.workdir, "scratch.txt")))
+
+        report = json.loads(result.stdout)
+        self.assertEqual(report["hidden"], [])
+        self.assertIsNone(report["secret"])
+        self.assertEqual(report["pid"], 1)
+        self.assertIn("network", report)
+        self.assertFalse(report["root_writable"])
+
+    def test_limits_and_timeouts_apply_inside_the_sandbox(self):
+        with self.pool.acquire() as sandbox:
+            memory = self.run_program(sandbox, "block = bytearray(512 * 1024 * 1024)\n")
+            self.assertEqual(memory.returncode, 1)
+            self.assertIn("MemoryError", memory.stderr)
+
+            forked = self.run_program(sandbox, "import os, time\nos.fork()\nos.fork()\ntime.sleep(60)\n", timeout=0.5)
+            self.assertTrue(forked.timed_out)
+
+    def test_submission_is_graded_in_a_pooled_sandbox(self):
+        test = AssignmentTest(name="Echo", input_data="a\n---\nb", expected_output="a\n---\nb",
+                              io_options='{"single_process": true}', created_by=1)
+        db.session.add(test)
+        db.session.flush()
+        assignment = Assignment(title="Echo", description="", rubric="", pass_threshold=40,
+                                due_date=datetime(2030, 1, 1), created_by=1, test_id=test.test_id)
+        student = Student(first_name="Ada", surname="Test", email="ada@example.com",
+                          student_number="N001", institution_id=1)
+        db.session.add_all([assignment, student])
+        db.session.flush()
+        submission = Submission(student_id=student.student_id, assignment_id=assignment.assignment_id,
+                                attempt_number=1, submission_file=b"print(input())\n")
+        db.session.add(submission)
+        db.session.commit()
+
+        metrics.reset()
+        previous = set_sandbox_pool(self.pool)
+        try:
+            outcome = AutoMarker().mark_submission(submission.submission_id)
+        finally:
+            set_sandbox_pool(previous)
+
+        self.assertEqual((outcome["tests_total"], outcome["tests_passed"]), (2, 2))
+        # The replay harness is readable inside the sandbox, so no case fell back to its own process
+        self.assertEqual(metrics.get("io_tests.fallback_cases"), 0)
+        self.assertEqual(self.pool.stats()["acquired"], 1)
+        self.assertTrue(all(not os.listdir(sandbox.workdir) for sandbox in self.pool.sandboxes))
+
+
+if __name__ == "__main__":
+    unittest.main()
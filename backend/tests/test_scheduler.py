@@ -0,0 +1,89 @@
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from grading.scheduler import GradingScheduler, JobPriority
+
+
+def drain(scheduler):
+    order = []
+    while True:
+        job = scheduler.next_job(timeout=0)
+        if job is None:
+            return order
+        order.append(job)
+
+
+class TestGradingScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = GradingScheduler(handler=lambda job: None, starvation_limit=3)
+
+    def test_interactive_jumps_ahead_of_bulk(self):
+        for submission_id in range(1, 4):
+            self.scheduler.submit(submission_id, student_id=submission_id, assignment_id=1,
+                                  priority=JobPriority.BULK)
+        self.scheduler.submit(100, student_id=50, assignment_id=2, priority=JobPriority.INTERACTIVE)
+
+        self.assertEqual(drain(self.scheduler)[0].submission_id, 100)
+
+    def test_round_robin_across_students(self):
+        # Student 1 resubmits five times before student 2 submits once
+        for submission_id in range(1, 6):
+            self.scheduler.submit(submission_id, student_id=1, assignment_id=1)
+        self.scheduler.submit(6, student_id=2, assignment_id=1)
+
+        order = [job.submission_id for job in drain(self.scheduler)]
+        self.assertEqual(order[:2], [1, 6])
+
+    def test_round_robin_across_assignments(self):
+        for submission_id in range(1, 4):
+            self.scheduler.submit(submission_id, student_id=submission_id, assignment_id=1)
+        self.scheduler.submit(10, student_id=10, assignment_id=2)
+
+        order = [job.assignment_id for job in drain(self.scheduler)]
+        self.assertEqual(order[:2], [1, 2])
+
+    def test_duplicate_submission_is_not_queued_twice(self):
+        self.assertTrue(self.scheduler.submit(1, 1, 1, priority=JobPriority.BULK))
+        self.assertFalse(self.scheduler.submit(1, 1, 1, priority=JobPriority.BULK))
+        # A more urgent request upgrades the queued job
+        self.assertFalse(self.scheduler.submit(1, 1, 1, priority=JobPriority.INTERACTIVE))
+
+        jobs = drain(self.scheduler)
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0].priority, JobPriority.INTERACTIVE)
+        self.assertTrue(jobs[0].regrade is False)
+
+    def test_bulk_is_not_starved(self):
+        self.scheduler.submit(1, 1, 1, priority=JobPriority.BULK)
+        for submission_id in range(10, 20):
+            self.scheduler.submit(submission_id, submission_id, 2, priority=JobPriority.INTERACTIVE)
+
+        order = [job.priority for job in drain(self.scheduler)]
+        self.assertEqual(order.index(JobPriority.BULK), 3)
+
+    def test_workers_run_every_job(self):
+        done = []
+        finished = threading.Event()
+
+        def handler(job):
+            done.append(job.submission_id)
+            if len(done) == 20:
+                finished.set()
+
+        scheduler = GradingScheduler(handler=handler, workers=4)
+        scheduler.start()
+        for submission_id in range(20):
+            scheduler.submit(submission_id, submission_id % 3, submission_id % 2)
+        self.assertTrue(finished.wait(5))
+        scheduler.stop(timeout=5)
+        self.assertEqual(sorted(done), list(range(20)))
+
+
+if __name__ == "__main__":
+    unittest.main()
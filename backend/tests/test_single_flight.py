@@ -0,0 +1,83 @@
+import threading
+import time
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from support import AppTestCase
+from grading import run_grading
+from grading.leases import acquire_lease, lease_is_active, release_lease
+from models.models import db, GradeStatus, Result, Submission, SubmissionStatus
+
+
+class TestSingleFlightGrading(AppTestCase):
+    config = {"GRADING_LEASE_POLL_SECONDS": 0.05}
+
+    def setUp(self):
+        super().setUp()
+        submission = Submission(student_id=1, assignment_id=1, submission_file=b"print(1)")
+        db.session.add(submission)
+        db.session.commit()
+        self.submission_id = submission.submission_id
+
+    def test_concurrent_requests_share_one_run(self):
+        calls = []
+
+        def slow_mark(marker, submission_id):
+            calls.append(submission_id)
+            time.sleep(0.3)
+            return {"success": True, "submission_id": submission_id, "score": 42}
+
+        results = []
+
+        def request():
+            with self.app.app_context():
+                results.append(run_grading(self.submission_id))
+
+        with patch("automarker.AutoMarker.mark_submission", slow_mark):
+            threads = [threading.Thread(target=request) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(calls, [self.submission_id])
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r["score"] == 42 for r in results))
+        self.assertEqual(sum(1 for r in results if r.get("coalesced")), 4)
+
+        self.assertFalse(lease_is_active(db.engine, self.submission_id))
+
+    def test_waits_for_lease_held_by_another_process(self):
+        engine = db.engine
+        self.assertTrue(acquire_lease(engine, self.submission_id, owner="other-host:1"))
+        self.assertFalse(acquire_lease(engine, self.submission_id, owner="third-host:2"))
+
+        def finish_elsewhere():
+            time.sleep(0.2)
+            with self.app.app_context():
+                submission = db.session.get(Submission, self.submission_id)
+                submission.result = Result(
+                    actual_output="", expected_output="", passed=True, score=100, percentage=100,
+                    test_cases_passed=2, test_cases_total=2, grade_status=GradeStatus.GRADED,
+                    graded_at=datetime.now(timezone.utc)
+                )
+                submission.status = SubmissionStatus.PASSED
+                db.session.commit()
+            release_lease(engine, self.submission_id, owner="other-host:1")
+
+        thread = threading.Thread(target=finish_elsewhere)
+        thread.start()
+        with patch("automarker.AutoMarker.mark_submission") as mark:
+            with self.app.app_context():
+                result = run_grading(self.submission_id)
+        thread.join()
+
+        mark.assert_not_called()
+        self.assertTrue(result["success"])
+        self.assertTrue(result["coalesced"])
+        self.assertEqual(result["status"], "passed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import sys
+import unittest
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from grading.results import StructuredTestResult, MAX_TRACEBACK_LENGTH
+
+
+class _SampleTests(unittest.TestCase):
+    __test__ = False  # Only run through StructuredTestResult below
+
+    def test_passes(self):
+        self.assertEqual(1 + 1, 2)
+
+    def test_fails(self):
+        self.assertEqual(1 + 1, 3, "one plus one")
+
+    def test_errors(self):
+        raise RuntimeError("boom")
+
+    @unittest.skip("not today")
+    def test_skipped(self):
+        pass
+
+    def test_subtests(self):
+        for value in range(3):
+            with self.subTest(value=value):
+                self.assertLess(value, 1)
+
+    def test_long_traceback(self):
+        raise ValueError("x" * 10000)
+
+
+class TestStructuredTestResult(unittest.TestCase):
+
+    def setUp(self):
+        suite = unittest.defaultTestLoader.loadTestsFromTestCase(_SampleTests)
+        self.result = StructuredTestResult()
+        suite.run(self.result)
+        self.records = {r["name"]: r for r in self.result.serializable_records()}
+
+    def test_one_record_per_test(self):
+        self.assertEqual(len(self.records), 6)
+        self.assertEqual(self.records["_SampleTests.test_passes"]["outcome"], "passed")
+        self.assertEqual(self.records["_SampleTests.test_skipped"]["outcome"], "skipped")
+        self.assertEqual(self.records["_SampleTests.test_skipped"]["message"], "not today")
+
+    def test_failure_message_and_traceback(self):
+        record = self.records["_SampleTests.test_fails"]
+        self.assertEqual(record["outcome"], "failed")
+        self.assertIn("one plus one", record["message"])
+        self.assertIn("AssertionError", record["traceback"])
+        self.assertGreaterEqual(record["duration"], 0)
+
+    def test_errors_and_subtests(self):
+        self.assertEqual(self.records["_SampleTests.test_errors"]["outcome"], "error")
+        self.assertEqual(self.records["_SampleTests.test_errors"]["message"], "boom")
+        self.assertEqual(self.records["_SampleTests.test_subtests"]["outcome"], "failed")
+
+    def test_traceback_is_truncated(self):
+        record = self.records["_SampleTests.test_long_traceback"]
+        self.assertLessEqual(len(record["traceback"]), MAX_TRACEBACK_LENGTH)
+        self.assertTrue(record["traceback"].rstrip().endswith("x"))
+
+    def test_summary_lists_every_test(self):
+        summary = self.result.summary()
+        self.assertIn("_SampleTests.test_fails ... FAIL", summary)
+        self.assertEqual(len(summary.splitlines()), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
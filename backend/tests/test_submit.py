@@ -0,0 +1,100 @@
+import threading
+import unittest
+from datetime import datetime
+
+from sqlalchemy import event
+
+from support import AppTestCase
+from cache import assignment_cache
+from models.models import db, Assignment, Student, Submission
+
+
+class TestSubmitFastPath(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        assignment_cache.invalidate()
+
+        assignment = Assignment(title="Lab", description="", rubric="", pass_threshold=40, max_attempts=3,
+                                due_date=datetime(2030, 1, 1), created_by=1)
+        student = Student(first_name="Ada", surname="Test", email="ada@example.com",
+                          student_number="N001", institution_id=1)
+        db.session.add_all([assignment, student])
+        db.session.commit()
+        self.assignment_id = assignment.assignment_id
+        self.student_id = student.student_id
+
+    def submit(self, client=None, student_id=None):
+        return (client or self.client).post("/api/submissions", json={
+            "student_id": student_id or self.student_id,
+            "assignment_id": self.assignment_id,
+            "file_name": "main.py",
+            "file_content": "print('hello')"
+        })
+
+    def test_attempts_are_numbered_and_limited(self):
+        attempts = [self.submit().json["data"]["attempt_number"] for _ in range(3)]
+        self.assertEqual(attempts, [1, 2, 3])
+
+        response = self.submit()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Maximum attempts (3)", response.json["error"])
+        self.assertEqual(Submission.query.count(), 3)
+
+    def test_submit_is_one_statement_with_a_warm_cache(self):
+        self.submit()  # Warms the assignment cache
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        response = self.submit()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["data"]["attempt_number"], 2)
+        queries = [s for s in statements if not s.startswith(("SAVEPOINT", "RELEASE"))]
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith("INSERT INTO submissions"))
+
+    def test_attempt_numbers_continue_after_a_gap(self):
+        self.submit()
+        self.submit()
+        # Attempts 1 and 3 remain, e.g. after attempt 2 was deleted
+        Submission.query.filter_by(attempt_number=2).update({"attempt_number": 3})
+        db.session.commit()
+
+        response = self.submit()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["data"]["attempt_number"], 4)
+        self.assertEqual(self.submit().status_code, 400)  # Three attempts exist: the limit still counts them
+
+    def test_unknown_student_and_assignment(self):
+        self.assertEqual(self.submit(student_id=999).status_code, 404)
+        response = self.client.post("/api/submissions", json={"student_id": self.student_id, "assignment_id": 999})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cache_is_invalidated_when_assignment_changes(self):
+        self.assertEqual(assignment_cache.get(self.assignment_id).max_attempts, 3)
+        db.session.get(Assignment, self.assignment_id).max_attempts = 5
+        db.session.commit()
+        self.assertEqual(assignment_cache.get(self.assignment_id).max_attempts, 5)
+
+    def test_concurrent_submits_never_exceed_max_attempts(self):
+        codes = []
+        barrier = threading.Barrier(6)
+
+        def worker():
+            client = self.app.test_client()
+            barrier.wait()
+            codes.append(self.submit(client).status_code)
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(codes), [200, 200, 200, 400, 400, 400])
+        numbers = sorted(s.attempt_number for s in Submission.query.all())
+        self.assertEqual(numbers, [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()